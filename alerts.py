@@ -0,0 +1,169 @@
+import logging
+import numpy as np
+import pandas as pd
+import indicators as ind
+from instrumentation import instrumented
+
+# Настройка логирования
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+SUMMARY_FIELDS = ('count', 'mean', 'min', 'max', 'first', 'last', 'fluctuation')
+ALERT_COLUMNS = ['ticker', 'date', 'alert', 'value', 'threshold']
+# Типы оповещений в порядке вывода в таблице
+ALERT_KINDS = ('fluctuation', 'rsi_overbought', 'rsi_oversold', 'macd_bullish_cross', 'macd_bearish_cross')
+
+def summary_stats(data, column='Close'):
+    """
+    Возвращает сводную статистику столбца, рассчитанную за одно извлечение данных.
+
+    Сводка не запоминается: чтобы не просматривать столбец повторно, рассчитайте
+    ее один раз и передайте в функции, принимающие параметр stats.
+
+    :param data: DataFrame с историческими данными.
+    :param column: Имя столбца.
+    :return: Словарь {'count', 'mean', 'min', 'max', 'first', 'last', 'fluctuation'}; пропуски не учитываются,
+             fluctuation - размах цены в процентах от минимума.
+    """
+    columns = _summarize(data[column].to_numpy(dtype=np.float64).reshape(-1, 1))
+    return {field: (int(columns[field][0]) if field == 'count' else float(columns[field][0]))
+            for field in SUMMARY_FIELDS}
+
+
+def panel_summary(prices):
+    """
+    Рассчитывает сводную статистику сразу для всех тикеров панели.
+
+    :param prices: DataFrame с ценами (даты x тикеры).
+    :return: DataFrame (тикеры x SUMMARY_FIELDS).
+    """
+    columns = _summarize(np.asarray(prices.to_numpy(dtype=np.float64)))
+    return pd.DataFrame(columns, index=prices.columns, columns=list(SUMMARY_FIELDS))
+
+
+@instrumented(rows=lambda result, frames, *args, **kwargs: _ticker_count(frames))
+def scan_alerts(frames, threshold=10.0, rsi_upper=70.0, rsi_lower=30.0, rsi_window=14, short_window=12,
+                long_window=26, signal_window=9, summary=None):
+    """
+    Проверяет условия оповещений сразу для всех тикеров.
+
+    Индикаторы считаются по панели цен закрытия двумерными операциями
+    (indicators.compute_panel_indicators) по датам торгов каждого тикера, условия
+    проверяются по последнему бару каждого тикера без цикла по тикерам:
+        fluctuation        - размах цены за период больше threshold процентов (как notify_if_strong_fluctuations);
+        rsi_overbought     - RSI последнего бара выше rsi_upper;
+        rsi_oversold       - RSI последнего бара ниже rsi_lower;
+        macd_bullish_cross - MACD пересек сигнальную линию снизу вверх на последнем баре;
+        macd_bearish_cross - MACD пересек сигнальную линию сверху вниз на последнем баре.
+
+    :param frames: Словарь {тикер: DataFrame}, DataFrame с MultiIndex (тикер, дата) или панель цен закрытия.
+    :param threshold: Порог колебаний в процентах.
+    :param rsi_upper: Граница перекупленности RSI.
+    :param rsi_lower: Граница перепроданности RSI.
+    :param rsi_window: Окно RSI.
+    :param short_window: Короткий период EMA для MACD.
+    :param long_window: Длинный период EMA для MACD.
+    :param signal_window: Период сигнальной линии MACD.
+    :param summary: Сводка по тикерам, уже рассчитанная для этих данных: словарь {тикер: summary_stats(...)}
+                    или DataFrame тикеры x SUMMARY_FIELDS, как у panel_summary. По умолчанию рассчитывается
+                    по панели цен.
+    :return: DataFrame со столбцами ALERT_COLUMNS (одна строка на оповещение), упорядоченный по тикеру
+             и типу оповещения.
+    """
+    prices = _panel(frames)
+    logging.info(f"Проверка условий оповещений для {prices.shape[1]} тикеров")
+    spec = [{'kind': 'rsi', 'window': rsi_window, 'name': 'RSI'},
+            {'kind': 'macd', 'short_window': short_window, 'long_window': long_window,
+             'signal_window': signal_window, 'names': ('EMA_short', 'EMA_long', 'MACD', 'Signal')}]
+    panel = ind.compute_panel_indicators(prices, spec, skip_missing=True)
+    close = prices.to_numpy(dtype=np.float64)
+    width = close.shape[1]
+    tickers = np.arange(width)
+
+    # Последний и предпоследний бары с ценой для каждого тикера (у тикеров могут быть разные календари)
+    valid = ~np.isnan(close)
+    observed = valid.any(axis=0)
+    last = len(close) - 1 - np.argmax(valid[::-1], axis=0)
+    before = valid.copy()
+    before[last, tickers] = False
+    has_previous = before.any(axis=0)
+    previous = len(close) - 1 - np.argmax(before[::-1], axis=0)
+
+    if summary is None:
+        stats = _summarize(close)
+    else:
+        summary = pd.DataFrame.from_dict(summary, orient='index') if isinstance(summary, dict) else summary
+        stats = {'fluctuation': summary['fluctuation'].reindex(prices.columns).to_numpy(dtype=np.float64)}
+    rsi = panel['RSI'].to_numpy()[last, tickers]
+    spread = panel['MACD'].to_numpy() - panel['Signal'].to_numpy()
+    spread_last = spread[last, tickers]
+    spread_previous = np.where(has_previous, spread[previous, tickers], np.nan)
+    with np.errstate(invalid='ignore'):
+        checks = {
+            'fluctuation': (stats['fluctuation'] > threshold, stats['fluctuation'], threshold),
+            'rsi_overbought': (rsi > rsi_upper, rsi, rsi_upper),
+            'rsi_oversold': (rsi < rsi_lower, rsi, rsi_lower),
+            'macd_bullish_cross': ((spread_previous <= 0) & (spread_last > 0), spread_last, 0.0),
+            'macd_bearish_cross': ((spread_previous >= 0) & (spread_last < 0), spread_last, 0.0),
+        }
+    positions, kinds, values, thresholds = [], [], [], []
+    for number, kind in enumerate(ALERT_KINDS):
+        mask, value, limit = checks[kind]
+        selected = np.flatnonzero(mask & observed)
+        positions.append(selected)
+        kinds.append(np.full(len(selected), number))
+        values.append(value[selected])
+        thresholds.append(np.full(len(selected), limit, dtype=np.float64))
+    positions = np.concatenate(positions)
+    kinds = np.concatenate(kinds)
+    order = np.lexsort((kinds, positions))
+    positions, kinds = positions[order], kinds[order]
+    alerts = pd.DataFrame({
+        'ticker': prices.columns[positions],
+        'date': prices.index[last[positions]],
+        'alert': np.asarray(ALERT_KINDS, dtype=object)[kinds],
+        'value': np.concatenate(values)[order],
+        'threshold': np.concatenate(thresholds)[order],
+    }, columns=ALERT_COLUMNS)
+    logging.info(f"Найдено {len(alerts)} оповещений для {alerts['ticker'].nunique()} тикеров")
+    return alerts
+
+
+def _panel(frames):
+    if isinstance(frames, pd.DataFrame) and not isinstance(frames.index, pd.MultiIndex):
+        return frames
+    return ind.build_price_panel(frames)
+
+
+def _ticker_count(frames):
+    if isinstance(frames, dict):
+        return len(frames)
+    if isinstance(frames.index, pd.MultiIndex):
+        return len(frames.index.unique(level=0))
+    return frames.shape[1]
+
+
+def _summarize(values):
+    """
+    Рассчитывает сводную статистику по столбцам двумерного массива без учета пропусков.
+
+    :return: Словарь {поле SUMMARY_FIELDS: массив по столбцам}.
+    """
+    valid = ~np.isnan(values)
+    count = valid.sum(axis=0)
+    has_values = count > 0
+    columns = np.arange(values.shape[1])
+    first = np.full(len(columns), np.nan)
+    last = np.full(len(columns), np.nan)
+    if len(values):
+        first[has_values] = values[np.argmax(valid, axis=0), columns][has_values]
+        last[has_values] = values[len(values) - 1 - np.argmax(valid[::-1], axis=0), columns][has_values]
+    # fmin/fmax пропускают NaN без предупреждений для пустых столбцов
+    minimum = np.fmin.reduce(values, axis=0, initial=np.inf)
+    maximum = np.fmax.reduce(values, axis=0, initial=-np.inf)
+    minimum[~has_values] = np.nan
+    maximum[~has_values] = np.nan
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.where(valid, values, 0.0).sum(axis=0) / count
+        fluctuation = (maximum - minimum) / minimum * 100
+    return {'count': count, 'mean': mean, 'min': minimum, 'max': maximum, 'first': first, 'last': last,
+            'fluctuation': fluctuation}
@@ -0,0 +1,381 @@
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import platform
+import tempfile
+import contextlib
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+# Настройка логирования
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+PRODUCTS = ['молоко', 'сыр', 'масло', 'творог', 'кефир', 'йогурт', 'колбаса', 'ветчина', 'хлеб', 'батон',
+            'рис', 'гречка', 'сахар', 'соль', 'мука', 'чай', 'кофе', 'шоколад', 'печенье', 'яблоки', 'груши',
+            'бананы', 'апельсины', 'картофель', 'морковь', 'лук', 'капуста', 'говядина', 'свинина', 'курица',
+            'рыба', 'лосось', 'треска', 'сметана']
+ADJECTIVES = ['фермерский', 'домашний', 'классический', 'отборный', 'свежий', 'копченый', 'вареный',
+              'твердый', 'мягкий', 'сливочный', 'деревенский', 'органический']
+HEADERS = [('название', 'цена', 'фасовка'), ('товар', 'розница', 'вес'), ('наименование', 'цена', 'масса'),
+           ('продукт', 'розница', 'фасовка')]
+QUERIES = ['сыр', 'молоко', 'копченый лосось', 'ку', 'домашний', 'чай', 'нет такого товара', 'рис 1']
+# Функции конвейера анализа акций: индикаторы, сводки, экспорт и графики
+PIPELINE_STEPS = ['add_moving_average', 'calculate_rsi', 'calculate_macd', 'calculate_standard_deviation',
+                  'calculate_and_display_average_price', 'notify_if_strong_fluctuations', 'export_data_to_csv',
+                  'create_and_save_plot', 'create_interactive_plot']
+PLOT_STEPS = ('create_and_save_plot', 'create_interactive_plot')
+BASELINE_VERSION = 1
+# Минимальное суммарное время повторов одного замера: быстрые шаги повторяются, чтобы снизить шум
+MIN_STEP_SECONDS = 0.05
+
+
+def write_synthetic_price_files(directory, files=10, rows_per_file=10000, seed=0):
+    """
+    Создает синтетические файлы прайсов в формате, который читает PriceMachine.load_prices.
+
+    :param directory: Каталог для файлов.
+    :param files: Число файлов.
+    :param rows_per_file: Число строк в каждом файле.
+    :param seed: Начальное значение генератора случайных чисел.
+    :return: Список путей к созданным файлам.
+    """
+    rng = random.Random(seed)
+    paths = []
+    for number in range(files):
+        name_column, price_column, weight_column = HEADERS[number % len(HEADERS)]
+        path = os.path.join(directory, f"price_{number}.csv")
+        with open(path, 'w') as f:
+            f.write(f"{name_column},{price_column},{weight_column},поставщик\n")
+            for _ in range(rows_per_file):
+                name = f"{rng.choice(ADJECTIVES)} {rng.choice(PRODUCTS)} {rng.randint(1, 500)}"
+                f.write(f"{name},{rng.randint(50, 3000)},{rng.randint(1, 5)},поставщик {number}\n")
+        paths.append(path)
+    return paths
+
+
+def linear_find_text(data, text):
+    """
+    Прежняя реализация PriceMachine.find_text: линейный просмотр и сортировка.
+
+    :param data: Список строк каталога.
+    :param text: Часть названия товара.
+    :return: Отсортированный список найденных строк.
+    """
+    text = text.lower()
+    result = [item for item in data if text in item[1]]
+    result.sort()
+    return result
+
+
+def benchmark_find_text(files=10, rows_per_file=10000, queries=None, repeat=3):
+    """
+    Сравнивает линейный поиск с поиском по индексу PriceMachine.find_text.
+
+    :param files: Число синтетических файлов прайсов.
+    :param rows_per_file: Число строк в каждом файле.
+    :param queries: Список поисковых запросов (по умолчанию QUERIES).
+    :param repeat: Число повторов каждого запроса.
+    :return: Словарь с временем в секундах на один запрос для каждого способа.
+    """
+    from project import PriceMachine
+
+    queries = queries or QUERIES
+    with tempfile.TemporaryDirectory() as directory:
+        write_synthetic_price_files(directory, files, rows_per_file)
+        pm = PriceMachine()
+        started = time.perf_counter()
+        pm.load_prices(directory)
+        load_seconds = time.perf_counter() - started
+
+    rows = list(pm.data)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        expected = [linear_find_text(rows, query) for query in queries]
+    scan = (time.perf_counter() - started) / (repeat * len(queries))
+
+    index = pm._get_index()
+    index.search.cache_clear()
+    started = time.perf_counter()
+    found = [pm.find_text(query) for query in queries]
+    cold = (time.perf_counter() - started) / len(queries)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for query in queries:
+            pm.find_text(query)
+    warm = (time.perf_counter() - started) / (repeat * len(queries))
+
+    if found != expected:
+        raise AssertionError("Результаты поиска по индексу не совпадают с линейным поиском")
+    return {'rows': len(pm.data), 'load': load_seconds, 'scan': scan, 'index': cold, 'index_cached': warm}
+
+
+def benchmark_load_prices(files=10, rows_per_file=10000, max_workers=None, snapshot=False):
+    """
+    Замеряет загрузку каталога PriceMachine.load_prices.
+
+    :param files: Число синтетических файлов прайсов.
+    :param rows_per_file: Число строк в каждом файле.
+    :param max_workers: Число процессов для разбора файлов.
+    :param snapshot: Дополнительно замерить повторную загрузку из снимка без изменений и с одним измененным файлом.
+    :return: Словарь с временем загрузки в секундах и скоростью разбора по файлам.
+    """
+    from project import PriceMachine
+
+    def load(directory, snapshot_dir):
+        pm = PriceMachine()
+        started = time.perf_counter()
+        pm.load_prices(directory, max_workers=max_workers, snapshot_dir=snapshot_dir)
+        return pm, time.perf_counter() - started
+
+    with tempfile.TemporaryDirectory() as directory:
+        write_synthetic_price_files(directory, files, rows_per_file)
+        snapshot_dir = os.path.join(directory, 'snapshot') if snapshot else None
+        pm, seconds = load(directory, snapshot_dir)
+        result = {'rows': len(pm.data), 'seconds': seconds, 'files': pm.load_stats}
+        if snapshot:
+            result['snapshot_unchanged'] = load(directory, snapshot_dir)[1]
+            with open(os.path.join(directory, 'price_0.csv'), 'a') as f:
+                f.write("новый товар,100,1,поставщик 0\n")
+            result['snapshot_one_changed'] = load(directory, snapshot_dir)[1]
+    return result
+
+
+def synthetic_ohlcv(bars=1000, seed=0, freq='D'):
+    """
+    Создает синтетические бары OHLCV в формате yf.Ticker.history().
+
+    :param bars: Число баров.
+    :param seed: Начальное значение генератора случайных чисел.
+    :param freq: Интервал баров (для миллионов баров - 'min', чтобы даты не вышли за пределы pandas).
+    :return: DataFrame со столбцами Open, High, Low, Close, Volume и индексом Date.
+    """
+    rng = np.random.default_rng(seed)
+    index = pd.date_range('2000-01-03', periods=bars, freq=freq, tz='America/New_York', name='Date')
+    close = 100 + np.abs(rng.standard_normal(bars).cumsum())
+    spread = np.abs(rng.standard_normal(bars))
+    return pd.DataFrame({
+        'Open': close + rng.standard_normal(bars) * 0.1,
+        'High': close + spread,
+        'Low': close - spread,
+        'Close': close,
+        'Volume': rng.integers(1000, 100000, bars),
+    }, index=index)
+
+
+class SyntheticTicker():
+    """
+    Заглушка yf.Ticker для data_download.fetch_stock_data(provider=...): отдает синтетические бары без сети.
+    """
+
+    def __init__(self, ticker, bars=1000, seed=None):
+        """
+        :param ticker: Символ акции.
+        :param bars: Число баров.
+        :param seed: Начальное значение генератора (по умолчанию вычисляется по символу акции).
+        """
+        self.ticker = ticker
+        seed = sum(ticker.encode()) if seed is None else seed
+        self.frame = synthetic_ohlcv(bars, seed, freq='D' if bars <= 50000 else 'min')
+
+    def history(self, period=None, start=None, end=None, interval='1d'):
+        data = self.frame
+        if start is not None:
+            data = data[data.index >= pd.Timestamp(start).tz_localize(data.index.tz)]
+        if end is not None:
+            data = data[data.index < pd.Timestamp(end).tz_localize(data.index.tz)]
+        return data.copy()
+
+
+def benchmark_pipeline(bars=(1000,), tickers=1, repeat=3, plots=True):
+    """
+    Замеряет время и пиковую память функций конвейера анализа акций на синтетических данных.
+
+    Данные загружаются через data_download.fetch_stock_data с заглушкой SyntheticTicker.
+    Шаги выполняются на копиях кадров (графики и экспорт - с уже рассчитанными
+    индикаторами); время - лучшее из repeat замеров без трассировки памяти (быстрые шаги
+    в каждом замере повторяются не менее MIN_STEP_SECONDS), пиковая память - по
+    отдельному запуску под tracemalloc.
+
+    :param bars: Список длин рядов (число баров на тикер).
+    :param tickers: Число тикеров в каждом замере.
+    :param repeat: Число повторов для замера времени.
+    :param plots: Замерять построение графиков.
+    :return: Словарь {'<bars>x<tickers>': {шаг: {'seconds', 'rows_per_sec', 'peak_bytes'}}}.
+    """
+    import data_download as dd
+    import data_plotting as dplt
+
+    steps = [step for step in PIPELINE_STEPS if plots or step not in PLOT_STEPS]
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for length in bars:
+            frames = [dd.fetch_stock_data(f"T{number}", period='max',
+                                          provider=lambda ticker: SyntheticTicker(ticker, length))
+                      for number in range(tickers)]
+            prepared = [dd.calculate_standard_deviation(dd.calculate_macd(dd.calculate_rsi(
+                dd.add_moving_average(frame.copy())))) for frame in frames]
+            calls = {
+                'add_moving_average': (frames, dd.add_moving_average),
+                'calculate_rsi': (frames, dd.calculate_rsi),
+                'calculate_macd': (frames, dd.calculate_macd),
+                'calculate_standard_deviation': (frames, dd.calculate_standard_deviation),
+                'calculate_and_display_average_price': (frames, dd.calculate_and_display_average_price),
+                'notify_if_strong_fluctuations': (frames, lambda data: dd.notify_if_strong_fluctuations(data, 10)),
+                'export_data_to_csv': (prepared, lambda data: dd.export_data_to_csv(
+                    data, os.path.join(directory, 'export.csv'))),
+                'create_and_save_plot': (prepared, lambda data: dplt.create_and_save_plot(
+                    data, 'BENCH', 'max', filename=os.path.join(directory, 'chart.png'))),
+                'create_interactive_plot': (prepared, lambda data: dplt.create_interactive_plot(
+                    data, 'BENCH', filename=os.path.join(directory, 'chart.html'))),
+            }
+            case = {}
+            for step in steps:
+                inputs, function = calls[step]
+                seconds = min(_run_step(function, inputs) for _ in range(repeat))
+                tracemalloc.start()
+                try:
+                    _run_step(function, inputs, min_seconds=0)
+                    peak = tracemalloc.get_traced_memory()[1]
+                finally:
+                    tracemalloc.stop()
+                case[step] = {'seconds': seconds, 'rows_per_sec': length * tickers / seconds, 'peak_bytes': peak}
+                logging.info(f"{length}x{tickers} {step}: {seconds:.4f} с, пик памяти {peak / 2 ** 20:.1f} МБ")
+            results[f"{length}x{tickers}"] = case
+    return results
+
+
+def save_baseline(results, filename):
+    """
+    Сохраняет результаты замеров как базовые в JSON.
+
+    :param results: Результат benchmark_pipeline.
+    :param filename: Имя файла базовых замеров.
+    """
+    baseline = {'version': BASELINE_VERSION, 'python': platform.python_version(), 'numpy': np.__version__,
+                'pandas': pd.__version__, 'results': results}
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump(baseline, f, ensure_ascii=False, indent=2)
+    logging.info(f"Базовые замеры сохранены в {filename}")
+
+
+def load_baseline(filename):
+    """
+    Загружает базовые замеры.
+
+    :param filename: Имя файла базовых замеров.
+    :return: Словарь результатов в формате benchmark_pipeline.
+    """
+    with open(filename, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline.get('version') != BASELINE_VERSION:
+        raise ValueError(f"Неподдерживаемая версия базовых замеров: {baseline.get('version')}")
+    return baseline['results']
+
+
+def compare_with_baseline(results, baseline, tolerance=0.5, memory_tolerance=0.25):
+    """
+    Сравнивает замеры с базовыми.
+
+    Замеры, которых нет в базовых, не проверяются.
+
+    :param results: Результат benchmark_pipeline.
+    :param baseline: Базовые замеры в том же формате.
+    :param tolerance: Допустимое относительное снижение пропускной способности (строк/с); время на общей
+                      машине колеблется сильнее пиковой памяти, поэтому допуск по умолчанию больше.
+    :param memory_tolerance: Допустимый относительный рост пиковой памяти.
+    :return: Список описаний регрессий (пустой, если регрессий нет).
+    """
+    regressions = []
+    for case, steps in results.items():
+        for step, result in steps.items():
+            expected = baseline.get(case, {}).get(step)
+            if expected is None:
+                continue
+            if result['rows_per_sec'] < expected['rows_per_sec'] * (1 - tolerance):
+                regressions.append(f"{case} {step}: {result['rows_per_sec']:.0f} строк/с "
+                                   f"(базовое {expected['rows_per_sec']:.0f})")
+            if result['peak_bytes'] > expected['peak_bytes'] * (1 + memory_tolerance):
+                regressions.append(f"{case} {step}: пик памяти {result['peak_bytes']} байт "
+                                   f"(базовое {expected['peak_bytes']})")
+    return regressions
+
+
+def _run_step(function, frames, min_seconds=MIN_STEP_SECONDS):
+    """
+    Выполняет шаг конвейера для копий кадров, повторяя его, пока суммарное время не достигнет min_seconds.
+
+    :return: Время одного прохода в секундах (без копирования кадров).
+    """
+    frames = [frame.copy() for frame in frames]
+    passes, seconds = 0, 0.0
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        while seconds < min_seconds or not passes:
+            started = time.perf_counter()
+            for frame in frames:
+                function(frame)
+            seconds += time.perf_counter() - started
+            passes += 1
+    return seconds / passes
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Замеры производительности.")
+    subparsers = parser.add_subparsers(dest='suite', required=True)
+    find_text_parser = subparsers.add_parser('find_text', help="Поиск по каталогу PriceMachine.")
+    find_text_parser.add_argument('--files', type=int, default=10)
+    find_text_parser.add_argument('--rows', type=int, default=10000, help="Число строк в каждом файле.")
+    load_parser = subparsers.add_parser('load_prices', help="Загрузка каталога PriceMachine.")
+    load_parser.add_argument('--files', type=int, default=10)
+    load_parser.add_argument('--rows', type=int, default=10000, help="Число строк в каждом файле.")
+    load_parser.add_argument('--workers', type=int, default=None, help="Число процессов.")
+    load_parser.add_argument('--snapshot', action='store_true', help="Замерить загрузку из снимка каталога.")
+    pipeline_parser = subparsers.add_parser('pipeline', help="Конвейер анализа акций на синтетических данных.")
+    pipeline_parser.add_argument('--bars', type=int, nargs='+', default=[1000, 100000],
+                                 help="Длины рядов (от 1000 до 10000000 баров).")
+    pipeline_parser.add_argument('--tickers', type=int, default=1, help="Число тикеров.")
+    pipeline_parser.add_argument('--repeat', type=int, default=3, help="Число повторов замера времени.")
+    pipeline_parser.add_argument('--no-plots', action='store_true', help="Не замерять построение графиков.")
+    pipeline_parser.add_argument('--baseline', default='benchmark_baseline.json', help="Файл базовых замеров.")
+    pipeline_parser.add_argument('--update-baseline', action='store_true', help="Сохранить замеры как базовые.")
+    pipeline_parser.add_argument('--tolerance', type=float, default=0.5,
+                                 help="Допустимое снижение пропускной способности (доля).")
+    pipeline_parser.add_argument('--memory-tolerance', type=float, default=0.25,
+                                 help="Допустимый рост пиковой памяти (доля).")
+    args = parser.parse_args()
+
+    if args.suite == 'find_text':
+        result = benchmark_find_text(args.files, args.rows)
+        print(f"Строк в каталоге: {result['rows']}, загрузка: {result['load']:.2f} с")
+        print(f"Линейный поиск:       {result['scan'] * 1000:.3f} мс на запрос")
+        print(f"Поиск по индексу:     {result['index'] * 1000:.3f} мс на запрос")
+        print(f"Повторный (LRU-кэш):  {result['index_cached'] * 1000:.3f} мс на запрос")
+    elif args.suite == 'load_prices':
+        result = benchmark_load_prices(args.files, args.rows, args.workers, args.snapshot)
+        for file_name, stats in result['files'].items():
+            print(f"{file_name: <16} {stats['rows']: >8} строк  {stats['rows_per_sec']: >10.0f} строк/с")
+        print(f"Всего {result['rows']} строк за {result['seconds']:.2f} с "
+              f"({result['rows'] / result['seconds']:.0f} строк/с)")
+        if args.snapshot:
+            print(f"Из снимка без изменений: {result['snapshot_unchanged']:.2f} с, "
+                  f"с одним измененным файлом: {result['snapshot_one_changed']:.2f} с")
+    elif args.suite == 'pipeline':
+        result = benchmark_pipeline(args.bars, args.tickers, args.repeat, not args.no_plots)
+        for case, steps in result.items():
+            for step, stats in steps.items():
+                print(f"{case: <14} {step: <38} {stats['seconds'] * 1000: >10.2f} мс "
+                      f"{stats['rows_per_sec']: >14.0f} строк/с {stats['peak_bytes'] / 2 ** 20: >8.1f} МБ")
+        if args.update_baseline or not os.path.exists(args.baseline):
+            save_baseline(result, args.baseline)
+        else:
+            regressions = compare_with_baseline(result, load_baseline(args.baseline), args.tolerance,
+                                                args.memory_tolerance)
+            for regression in regressions:
+                print(f"Регрессия: {regression}")
+            if regressions:
+                sys.exit(1)
+            print("Регрессий относительно базовых замеров нет")
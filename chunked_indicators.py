@@ -0,0 +1,220 @@
+import math
+import time
+import logging
+import argparse
+import numpy as np
+import pandas as pd
+import indicators as ind
+import data_export as de
+from instrumentation import instrumented
+
+# Настройка логирования
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Число баров в одной части по умолчанию: около 100 МБ на часть с исходными столбцами и индикаторами
+CHUNK_ROWS = 1000000
+# После стольких весов (1 - alpha) подряд вес прежнего значения EMA становится нулем в float64
+EMA_UNDERFLOW = 1100
+
+
+class ChunkedIndicators():
+    """
+    Расчет индикаторов по длинному ряду последовательными частями.
+
+    Каждая часть считается векторизованными функциями модуля indicators.
+    Для скользящих окон (sma, std, rsi) перед частью добавляются последние
+    цены закрытия предыдущей части (перекрытие длиной в наибольшее окно),
+    для EMA и MACD переносится последнее значение EMA и число пропусков
+    после последнего наблюдения. Результаты совпадают с расчетом по всему
+    ряду (indicators.compute_indicators), а память ограничена размером части.
+    """
+
+    def __init__(self, spec=None):
+        """
+        :param spec: Список описаний индикаторов (по умолчанию indicators.DEFAULT_INDICATORS).
+        """
+        self.spec = [dict(item) for item in (spec if spec is not None else ind.DEFAULT_INDICATORS)]
+        self.names = [name for item in self.spec for name in ind.column_names(item)]
+        if len(set(self.names)) != len(self.names):
+            raise ValueError(f"Повторяющиеся имена столбцов индикаторов: {self.names}")
+        self.overlap = max([_overlap(item) for item in self.spec] + [0])
+        self.rows = 0
+        self._tail = np.empty(0)
+        self._emas = {}
+
+    def process(self, data):
+        """
+        Рассчитывает индикаторы для очередной части ряда.
+
+        :param data: DataFrame с очередной частью ряда (столбец 'Close').
+        :return: DataFrame с индикаторами и тем же индексом, что у data.
+        """
+        close = np.ascontiguousarray(data['Close'].to_numpy(dtype=np.float64))
+        extended = np.concatenate((self._tail, close))
+        offset = len(self._tail)
+        out = np.empty((len(self.names), len(close)))
+        engine = _ChunkEngine(extended, offset, close, self._emas)
+        row = 0
+        for item in self.spec:
+            for values in engine.compute(item):
+                out[row] = values
+                row += 1
+        self._emas.update(engine.carries)
+        self._tail = extended[len(extended) - min(self.overlap, len(extended)):].copy()
+        self.rows += len(close)
+        return pd.DataFrame(out.T, index=data.index, columns=self.names)
+
+    def snapshot(self):
+        """
+        Сохраняет состояние в словарь, пригодный для сериализации в JSON.
+
+        :return: Словарь с описанием индикаторов, перекрытием и состоянием EMA.
+        """
+        return {
+            'spec': self.spec,
+            'rows': self.rows,
+            'tail': self._tail.tolist(),
+            'emas': [[key, value, gap] for key, (value, gap) in self._emas.items()],
+        }
+
+    @classmethod
+    def restore(cls, snapshot):
+        """
+        Восстанавливает расчет из снимка состояния, чтобы продолжить ряд.
+
+        :param snapshot: Словарь, полученный методом snapshot().
+        :return: Экземпляр ChunkedIndicators.
+        """
+        chunked = cls(snapshot['spec'])
+        chunked.rows = snapshot['rows']
+        chunked._tail = np.asarray(snapshot['tail'], dtype=np.float64)
+        chunked._emas = {key: (value, gap) for key, value, gap in snapshot['emas']}
+        return chunked
+
+
+@instrumented(rows=lambda result, *args, **kwargs: result['rows'])
+def process_history(source, output, spec=None, chunk_rows=CHUNK_ROWS, file_format=None, compression='zstd',
+                    downcast=True, state=None):
+    """
+    Рассчитывает индикаторы по длинному ряду частями и записывает результат на диск.
+
+    В памяти одновременно находятся только одна часть исходных данных и
+    ее индикаторы, поэтому пиковая память не зависит от длины ряда.
+
+    :param source: Имя файла Parquet, Feather или CSV (или каталога с частями Parquet) либо итерируемый набор
+                   DataFrame с последовательными частями ряда.
+    :param output: Имя файла результата (Parquet, Feather или CSV): исходные столбцы и столбцы индикаторов.
+    :param spec: Список описаний индикаторов (по умолчанию indicators.DEFAULT_INDICATORS).
+    :param chunk_rows: Число строк в части при чтении из файла.
+    :param file_format: Формат результата (по умолчанию по расширению файла).
+    :param compression: Сжатие для Parquet и Feather.
+    :param downcast: Хранить столбцы индикаторов во float32.
+    :param state: Снимок ChunkedIndicators.snapshot() для продолжения ряда, рассчитанного ранее.
+    :return: Словарь {'rows', 'chunks', 'seconds', 'state'}, где state - снимок состояния после последней части.
+    """
+    chunked = ChunkedIndicators.restore(state) if state is not None else ChunkedIndicators(spec)
+    chunks = de.iter_data(source, chunk_rows) if isinstance(source, str) else source
+    logging.info(f"Расчет индикаторов по частям с записью в {output}")
+    started = time.perf_counter()
+    rows = count = 0
+    with de.ChunkedExporter(output, file_format, compression, downcast) as exporter:
+        for data in chunks:
+            indicators = chunked.process(data)
+            exporter.write(pd.concat([data.drop(columns=indicators.columns, errors='ignore'), indicators], axis=1))
+            rows += len(data)
+            count += 1
+    seconds = time.perf_counter() - started
+    logging.info(f"Обработано {rows} строк в {count} частях за {seconds:.2f} с")
+    return {'rows': rows, 'chunks': count, 'seconds': seconds, 'state': chunked.snapshot()}
+
+
+class _ChunkEngine():
+    """
+    Вычислитель индикаторов одной части с кэшем общих промежуточных результатов.
+
+    Скользящие окна считаются по ценам с перекрытием (extended), EMA - по
+    ценам части с переносом состояния из carried.
+    """
+
+    def __init__(self, extended, offset, close, carried):
+        self.extended = extended
+        self.offset = offset
+        self.close = close
+        self.carried = carried
+        self.carries = {}
+        self._cache = {}
+
+    def compute(self, item):
+        kind = item['kind']
+        if kind == 'sma':
+            window = item.get('window_size', 5)
+            return [ind.rolling_sum(self.extended, window)[self.offset:] / window]
+        if kind == 'std':
+            return [np.sqrt(ind.rolling_var(self.extended, item.get('window', 20))[self.offset:])]
+        if kind == 'rsi':
+            window = item.get('window', 14)
+            delta = np.diff(self.extended, prepend=np.nan)
+            # Как и в calculate_rsi, пропуски в разностях считаются нулевым изменением
+            gain = ind.rolling_sum(np.fmax(delta, 0.0), window)[self.offset:]
+            loss = ind.rolling_sum(np.fmax(-delta, 0.0), window)[self.offset:]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                return [100 - (100 / (1 + gain / loss))]
+        if kind == 'ema':
+            return [self.ema(('ema', item['span']), self.close, item['span'])]
+        if kind == 'macd':
+            short_window, long_window = item.get('short_window', 12), item.get('long_window', 26)
+            signal_window = item.get('signal_window', 9)
+            ema_short = self.ema(('ema', short_window), self.close, short_window)
+            ema_long = self.ema(('ema', long_window), self.close, long_window)
+            macd = ema_short - ema_long
+            signal = self.ema(('signal', short_window, long_window, signal_window), macd, signal_window)
+            return [ema_short, ema_long, macd, signal]
+        raise ValueError(f"Неизвестный индикатор: {kind}")
+
+    def ema(self, key, values, span):
+        """
+        Продолжает EMA с учетом значения и числа пропусков, перенесенных из предыдущей части.
+        """
+        key = ':'.join(map(str, key))
+        if key in self._cache:
+            return self._cache[key]
+        value, gap = self.carried.get(key, (math.nan, 0))
+        # Прежнее значение EMA и пропуски после него воспроизводят вес прежнего значения в рекурсии pandas
+        prefix = [] if math.isnan(value) else [value] + [math.nan] * min(gap, _ema_gap_limit(span))
+        result = ind.ema(np.concatenate((prefix, values)), span)[len(prefix):]
+        observed = np.flatnonzero(~np.isnan(values))
+        if len(observed):
+            self.carries[key] = (float(result[-1]), len(values) - 1 - int(observed[-1]))
+        elif not math.isnan(value):
+            self.carries[key] = (value, gap + len(values))
+        self._cache[key] = result
+        return result
+
+
+def _overlap(item):
+    """
+    Число последних цен предыдущей части, нужных для продолжения скользящего окна индикатора.
+    """
+    kind = item['kind']
+    if kind == 'sma':
+        return item.get('window_size', 5) - 1
+    if kind == 'std':
+        return item.get('window', 20) - 1
+    if kind == 'rsi':
+        return item.get('window', 14)
+    return 0
+
+
+def _ema_gap_limit(span):
+    # Дальше вес прежнего значения в рекурсии уже равен нулю, и длинные пропуски можно не повторять
+    return int(EMA_UNDERFLOW / -math.log1p(-2.0 / (span + 1.0))) + 1
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Расчет индикаторов по длинному ряду частями с записью на диск.")
+    parser.add_argument('source', help="Файл с историческими данными (Parquet, Feather или CSV).")
+    parser.add_argument('output', help="Файл результата (Parquet, Feather или CSV).")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS, help="Число строк в части.")
+    args = parser.parse_args()
+    result = process_history(args.source, args.output, chunk_rows=args.chunk_rows)
+    print(f"Обработано {result['rows']} строк в {result['chunks']} частях за {result['seconds']:.2f} с")
@@ -0,0 +1,224 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+import pandas as pd
+
+# Настройка логирования
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Смещения для периодов yfinance, по которым обрезается окно кэшированных данных
+PERIOD_OFFSETS = {
+    '1d': pd.DateOffset(days=1),
+    '5d': pd.DateOffset(days=5),
+    '1mo': pd.DateOffset(months=1),
+    '3mo': pd.DateOffset(months=3),
+    '6mo': pd.DateOffset(months=6),
+    '1y': pd.DateOffset(years=1),
+    '2y': pd.DateOffset(years=2),
+    '5y': pd.DateOffset(years=5),
+    '10y': pd.DateOffset(years=10),
+}
+
+INDEX_FILE = 'index.json'
+
+
+class StockDataCache():
+    """
+    Локальный кэш исторических данных (OHLCV) на диске.
+
+    Данные хранятся в колоночном формате (Parquet или Feather), ключ записи -
+    тикер, интервал и диапазон дат (период или даты начала и окончания).
+    При повторном запросе догружаются только бары новее последнего сохраненного.
+    """
+
+    def __init__(self, cache_dir='.stock_cache', ttl=24 * 3600, max_bytes=512 * 1024 * 1024,
+                 refresh_interval=60, file_format='parquet'):
+        """
+        :param cache_dir: Каталог для хранения кэша.
+        :param ttl: Время жизни записи в секундах от ее полной загрузки (догрузка новых баров его не продлевает);
+                    устаревшие записи удаляются и загружаются заново, в том числе с пересчитанной
+                    после сплитов и дивидендов историей.
+        :param max_bytes: Максимальный размер кэша в байтах; при превышении удаляются давно не использованные записи.
+        :param refresh_interval: Интервал в секундах, в течение которого запись отдается без обращения к источнику.
+        :param file_format: Формат хранения: 'parquet' или 'feather'.
+        """
+        if file_format not in ('parquet', 'feather'):
+            raise ValueError(f"Неподдерживаемый формат кэша: {file_format}")
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.refresh_interval = refresh_interval
+        self.file_format = file_format
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.index = self._load_index()
+        # Индекс разделяется между потоками пакетной загрузки (data_download.fetch_many)
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def make_key(ticker, interval='1d', period=None, start_date=None, end_date=None):
+        """
+        Формирует ключ записи кэша.
+
+        :param ticker: Символ акции.
+        :param interval: Интервал баров (например, '1d', '1m').
+        :param period: Период данных.
+        :param start_date: Дата начала.
+        :param end_date: Дата окончания.
+        :return: Строковый ключ.
+        """
+        if period:
+            return f"{ticker.upper()}|{interval}|period={period}"
+        return f"{ticker.upper()}|{interval}|{start_date}..{end_date}"
+
+    def fetch(self, stock, ticker, period=None, start_date=None, end_date=None, interval='1d'):
+        """
+        Возвращает данные из кэша, при необходимости догружая новые бары из источника.
+
+        :param stock: Объект с методом history() (например, yf.Ticker).
+        :param ticker: Символ акции.
+        :param period: Период данных.
+        :param start_date: Дата начала (в формате YYYY-MM-DD).
+        :param end_date: Дата окончания (в формате YYYY-MM-DD).
+        :param interval: Интервал баров.
+        :return: DataFrame с историческими данными.
+        """
+        key = self.make_key(ticker, interval, period, start_date, end_date)
+        self.evict()
+        entry = self.index.get(key)
+        now = time.time()
+        cached = self._read(entry) if entry is not None else None
+
+        if cached is None or cached.empty:
+            logging.info(f"Кэш: нет данных для {key}, полная загрузка")
+            data = self._download(stock, period, start_date, end_date, interval)
+        elif entry['final'] or now - entry['updated'] < self.refresh_interval:
+            logging.info(f"Кэш: данные для {key} взяты из кэша")
+            # Время обращения сохраняется на диск вместе со следующей записью или вытеснением,
+            # чтобы чтение из кэша не перезаписывало индекс
+            with self._lock:
+                entry['accessed'] = now
+            return cached
+        else:
+            last_date = cached.index[-1]
+            logging.info(f"Кэш: догрузка данных для {key} начиная с {last_date}")
+            if period:
+                new_data = stock.history(start=last_date, interval=interval)
+            else:
+                new_data = stock.history(start=last_date, end=end_date, interval=interval)
+            data = pd.concat([cached, new_data]) if not new_data.empty else cached
+            data = data[~data.index.duplicated(keep='last')].sort_index()
+            if period in PERIOD_OFFSETS:
+                data = data[data.index >= data.index[-1] - PERIOD_OFFSETS[period]]
+            elif period == 'ytd':
+                data = data[data.index.year == data.index[-1].year]
+
+        if not data.empty:
+            self._store(key, data, final=self._is_final(period, end_date))
+        return data
+
+    def evict(self):
+        """
+        Удаляет записи, полностью загруженные более ttl назад, а затем давно не использованные записи,
+        пока размер кэша превышает max_bytes.
+
+        :return: Количество удаленных записей.
+        """
+        with self._lock:
+            now = time.time()
+            removed = 0
+            for key, entry in list(self.index.items()):
+                if now - entry['created'] > self.ttl:
+                    self._remove(key)
+                    removed += 1
+            total = sum(entry['size'] for entry in self.index.values())
+            for key, entry in sorted(self.index.items(), key=lambda item: item[1]['accessed']):
+                if total <= self.max_bytes:
+                    break
+                total -= entry['size']
+                self._remove(key)
+                removed += 1
+            if removed:
+                logging.info(f"Кэш: удалено {removed} записей")
+                self._save_index()
+            return removed
+
+    def clear(self):
+        """
+        Полностью очищает кэш.
+        """
+        with self._lock:
+            for key in list(self.index):
+                self._remove(key)
+            self._save_index()
+
+    @staticmethod
+    def _download(stock, period, start_date, end_date, interval):
+        if period:
+            return stock.history(period=period, interval=interval)
+        return stock.history(start=start_date, end=end_date, interval=interval)
+
+    @staticmethod
+    def _is_final(period, end_date):
+        # Диапазон, полностью лежащий в прошлом, больше не меняется и не требует догрузки
+        if period or not end_date:
+            return False
+        return pd.Timestamp(end_date).date() < pd.Timestamp.now().date()
+
+    def _path(self, key):
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.{self.file_format}")
+
+    def _read(self, entry):
+        path = os.path.join(self.cache_dir, entry['file'])
+        if not os.path.exists(path):
+            return None
+        if self.file_format == 'parquet':
+            return pd.read_parquet(path)
+        data = pd.read_feather(path)
+        data = data.set_index(data.columns[0])
+        if data.index.name == 'index':
+            data.index.name = None
+        return data
+
+    def _store(self, key, data, final=False):
+        path = self._path(key)
+        if self.file_format == 'parquet':
+            data.to_parquet(path)
+        else:
+            data.reset_index().to_feather(path)
+        with self._lock:
+            now = time.time()
+            previous = self.index.get(key)
+            self.index[key] = {
+                'file': os.path.basename(path),
+                'created': previous['created'] if previous else now,
+                'updated': now,
+                'accessed': now,
+                'size': os.path.getsize(path),
+                'final': final,
+            }
+            self._save_index()
+            self.evict()
+
+    def _remove(self, key):
+        entry = self.index.pop(key)
+        path = os.path.join(self.cache_dir, entry['file'])
+        if os.path.exists(path):
+            os.remove(path)
+
+    def _load_index(self):
+        path = os.path.join(self.cache_dir, INDEX_FILE)
+        if not os.path.exists(path):
+            return {}
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _save_index(self):
+        # Индекс записывается во временный файл и подменяется целиком: прерванная запись не портит индекс
+        path = os.path.join(self.cache_dir, INDEX_FILE)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(self.index, f)
+        os.replace(path + '.tmp', path)
@@ -1,11 +1,16 @@
 import yfinance as yf
 import pandas as pd
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from instrumentation import instrumented
+from alerts import summary_stats
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def fetch_stock_data(ticker, period=None, start_date=None, end_date=None):
+@instrumented()
+def fetch_stock_data(ticker, period=None, start_date=None, end_date=None, interval='1d', cache=None, provider=None):
     """
     Загружает исторические данные акций с Yahoo Finance.
 
@@ -13,19 +18,101 @@ def fetch_stock_data(ticker, period=None, start_date=None, end_date=None):
     :param period: Период данных (например, '1mo' для одного месяца).
     :param start_date: Дата начала (в формате YYYY-MM-DD).
     :param end_date: Дата окончания (в формате YYYY-MM-DD).
+    :param interval: Интервал баров (например, '1d' или '1m').
+    :param cache: Экземпляр data_cache.StockDataCache для повторного использования загруженных данных.
+    :param provider: Фабрика объектов с методом history() вместо yf.Ticker (например, заглушка для тестов).
     :return: DataFrame с историческими данными.
     """
     logging.info(f"Загрузка данных для тикера {ticker}")
-    stock = yf.Ticker(ticker)
-    if period:
-        data = stock.history(period=period)
-    elif start_date and end_date:
-        data = stock.history(start=start_date, end=end_date)
-    else:
+    stock = (provider or yf.Ticker)(ticker)
+    if not period and not (start_date and end_date):
         raise ValueError("Необходимо указать либо период, либо даты начала и окончания.")
+    if cache is not None:
+        data = cache.fetch(stock, ticker, period=period, start_date=start_date, end_date=end_date, interval=interval)
+    elif period:
+        data = stock.history(period=period, interval=interval)
+    else:
+        data = stock.history(start=start_date, end=end_date, interval=interval)
     logging.info(f"Данные для тикера {ticker} успешно загружены")
     return data
 
+def _fetched_rows(result, *args, **kwargs):
+    """
+    Число строк, загруженных fetch_many (для метрик этапа).
+    """
+    return len(result) if isinstance(result, pd.DataFrame) else sum(len(data) for data in result.values())
+
+@instrumented(rows=_fetched_rows)
+def fetch_many(tickers, period=None, start_date=None, end_date=None, interval='1d', max_workers=8,
+               retries=3, backoff=1.0, as_frame=False, cache=None, provider=None, errors=None):
+    """
+    Загружает исторические данные для нескольких тикеров параллельно в ограниченном пуле потоков.
+
+    Ошибка загрузки одного тикера не прерывает остальные: после исчерпания попыток
+    тикер пропускается, а ошибка записывается в errors.
+
+    :param tickers: Список символов акций.
+    :param period: Период данных (например, '1mo' для одного месяца).
+    :param start_date: Дата начала (в формате YYYY-MM-DD).
+    :param end_date: Дата окончания (в формате YYYY-MM-DD).
+    :param interval: Интервал баров.
+    :param max_workers: Максимальное число одновременных загрузок.
+    :param retries: Число попыток загрузки одного тикера.
+    :param backoff: Базовая задержка в секундах между попытками (удваивается с каждой попыткой).
+    :param as_frame: Вернуть один DataFrame с MultiIndex (тикер, дата) вместо словаря.
+    :param cache: Экземпляр data_cache.StockDataCache.
+    :param provider: Фабрика объектов с методом history() вместо yf.Ticker.
+    :param errors: Словарь, в который записываются ошибки по тикерам.
+    :return: Словарь {тикер: DataFrame} или DataFrame с MultiIndex (тикер, дата).
+    """
+    if not period and not (start_date and end_date):
+        raise ValueError("Необходимо указать либо период, либо даты начала и окончания.")
+    if retries < 1:
+        raise ValueError("Число попыток должно быть не меньше 1.")
+    tickers = list(dict.fromkeys(tickers))
+    logging.info(f"Загрузка данных для {len(tickers)} тикеров в {max_workers} потоков")
+    results = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(_fetch_with_retries, ticker, period, start_date, end_date, interval,
+                            retries, backoff, cache, provider): ticker
+            for ticker in tickers
+        }
+        for future in as_completed(futures):
+            ticker = futures[future]
+            try:
+                results[ticker] = future.result()
+            except Exception as e:
+                logging.error(f"Не удалось загрузить данные для тикера {ticker}: {e}")
+                if errors is not None:
+                    errors[ticker] = e
+    results = {ticker: results[ticker] for ticker in tickers if ticker in results}
+    logging.info(f"Загружены данные для {len(results)} из {len(tickers)} тикеров")
+    if as_frame:
+        if not results:
+            return pd.DataFrame()
+        return pd.concat(results, names=['Ticker'])
+    return results
+
+def _fetch_with_retries(ticker, period, start_date, end_date, interval, retries, backoff, cache, provider):
+    """
+    Загружает данные одного тикера, повторяя попытки с экспоненциальной задержкой.
+    """
+    for attempt in range(retries):
+        try:
+            data = fetch_stock_data(ticker, period=period, start_date=start_date, end_date=end_date,
+                                    interval=interval, cache=cache, provider=provider)
+            if data.empty:
+                raise ValueError(f"Нет данных для тикера {ticker}")
+            return data
+        except Exception as e:
+            if attempt == retries - 1:
+                raise
+            delay = backoff * 2 ** attempt
+            logging.warning(f"Попытка {attempt + 1} загрузки {ticker} не удалась ({e}), повтор через {delay:.1f} с")
+            time.sleep(delay)
+
+@instrumented(rows='data')
 def add_moving_average(data, window_size=5):
     """
     Добавляет скользящее среднее к данным.
@@ -39,6 +126,7 @@ def add_moving_average(data, window_size=5):
     logging.info("Скользящее среднее успешно добавлено")
     return data
 
+@instrumented(rows='data')
 def calculate_rsi(data, window=14):
     """
     Рассчитывает индекс относительной силы (RSI).
@@ -56,6 +144,7 @@ def calculate_rsi(data, window=14):
     logging.info("RSI успешно рассчитан")
     return data
 
+@instrumented(rows='data')
 def calculate_macd(data, short_window=12, long_window=26, signal_window=9):
     """
     Рассчитывает индикатор MACD.
@@ -75,31 +164,33 @@ def calculate_macd(data, short_window=12, long_window=26, signal_window=9):
     logging.info("MACD успешно рассчитан")
     return data
 
-def calculate_and_display_average_price(data):
+@instrumented(rows='data')
+def calculate_and_display_average_price(data, stats=None):
     """
     Вычисляет и выводит среднюю цену закрытия за период.
 
     :param data: DataFrame с историческими данными.
+    :param stats: Сводка alerts.summary_stats(data), если уже рассчитана.
     """
     if 'Close' in data.columns:
-        average_price = data['Close'].mean()
+        average_price = (stats or summary_stats(data))['mean']
         logging.info(f"Средняя цена закрытия за период: {average_price:.2f}")
         print(f"Средняя цена закрытия за период: {average_price:.2f}")
     else:
         logging.warning("Столбец 'Close' отсутствует в данных.")
         print("Столбец 'Close' отсутствует в данных.")
 
-def notify_if_strong_fluctuations(data, threshold):
+@instrumented(rows='data')
+def notify_if_strong_fluctuations(data, threshold, stats=None):
     """
     Уведомляет пользователя, если цена акций колебалась более чем на заданный процент за период.
 
     :param data: DataFrame с историческими данными.
     :param threshold: Порог колебаний в процентах.
+    :param stats: Сводка alerts.summary_stats(data), если уже рассчитана.
     """
     if 'Close' in data.columns:
-        max_price = data['Close'].max()
-        min_price = data['Close'].min()
-        fluctuation = (max_price - min_price) / min_price * 100
+        fluctuation = (stats or summary_stats(data))['fluctuation']
         if fluctuation > threshold:
             logging.warning(f"Внимание! Сильные колебания цены: {fluctuation:.2f}% (порог: {threshold}%)")
             print(f"Внимание! Сильные колебания цены: {fluctuation:.2f}% (порог: {threshold}%)")
@@ -110,6 +201,7 @@ def notify_if_strong_fluctuations(data, threshold):
         logging.warning("Столбец 'Close' отсутствует в данных.")
         print("Столбец 'Close' отсутствует в данных.")
 
+@instrumented(rows='data')
 def export_data_to_csv(data, filename):
     """
     Экспортирует данные в CSV файл.
@@ -121,6 +213,7 @@ def export_data_to_csv(data, filename):
     data.to_csv(filename)
     logging.info(f"Данные успешно экспортированы в файл {filename}")
 
+@instrumented(rows='data')
 def calculate_standard_deviation(data):
     """
     Рассчитывает стандартное отклонение цены закрытия.
@@ -0,0 +1,251 @@
+import os
+import glob
+import logging
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+# Настройка логирования
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Исходные столбцы yfinance; остальные столбцы считаются производными индикаторами
+BASE_COLUMNS = ('Open', 'High', 'Low', 'Close', 'Volume', 'Dividends', 'Stock Splits')
+
+FORMATS = {
+    '.parquet': 'parquet',
+    '.feather': 'feather',
+    '.csv': 'csv',
+}
+
+
+def export_data(data, filename, file_format=None, compression='zstd', downcast=True, append=False, chunksize=None):
+    """
+    Экспортирует данные в Parquet, Feather или CSV.
+
+    В отличие от export_data_to_csv, Parquet и Feather сохраняют типы и индекс
+    с часовым поясом, поэтому при загрузке не нужен разбор дат.
+
+    :param data: DataFrame с историческими данными.
+    :param filename: Имя файла (для дозаписи в Parquet - имя каталога с частями).
+    :param file_format: 'parquet', 'feather' или 'csv' (по умолчанию по расширению файла).
+    :param compression: Сжатие для Parquet и Feather (например, 'zstd', 'lz4', None).
+    :param downcast: Хранить производные столбцы индикаторов во float32.
+    :param append: Дописать данные: для CSV - в конец файла, для Parquet - новой частью в каталог.
+    :param chunksize: Число строк, записываемых в CSV за раз.
+    :return: Имя записанного файла.
+    """
+    file_format = file_format or _detect_format(filename)
+    logging.info(f"Экспорт данных в файл {filename} (формат {file_format})")
+    if downcast:
+        data = downcast_indicators(data)
+    if file_format == 'csv':
+        header = not (append and os.path.exists(filename))
+        data.to_csv(filename, mode='a' if append else 'w', header=header, chunksize=chunksize)
+    elif file_format == 'parquet':
+        table = pa.Table.from_pandas(data, preserve_index=True)
+        if append:
+            os.makedirs(filename, exist_ok=True)
+            part = len(glob.glob(os.path.join(filename, 'part-*.parquet')))
+            pq.write_table(table, os.path.join(filename, f"part-{part:05d}.parquet"), compression=compression)
+        else:
+            pq.write_table(table, filename, compression=compression)
+    elif file_format == 'feather':
+        if append:
+            raise ValueError("Дозапись в Feather не поддерживается, используйте ChunkedExporter")
+        table = pa.Table.from_pandas(data, preserve_index=True)
+        feather.write_feather(table, filename, compression=compression or 'uncompressed')
+    else:
+        raise ValueError(f"Неподдерживаемый формат экспорта: {file_format}")
+    logging.info(f"Данные успешно экспортированы в файл {filename}")
+    return filename
+
+
+def load_data(filename, columns=None, file_format=None):
+    """
+    Загружает данные, сохраненные export_data или ChunkedExporter.
+
+    Для Parquet и Feather индекс восстанавливается вместе с часовым поясом без
+    разбора строк. Для CSV даты разбираются и приводятся к UTC.
+
+    :param filename: Имя файла или каталога с частями Parquet.
+    :param columns: Список загружаемых столбцов (по умолчанию все).
+    :param file_format: 'parquet', 'feather' или 'csv' (по умолчанию по расширению файла).
+    :return: DataFrame с историческими данными.
+    """
+    file_format = file_format or _detect_format(filename)
+    logging.info(f"Загрузка данных из файла {filename}")
+    if file_format == 'parquet':
+        if os.path.isdir(filename):
+            parts = sorted(glob.glob(os.path.join(filename, 'part-*.parquet')))
+            return pd.concat([_read_parquet(part, columns) for part in parts])
+        return _read_parquet(filename, columns)
+    if file_format == 'feather':
+        with pa.memory_map(filename) as source:
+            schema = pa.ipc.open_file(source).schema
+        return feather.read_table(filename, columns=_with_index_columns(schema, columns), memory_map=True).to_pandas()
+    if file_format == 'csv':
+        data = pd.read_csv(filename, index_col=0, usecols=_csv_usecols(filename, columns))
+        data.index = pd.to_datetime(data.index, utc=True)
+        return data
+    raise ValueError(f"Неподдерживаемый формат загрузки: {file_format}")
+
+
+def iter_data(filename, chunk_rows=1000000, columns=None, file_format=None):
+    """
+    Читает данные, сохраненные export_data или ChunkedExporter, частями.
+
+    В памяти одновременно находится не больше одной части: Parquet читается
+    пакетами строк, Feather отображается в память и нарезается по пакетам
+    записей, CSV читается по chunk_rows строк.
+
+    :param filename: Имя файла или каталога с частями Parquet.
+    :param chunk_rows: Максимальное число строк в части.
+    :param columns: Список загружаемых столбцов (по умолчанию все).
+    :param file_format: 'parquet', 'feather' или 'csv' (по умолчанию по расширению файла).
+    :return: Генератор DataFrame с очередными частями ряда.
+    """
+    file_format = file_format or _detect_format(filename)
+    logging.info(f"Чтение данных из файла {filename} частями по {chunk_rows} строк")
+    if file_format == 'parquet':
+        parts = sorted(glob.glob(os.path.join(filename, 'part-*.parquet'))) if os.path.isdir(filename) else [filename]
+        for part in parts:
+            parquet_file = pq.ParquetFile(part)
+            schema = parquet_file.schema_arrow
+            for batch in parquet_file.iter_batches(batch_size=chunk_rows,
+                                                   columns=_with_index_columns(schema, columns)):
+                yield pa.Table.from_batches([batch]).replace_schema_metadata(schema.metadata).to_pandas()
+    elif file_format == 'feather':
+        with pa.memory_map(filename) as source:
+            reader = pa.ipc.open_file(source)
+            names = _with_index_columns(reader.schema, columns)
+            for number in range(reader.num_record_batches):
+                batch = reader.get_batch(number)
+                if names is not None:
+                    batch = batch.select(names)
+                for start in range(0, batch.num_rows, chunk_rows):
+                    table = pa.Table.from_batches([batch.slice(start, chunk_rows)])
+                    yield table.replace_schema_metadata(reader.schema.metadata).to_pandas()
+    elif file_format == 'csv':
+        for data in pd.read_csv(filename, index_col=0, chunksize=chunk_rows, usecols=_csv_usecols(filename, columns)):
+            data.index = pd.to_datetime(data.index, utc=True)
+            yield data
+    else:
+        raise ValueError(f"Неподдерживаемый формат загрузки: {file_format}")
+
+
+class ChunkedExporter():
+    """
+    Последовательная запись длинного ряда частями в один файл.
+
+    Parquet пишется группами строк, Feather - пакетами записей Arrow, CSV - дозаписью.
+    Схема определяется первой частью, последующие части приводятся к ней.
+    """
+
+    def __init__(self, filename, file_format=None, compression='zstd', downcast=True):
+        """
+        :param filename: Имя файла.
+        :param file_format: 'parquet', 'feather' или 'csv' (по умолчанию по расширению файла).
+        :param compression: Сжатие для Parquet и Feather.
+        :param downcast: Хранить производные столбцы индикаторов во float32.
+        """
+        self.filename = filename
+        self.file_format = file_format or _detect_format(filename)
+        if self.file_format not in ('parquet', 'feather', 'csv'):
+            raise ValueError(f"Неподдерживаемый формат экспорта: {self.file_format}")
+        self.compression = compression
+        self.downcast = downcast
+        self.rows = 0
+        self._writer = None
+        self._sink = None
+        self._schema = None
+
+    def write(self, data):
+        """
+        Дописывает очередную часть данных.
+
+        :param data: DataFrame с очередной частью ряда.
+        """
+        if self.downcast:
+            data = downcast_indicators(data)
+        if self.file_format == 'csv':
+            data.to_csv(self.filename, mode='w' if self.rows == 0 else 'a', header=self.rows == 0)
+        else:
+            table = pa.Table.from_pandas(data, preserve_index=True)
+            if self._writer is None:
+                self._schema = table.schema
+                self._open_writer()
+            else:
+                table = table.cast(self._schema)
+            self._writer.write_table(table)
+        self.rows += len(data)
+
+    def close(self):
+        """
+        Завершает запись файла.
+        """
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if self._sink is not None:
+            self._sink.close()
+            self._sink = None
+        logging.info(f"В файл {self.filename} записано {self.rows} строк")
+
+    def _open_writer(self):
+        if self.file_format == 'parquet':
+            self._writer = pq.ParquetWriter(self.filename, self._schema, compression=self.compression)
+        else:
+            self._sink = pa.OSFile(self.filename, 'wb')
+            options = pa.ipc.IpcWriteOptions(compression=self.compression)
+            self._writer = pa.ipc.new_file(self._sink, self._schema, options=options)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def downcast_indicators(data):
+    """
+    Приводит производные столбцы индикаторов к float32.
+
+    :param data: DataFrame с историческими данными.
+    :return: DataFrame, в котором столбцы вне BASE_COLUMNS типа float64 заменены на float32.
+    """
+    columns = [column for column in data.columns
+               if column not in BASE_COLUMNS and data[column].dtype == np.float64]
+    if not columns:
+        return data
+    return data.astype({column: np.float32 for column in columns})
+
+
+def _read_parquet(filename, columns):
+    schema = pq.read_schema(filename)
+    return pq.read_table(filename, columns=_with_index_columns(schema, columns)).to_pandas()
+
+
+def _with_index_columns(schema, columns):
+    # При выборе столбцов Arrow не добавляет сохраненный индекс сам
+    if columns is None:
+        return None
+    metadata = schema.pandas_metadata or {}
+    index_columns = [name for name in metadata.get('index_columns', []) if isinstance(name, str)]
+    return index_columns + [column for column in columns if column not in index_columns]
+
+
+def _csv_usecols(filename, columns):
+    # pandas не принимает номер столбца индекса вместе с именами, поэтому имя индекса читается из заголовка
+    if columns is None:
+        return None
+    index_column = pd.read_csv(filename, nrows=0).columns[0]
+    return [index_column] + [column for column in columns if column != index_column]
+
+
+def _detect_format(filename):
+    extension = os.path.splitext(filename)[1].lower()
+    if extension not in FORMATS:
+        raise ValueError(f"Не удалось определить формат по имени файла: {filename}")
+    return FORMATS[extension]
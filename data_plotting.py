@@ -1,12 +1,26 @@
 import matplotlib.pyplot as plt
+import matplotlib.dates as mdates
+import matplotlib.style as mstyle
+import numpy as np
 import pandas as pd
 import logging
+import os
+import html
+import time
+import tempfile
 import plotly.graph_objs as go
+import plotly.io as pio
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from instrumentation import instrumented
+from alerts import summary_stats
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def create_and_save_plot(data, ticker, period, filename=None, style='default'):
+@instrumented(rows='data')
+def create_and_save_plot(data, ticker, period, filename=None, style='default', renderer=None):
     """
     Создает и сохраняет график цены акций, скользящего среднего, RSI, MACD и стандартного отклонения.
 
@@ -15,7 +29,11 @@ def create_and_save_plot(data, ticker, period, filename=None, style='default'):
     :param period: Период данных.
     :param filename: Имя файла для сохранения графика.
     :param style: Стиль оформления графика (например, 'seaborn', 'ggplot', 'default').
+    :param renderer: Экземпляр BatchPlotRenderer для пакетной отрисовки с переиспользованием фигуры.
     """
+    if renderer is not None:
+        return renderer.render(data, ticker, period, filename=filename)
+
     logging.info(f"Создание графика для тикера {ticker} за период {period} со стилем {style}")
 
     # Проверяем, является ли стиль допустимым
@@ -38,6 +56,7 @@ def create_and_save_plot(data, ticker, period, filename=None, style='default'):
         else:
             logging.error("Информация о дате отсутствует или не имеет распознаваемого формата.")
             print("Информация о дате отсутствует или не имеет распознаваемого формата.")
+            plt.close()
             return
     else:
         if not pd.api.types.is_datetime64_any_dtype(data['Date']):
@@ -90,23 +109,344 @@ def create_and_save_plot(data, ticker, period, filename=None, style='default'):
         filename = f"{ticker}_{period}_stock_price_chart.png"
 
     plt.savefig(filename)
+    plt.close()
     logging.info(f"График сохранен как {filename}")
     print(f"График сохранен как {filename}")
 
-def create_interactive_plot(data, ticker):
+
+# Столбцы, которые отображаются на графике create_and_save_plot
+PLOT_COLUMNS = ('Close', 'Moving_Average', 'RSI', 'MACD', 'Signal', 'Std_Dev')
+
+
+def plot_dates(data):
+    """
+    Возвращает даты данных в числовом формате matplotlib.
+
+    Даты берутся из столбца 'Date' или из индекса; даты с часовым поясом
+    переводятся в UTC без создания объектов Timestamp на каждую точку.
+
+    :param data: DataFrame с историческими данными.
+    :return: Массив float64 или None, если даты не распознаны.
+    """
+    if 'Date' in data:
+        dates = pd.DatetimeIndex(pd.to_datetime(data['Date']))
+    elif pd.api.types.is_datetime64_any_dtype(data.index):
+        dates = pd.DatetimeIndex(data.index)
+    else:
+        return None
+    if dates.tz is not None:
+        dates = dates.tz_convert(None)
+    return mdates.date2num(dates.to_numpy())
+
+
+class BatchPlotRenderer():
+    """
+    Пакетная отрисовка графиков для многих тикеров.
+
+    Фигура и оси создаются один раз через объектный интерфейс matplotlib (холст Agg,
+    без pyplot), а для каждого тикера обновляются только данные линий и подписи.
+    Длинные ряды перед отрисовкой можно прореживать (LTTB или min/max).
+    """
+
+    def __init__(self, style='default', figsize=(15, 12), downsample=None, max_points=2000):
+        """
+        :param style: Стиль оформления графика (например, 'seaborn', 'ggplot', 'default').
+        :param figsize: Размер фигуры в дюймах.
+        :param downsample: Метод прореживания: None, 'lttb' или 'minmax'.
+        :param max_points: Максимальное число точек на линии после прореживания.
+        """
+        if downsample not in (None, 'lttb', 'minmax'):
+            raise ValueError(f"Неизвестный метод прореживания: {downsample}")
+        if style not in plt.style.available:
+            logging.warning(f"Стиль '{style}' не найден. Используется стиль по умолчанию.")
+            style = 'default'
+        self.style = style
+        self.downsample = downsample
+        self.max_points = max_points
+        with mstyle.context(style):
+            self.figure = Figure(figsize=figsize)
+            FigureCanvasAgg(self.figure)
+            self.axes = self.figure.subplots(4, 1)
+            self.lines = self._build_template()
+
+    def _build_template(self):
+        price_ax, rsi_ax, macd_ax, std_ax = self.axes
+        lines = {
+            'Close': price_ax.plot([], [], label='Close Price')[0],
+            'Moving_Average': price_ax.plot([], [], label='Moving Average')[0],
+            'RSI': rsi_ax.plot([], [], label='RSI')[0],
+            'MACD': macd_ax.plot([], [], label='MACD')[0],
+            'Signal': macd_ax.plot([], [], label='Signal')[0],
+            'Std_Dev': std_ax.plot([], [], label='Standard Deviation')[0],
+        }
+        rsi_ax.axhline(y=70, color='r', linestyle='--', label='Overbought (70)')
+        rsi_ax.axhline(y=30, color='g', linestyle='--', label='Oversold (30)')
+        titles = [None, 'Relative Strength Index (RSI)', 'Moving Average Convergence Divergence (MACD)',
+                  'Standard Deviation of Close Price']
+        ylabels = ["Цена", "RSI", "MACD", "Standard Deviation"]
+        for ax, title, ylabel in zip(self.axes, titles, ylabels):
+            if title:
+                ax.set_title(title)
+            ax.set_xlabel("Дата")
+            ax.set_ylabel(ylabel)
+            locator = mdates.AutoDateLocator()
+            ax.xaxis.set_major_locator(locator)
+            ax.xaxis.set_major_formatter(mdates.AutoDateFormatter(locator))
+            ax.legend()
+        return lines
+
+    def render(self, data, ticker, period, filename=None):
+        """
+        Отрисовывает и сохраняет график для одного тикера, переиспользуя фигуру.
+
+        :param data: DataFrame с историческими данными.
+        :param ticker: Символ акции.
+        :param period: Период данных.
+        :param filename: Имя файла для сохранения графика.
+        :return: Имя сохраненного файла или None, если даты не распознаны.
+        """
+        logging.info(f"Пакетная отрисовка графика для тикера {ticker} за период {period}")
+        x = plot_dates(data)
+        if x is None:
+            logging.error("Информация о дате отсутствует или не имеет распознаваемого формата.")
+            print("Информация о дате отсутствует или не имеет распознаваемого формата.")
+            return None
+        series = {column: data[column].to_numpy(dtype=np.float64) for column in PLOT_COLUMNS if column in data.columns}
+        return self.render_arrays(x, series, ticker, period, filename)
+
+    def render_arrays(self, x, series, ticker, period, filename=None):
+        """
+        Отрисовывает график по готовым массивам, без DataFrame.
+
+        :param x: Массив дат в формате matplotlib (результат plot_dates).
+        :param series: Словарь {имя столбца: массив значений}.
+        :param ticker: Символ акции.
+        :param period: Период данных.
+        :param filename: Имя файла для сохранения графика.
+        :return: Имя сохраненного файла.
+        """
+        for column, line in self.lines.items():
+            if column in series:
+                line.set_data(*self._prepare(x, series[column]))
+            else:
+                if column != 'Moving_Average':
+                    logging.warning(f"Столбец '{column}' отсутствует в данных.")
+                line.set_data([], [])
+        self.axes[0].set_title(f"{ticker} Цена акций с течением времени")
+        for ax in self.axes:
+            ax.relim()
+            ax.autoscale_view()
+
+        if filename is None:
+            filename = f"{ticker}_{period}_stock_price_chart.png"
+        self.figure.savefig(filename)
+        logging.info(f"График сохранен как {filename}")
+        return filename
+
+    def _prepare(self, x, y):
+        finite = np.isfinite(y)
+        if not finite.all():
+            x, y = x[finite], y[finite]
+        if self.downsample == 'lttb':
+            return downsample_lttb(x, y, self.max_points)
+        if self.downsample == 'minmax':
+            return downsample_minmax(x, y, self.max_points)
+        return x, y
+
+    def close(self):
+        """
+        Освобождает фигуру.
+        """
+        self.figure.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+@instrumented(rows=lambda result, frames, *args, **kwargs: sum(len(frames[ticker]) for ticker in result))
+def render_many(frames, period, output_dir='.', style='default', max_workers=None, downsample=None,
+                max_points=2000, errors=None):
+    """
+    Отрисовывает графики для многих тикеров параллельно в пуле процессов.
+
+    Ряды для графиков один раз записываются в общий файл, отображаемый в память;
+    процессы-исполнители читают их оттуда без передачи DataFrame через pickle и
+    рисуют на собственном экземпляре BatchPlotRenderer.
+
+    :param frames: Словарь {тикер: DataFrame с историческими данными и индикаторами}.
+    :param period: Период данных (используется в имени файла).
+    :param output_dir: Каталог для сохранения графиков.
+    :param style: Стиль оформления графика.
+    :param max_workers: Число процессов (по умолчанию число ядер).
+    :param downsample: Метод прореживания: None, 'lttb' или 'minmax'.
+    :param max_points: Максимальное число точек на линии после прореживания.
+    :param errors: Словарь, в который записываются ошибки по тикерам.
+    :return: Словарь {тикер: {'filename': имя файла, 'seconds': время отрисовки}}.
+    """
+    logging.info(f"Параллельная отрисовка графиков для {len(frames)} тикеров")
+    started = time.perf_counter()
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'series.npy')
+        tasks = _pack_frames(frames, path, errors)
+        if not tasks:
+            return results
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_render_worker,
+                                 initargs=(path, style, downsample, max_points)) as executor:
+            futures = {}
+            for ticker, offset, length, columns in tasks:
+                filename = os.path.join(output_dir, f"{ticker}_{period}_stock_price_chart.png")
+                future = executor.submit(_render_worker, ticker, offset, length, columns, period, filename)
+                futures[future] = ticker
+            for future in as_completed(futures):
+                ticker = futures[future]
+                try:
+                    filename, seconds = future.result()
+                except Exception as e:
+                    logging.error(f"Не удалось построить график для тикера {ticker}: {e}")
+                    if errors is not None:
+                        errors[ticker] = e
+                    continue
+                logging.info(f"График для тикера {ticker} построен за {seconds:.3f} с")
+                results[ticker] = {'filename': filename, 'seconds': seconds}
+    results = {ticker: results[ticker] for ticker in frames if ticker in results}
+    logging.info(f"Построено {len(results)} графиков за {time.perf_counter() - started:.2f} с")
+    return results
+
+
+def _pack_frames(frames, path, errors):
+    """
+    Записывает даты и столбцы графиков всех тикеров в один массив .npy.
+
+    :return: Список заданий (тикер, смещение, длина ряда, имена столбцов).
+    """
+    layout = []
+    total = 0
+    for ticker, data in frames.items():
+        x = plot_dates(data)
+        if x is None:
+            logging.error(f"Для тикера {ticker} информация о дате отсутствует или не имеет распознаваемого формата.")
+            if errors is not None:
+                errors[ticker] = ValueError("Информация о дате отсутствует")
+            continue
+        columns = tuple(column for column in PLOT_COLUMNS if column in data.columns)
+        layout.append((ticker, data, x, columns, total))
+        total += len(x) * (len(columns) + 1)
+    if not layout:
+        return []
+    values = np.lib.format.open_memmap(path, mode='w+', dtype=np.float64, shape=(total,))
+    tasks = []
+    for ticker, data, x, columns, offset in layout:
+        block = values[offset:offset + len(x) * (len(columns) + 1)].reshape(len(columns) + 1, len(x))
+        block[0] = x
+        for row, column in enumerate(columns, start=1):
+            block[row] = data[column].to_numpy(dtype=np.float64)
+        tasks.append((ticker, offset, len(x), columns))
+    values.flush()
+    del values
+    return tasks
+
+
+# Состояние процесса-исполнителя render_many: отображенный в память массив и рендерер
+_worker_state = {}
+
+
+def _init_render_worker(path, style, downsample, max_points):
+    _worker_state['values'] = np.load(path, mmap_mode='r')
+    _worker_state['renderer'] = BatchPlotRenderer(style=style, downsample=downsample, max_points=max_points)
+
+
+def _render_worker(ticker, offset, length, columns, period, filename):
+    started = time.perf_counter()
+    block = _worker_state['values'][offset:offset + length * (len(columns) + 1)].reshape(len(columns) + 1, length)
+    filename = _worker_state['renderer'].render_arrays(block[0], dict(zip(columns, block[1:])), ticker, period, filename)
+    return filename, time.perf_counter() - started
+
+
+def downsample_minmax(x, y, max_points):
+    """
+    Прореживает ряд, оставляя в каждой корзине минимум и максимум.
+
+    :param x: Массив координат по оси X (по возрастанию).
+    :param y: Массив значений.
+    :param max_points: Максимальное число точек в результате.
+    :return: Кортеж (x, y) прореженного ряда.
+    """
+    n = len(y)
+    buckets = max_points // 2
+    if n <= max_points or buckets < 1:
+        return x, y
+    size = -(-n // buckets)
+    padded = np.full(buckets * size, np.nan)
+    padded[:n] = y
+    padded = padded.reshape(buckets, size)
+    offsets = np.arange(buckets) * size
+    low = offsets + np.nanargmin(padded, axis=1)
+    high = offsets + np.nanargmax(padded, axis=1)
+    index = np.unique(np.concatenate((low, high)))
+    return x[index], y[index]
+
+
+def downsample_lttb(x, y, max_points):
+    """
+    Прореживает ряд алгоритмом Largest-Triangle-Three-Buckets.
+
+    :param x: Массив координат по оси X (по возрастанию).
+    :param y: Массив значений.
+    :param max_points: Максимальное число точек в результате (не меньше 3).
+    :return: Кортеж (x, y) прореженного ряда.
+    """
+    n = len(y)
+    if n <= max_points or max_points < 3:
+        return x, y
+    # Первая и последняя точки сохраняются, остальные делятся на корзины
+    edges = np.linspace(1, n - 1, max_points - 1).astype(np.int64)
+    index = np.empty(max_points, dtype=np.int64)
+    index[0] = 0
+    index[-1] = n - 1
+    selected = 0
+    for bucket in range(max_points - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        next_stop = edges[bucket + 2] if bucket + 2 < len(edges) else n
+        next_x = x[stop:next_stop].mean() if next_stop > stop else x[-1]
+        next_y = y[stop:next_stop].mean() if next_stop > stop else y[-1]
+        area = np.abs((x[selected] - next_x) * (y[start:stop] - y[selected])
+                      - (x[selected] - x[start:stop]) * (next_y - y[selected]))
+        selected = start + int(np.argmax(area))
+        index[bucket + 1] = selected
+    return x[index], y[index]
+
+@instrumented(rows='data')
+def create_interactive_plot(data, ticker, filename=None, stats=None):
     """
     Создает интерактивный график цены акций с использованием plotly.
 
+    Без filename график открывается в браузере (fig.show()). С filename строится
+    облегченный график (build_interactive_figure), который сохраняется в
+    самодостаточный HTML-файл; браузер при этом не запускается.
+
     :param data: DataFrame с историческими данными.
     :param ticker: Символ акции.
+    :param filename: Имя HTML-файла для сохранения графика.
+    :param stats: Сводка alerts.summary_stats(data), если уже рассчитана.
+    :return: Имя сохраненного файла или None, если график был показан.
     """
     logging.info(f"Создание интерактивного графика для тикера {ticker}")
 
-    # Вычисление среднего значения колонки 'Close'
-    average_close = data['Close'].mean()
+    # Среднее значение колонки 'Close' (из сводки кадра)
+    average_close = (stats or summary_stats(data))['mean']
     logging.info(f"Среднее значение 'Close' для тикера {ticker}: {average_close:.2f}")
     print(f"Среднее значение 'Close' для тикера {ticker}: {average_close:.2f}")
 
+    if filename is not None:
+        fig = build_interactive_figure(data, ticker, average_close=average_close)
+        write_interactive_html([fig], filename, title=f"{ticker} Интерактивный график цены акций")
+        logging.info(f"Интерактивный график для тикера {ticker} сохранен как {filename}")
+        return filename
+
     # Создание графика
     fig = go.Figure()
 
@@ -128,4 +468,67 @@ def create_interactive_plot(data, ticker):
     # Отображение графика
     fig.show()
 
-    logging.info(f"Интерактивный график для тикера {ticker} успешно создан")
\ No newline at end of file
+    logging.info(f"Интерактивный график для тикера {ticker} успешно создан")
+
+
+# Начиная с этого числа точек цена рисуется через WebGL (Scattergl) вместо SVG
+WEBGL_THRESHOLD = 1000
+
+
+def build_interactive_figure(data, ticker, average_close=None, webgl_threshold=WEBGL_THRESHOLD):
+    """
+    Строит облегченный интерактивный график цены акций.
+
+    Длинные ряды рисуются через Scattergl, средняя цена - горизонтальной линией
+    макета, а не отдельным рядом данных. Даты и цены передаются массивами NumPy,
+    которые plotly сериализует в компактном двоичном виде.
+
+    :param data: DataFrame с историческими данными.
+    :param ticker: Символ акции.
+    :param average_close: Средняя цена закрытия (по умолчанию считается по данным).
+    :param webgl_threshold: Число точек, начиная с которого используется Scattergl.
+    :return: Объект go.Figure.
+    """
+    if average_close is None:
+        average_close = summary_stats(data)['mean']
+    dates = pd.DatetimeIndex(data.index)
+    # Часовой пояс отбрасывается с сохранением местного времени; даты передаются как миллисекунды
+    if dates.tz is not None:
+        dates = dates.tz_localize(None)
+    x = (dates.asi8 // 10 ** 6).astype(np.float64)
+    trace = go.Scattergl if len(data) >= webgl_threshold else go.Scatter
+
+    fig = go.Figure()
+    fig.add_trace(trace(x=x, y=data['Close'].to_numpy(dtype=np.float64), mode='lines', name='Close Price'))
+    fig.add_shape(type='line', xref='paper', x0=0, x1=1, y0=average_close, y1=average_close,
+                  line=dict(dash='dash'), name='Average Close', showlegend=True)
+    fig.update_layout(
+        title=f"{ticker} Интерактивный график цены акций",
+        xaxis_title="Дата",
+        xaxis_type='date',
+        yaxis_title="Цена",
+        legend_title="Легенда",
+        hovermode="x unified"
+    )
+    return fig
+
+
+def write_interactive_html(figures, filename, title='Интерактивные графики'):
+    """
+    Сохраняет один или несколько графиков plotly в самодостаточный HTML-файл.
+
+    Библиотека plotly.js встраивается в файл один раз, независимо от числа графиков.
+
+    :param figures: Список объектов go.Figure.
+    :param filename: Имя файла для сохранения.
+    :param title: Заголовок HTML-страницы.
+    :return: Имя сохраненного файла.
+    """
+    logging.info(f"Сохранение {len(figures)} интерактивных графиков в файл {filename}")
+    with open(filename, 'w', encoding='utf-8') as f:
+        f.write(f'<!DOCTYPE html>\n<html>\n<head>\n<meta charset="utf-8">\n<title>{html.escape(title)}</title>\n</head>\n<body>\n')
+        for number, fig in enumerate(figures):
+            f.write(pio.to_html(fig, full_html=False, include_plotlyjs=number == 0))
+            f.write('\n')
+        f.write('</body>\n</html>\n')
+    return filename
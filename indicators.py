@@ -0,0 +1,372 @@
+import logging
+import numpy as np
+import pandas as pd
+from instrumentation import instrumented
+
+# Настройка логирования
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Набор индикаторов, который раньше получался цепочкой вызовов
+# add_moving_average, calculate_rsi, calculate_macd и calculate_standard_deviation
+DEFAULT_INDICATORS = [
+    {'kind': 'sma', 'window_size': 5, 'name': 'Moving_Average'},
+    {'kind': 'rsi', 'window': 14, 'name': 'RSI'},
+    {'kind': 'macd', 'short_window': 12, 'long_window': 26, 'signal_window': 9,
+     'names': ('EMA_short', 'EMA_long', 'MACD', 'Signal')},
+    {'kind': 'std', 'window': 20, 'name': 'Std_Dev'},
+]
+
+# Длина блока для накопленных сумм: ограничивает рост ошибки округления на длинных рядах
+BLOCK_SIZE = 4096
+# Ограничение числа элементов в блоке при расчете по двумерной панели
+BLOCK_ELEMENTS = 1 << 20
+
+
+@instrumented(rows='data')
+def compute_indicators(data, spec=None):
+    """
+    Рассчитывает набор индикаторов за один проход по ценам закрытия.
+
+    Столбец 'Close' извлекается один раз в виде непрерывного массива NumPy,
+    промежуточные результаты (разности, скользящие суммы, EMA) переиспользуются
+    между индикаторами, а все столбцы результата размещаются в одном массиве.
+
+    Поддерживаемые индикаторы (ключ 'kind'):
+        sma  - скользящее среднее, параметр window_size (по умолчанию 5);
+        ema  - экспоненциальное скользящее среднее, параметр span;
+        rsi  - индекс относительной силы, параметр window (по умолчанию 14);
+        macd - MACD, параметры short_window, long_window, signal_window, дает четыре столбца;
+        std  - скользящее стандартное отклонение, параметр window (по умолчанию 20).
+
+    :param data: DataFrame с историческими данными.
+    :param spec: Список описаний индикаторов (по умолчанию DEFAULT_INDICATORS).
+    :return: DataFrame с рассчитанными индикаторами и тем же индексом, что у data.
+    """
+    if spec is None:
+        spec = DEFAULT_INDICATORS
+    logging.info(f"Расчет {len(spec)} индикаторов за один проход")
+    close = np.ascontiguousarray(data['Close'].to_numpy(dtype=np.float64))
+    names = [name for item in spec for name in column_names(item)]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Повторяющиеся имена столбцов индикаторов: {names}")
+
+    # Столбцы хранятся построчно, чтобы каждый из них был непрерывным в памяти
+    out = np.empty((len(names), len(close)))
+    engine = _IndicatorEngine(close)
+    row = 0
+    for item in spec:
+        for values in engine.compute(item):
+            out[row] = values
+            row += 1
+    logging.info("Индикаторы успешно рассчитаны")
+    return pd.DataFrame(out.T, index=data.index, columns=names)
+
+
+@instrumented(rows='data')
+def add_indicators(data, spec=None):
+    """
+    Добавляет к данным столбцы индикаторов, рассчитанные compute_indicators.
+
+    :param data: DataFrame с историческими данными.
+    :param spec: Список описаний индикаторов (по умолчанию DEFAULT_INDICATORS).
+    :return: Новый DataFrame с исходными столбцами и столбцами индикаторов.
+    """
+    indicators = compute_indicators(data, spec)
+    return pd.concat([data.drop(columns=indicators.columns, errors='ignore'), indicators], axis=1)
+
+
+def compute_panel_indicators(prices, spec=None, skip_missing=False):
+    """
+    Рассчитывает индикаторы сразу для всех тикеров панели цен закрытия.
+
+    Панель - DataFrame, где строки - даты, а столбцы - тикеры. Все операции
+    выполняются двумерными операциями NumPy по оси дат, без цикла по тикерам;
+    результат для каждого тикера совпадает с расчетом compute_indicators по его ряду.
+
+    В панели с объединенным календарем (build_price_panel по тикерам с разными
+    датами торгов) даты без бара тикера - пропуски в его столбце. С skip_missing
+    цены каждого столбца сдвигаются к началу без пропусков, индикаторы считаются
+    по сжатой панели и возвращаются на даты тикера; на датах без цены - NaN.
+
+    :param prices: DataFrame с ценами закрытия (даты x тикеры).
+    :param spec: Список описаний индикаторов (по умолчанию DEFAULT_INDICATORS).
+    :param skip_missing: Считать каждый тикер только по датам, на которые есть цена.
+    :return: Словарь {имя индикатора: DataFrame даты x тикеры}.
+    """
+    if spec is None:
+        spec = DEFAULT_INDICATORS
+    logging.info(f"Расчет {len(spec)} индикаторов для панели из {prices.shape[1]} тикеров")
+    close = np.ascontiguousarray(prices.to_numpy(dtype=np.float64))
+    names = [name for item in spec for name in column_names(item)]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Повторяющиеся имена столбцов индикаторов: {names}")
+
+    if skip_missing:
+        missing = np.isnan(close)
+        # Устойчивая сортировка по признаку пропуска сохраняет порядок дат; пропуски уходят в конец столбца,
+        # где не влияют на окна и рекурсию EMA наблюдаемых цен
+        positions = np.argsort(missing, axis=0, kind='stable')
+        close = np.ascontiguousarray(np.take_along_axis(close, positions, axis=0))
+
+    out = np.empty((len(names),) + close.shape)
+    engine = _IndicatorEngine(close)
+    row = 0
+    for item in spec:
+        for values in engine.compute(item):
+            out[row] = values
+            row += 1
+    if skip_missing:
+        compact = out
+        out = np.empty_like(compact)
+        np.put_along_axis(out, np.broadcast_to(positions, compact.shape), compact, axis=1)
+        out[:, missing] = np.nan
+    logging.info("Индикаторы для панели успешно рассчитаны")
+    return {name: pd.DataFrame(out[number], index=prices.index, columns=prices.columns)
+            for number, name in enumerate(names)}
+
+
+def build_price_panel(frames, column='Close'):
+    """
+    Собирает панель (даты x тикеры) из данных нескольких тикеров.
+
+    :param frames: Словарь {тикер: DataFrame} или DataFrame с MultiIndex (тикер, дата),
+        например результат data_download.fetch_many.
+    :param column: Имя столбца с ценой.
+    :return: DataFrame, где строки - даты, а столбцы - тикеры.
+    """
+    if isinstance(frames, pd.DataFrame):
+        return frames[column].unstack(level=0)
+    return pd.DataFrame({ticker: frame[column] for ticker, frame in frames.items()})
+
+
+def column_names(item):
+    """
+    Возвращает имена столбцов, которые дает описание индикатора.
+
+    :param item: Описание индикатора (словарь с ключом 'kind').
+    :return: Список имен столбцов.
+    """
+    kind = item['kind']
+    if kind == 'macd':
+        return list(item.get('names', ('EMA_short', 'EMA_long', 'MACD', 'Signal')))
+    if 'name' in item:
+        return [item['name']]
+    if kind == 'sma':
+        return [f"SMA_{item.get('window_size', 5)}"]
+    if kind == 'ema':
+        return [f"EMA_{item['span']}"]
+    if kind == 'rsi':
+        return [f"RSI_{item.get('window', 14)}"]
+    if kind == 'std':
+        return [f"Std_{item.get('window', 20)}"]
+    raise ValueError(f"Неизвестный индикатор: {kind}")
+
+
+class _IndicatorEngine():
+    """
+    Вычислитель индикаторов с кэшем общих промежуточных результатов.
+    """
+
+    def __init__(self, close):
+        self.close = close
+        self._cache = {}
+
+    def compute(self, item):
+        kind = item['kind']
+        if kind == 'sma':
+            return [self.sma(item.get('window_size', 5))]
+        if kind == 'ema':
+            return [self.ema(item['span'])]
+        if kind == 'rsi':
+            return [self.rsi(item.get('window', 14))]
+        if kind == 'macd':
+            return self.macd(item.get('short_window', 12), item.get('long_window', 26), item.get('signal_window', 9))
+        if kind == 'std':
+            return [self.std(item.get('window', 20))]
+        raise ValueError(f"Неизвестный индикатор: {kind}")
+
+    def _memo(self, key, func, *args):
+        if key not in self._cache:
+            self._cache[key] = func(*args)
+        return self._cache[key]
+
+    def sma(self, window):
+        return self._memo(('sma', window), lambda: rolling_sum(self.close, window) / window)
+
+    def std(self, window):
+        return self._memo(('std', window), lambda: np.sqrt(rolling_var(self.close, window)))
+
+    def diff(self):
+        def calculate():
+            delta = np.empty_like(self.close)
+            delta[:1] = np.nan
+            np.subtract(self.close[1:], self.close[:-1], out=delta[1:])
+            return delta
+        return self._memo(('diff',), calculate)
+
+    def rsi(self, window):
+        def calculate():
+            delta = self.diff()
+            # Как и в calculate_rsi, пропуски в разностях считаются нулевым изменением
+            gain = rolling_sum(np.fmax(delta, 0.0), window)
+            loss = rolling_sum(np.fmax(-delta, 0.0), window)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                return 100 - (100 / (1 + gain / loss))
+        return self._memo(('rsi', window), calculate)
+
+    def ema(self, span):
+        return self._memo(('ema', span), ema, self.close, span)
+
+    def macd(self, short_window, long_window, signal_window):
+        ema_short = self.ema(short_window)
+        ema_long = self.ema(long_window)
+        macd = self._memo(('macd', short_window, long_window), lambda: ema_short - ema_long)
+        signal = self._memo(('macd_signal', short_window, long_window, signal_window), ema, macd, signal_window)
+        return [ema_short, ema_long, macd, signal]
+
+
+def rolling_sum(values, window):
+    """
+    Скользящая сумма по окну фиксированного размера, как rolling(window).sum() в pandas.
+
+    Окно, содержащее пропуск, дает NaN. Накопленные суммы считаются поблочно,
+    поэтому ошибка округления не растет с длиной ряда.
+
+    :param values: Массив NumPy; для двумерной панели (даты x тикеры) расчет идет по оси 0.
+    :param window: Размер окна.
+    :return: Массив той же формы.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = values.shape[0]
+    out = np.full(values.shape, np.nan)
+    if window < 1:
+        raise ValueError("Размер окна должен быть положительным")
+    if n < window:
+        return out
+    missing = np.isnan(values)
+    has_missing = missing.any()
+    clean = np.where(missing, 0.0, values) if has_missing else values
+    zero = np.zeros((1,) + values.shape[1:])
+    block = _block_rows(values, window)
+    for start in range(window - 1, n, block):
+        stop = min(start + block, n)
+        segment = clean[start - window + 1:stop]
+        cumulative = np.concatenate((zero, np.cumsum(segment, axis=0)))
+        out[start:stop] = cumulative[window:] - cumulative[:-window]
+    if has_missing:
+        _mask_missing_windows(out, missing, window)
+    return out
+
+
+def rolling_var(values, window):
+    """
+    Скользящая выборочная дисперсия (ddof=1), как rolling(window).var() в pandas.
+
+    Внутри каждого блока значения центрируются, чтобы формула через суммы
+    квадратов не теряла точность на рядах с большим уровнем цен.
+
+    :param values: Массив NumPy; для двумерной панели (даты x тикеры) расчет идет по оси 0.
+    :param window: Размер окна.
+    :return: Массив той же формы.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = values.shape[0]
+    out = np.full(values.shape, np.nan)
+    if window < 2:
+        raise ValueError("Размер окна для дисперсии должен быть не меньше 2")
+    if n < window:
+        return out
+    missing = np.isnan(values)
+    has_missing = missing.any()
+    clean = np.where(missing, 0.0, values) if has_missing else values
+    zero = np.zeros((1,) + values.shape[1:])
+    block = _block_rows(values, window)
+    for start in range(window - 1, n, block):
+        stop = min(start + block, n)
+        segment = clean[start - window + 1:stop]
+        centered = segment - segment.mean(axis=0)
+        total = np.concatenate((zero, np.cumsum(centered, axis=0)))
+        total_sq = np.concatenate((zero, np.cumsum(centered * centered, axis=0)))
+        window_total = total[window:] - total[:-window]
+        window_total_sq = total_sq[window:] - total_sq[:-window]
+        out[start:stop] = (window_total_sq - window_total * window_total / window) / (window - 1)
+    np.maximum(out, 0.0, out=out)
+    if has_missing:
+        _mask_missing_windows(out, missing, window)
+    return out
+
+
+def ema(values, span):
+    """
+    Экспоненциальное скользящее среднее, как ewm(span=span, adjust=False).mean() в pandas.
+
+    Рекуррентная формула раскрывается поблочно через геометрические веса,
+    поэтому расчет векторизован. Ряды с пропусками внутри обрабатываются pandas.
+
+    :param values: Массив NumPy; для двумерной панели (даты x тикеры) расчет идет по оси 0.
+    :param span: Период EMA.
+    :return: Массив той же формы.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    shape = values.shape
+    if values.ndim == 1:
+        values = values[:, None]
+    n, width = values.shape
+    out = np.full(values.shape, np.nan)
+    if n == 0:
+        return out.reshape(shape)
+    missing = np.isnan(values)
+    first = np.where(missing.all(axis=0), n, missing.argmin(axis=0))
+    leading = np.arange(n)[:, None] < first
+    gaps = (missing & ~leading).any(axis=0) & (first < n)
+    # Начальные пропуски заполняются первым значением: EMA константы совпадает с ней
+    first_values = values[np.minimum(first, n - 1), np.arange(width)]
+    filled = np.where(leading, first_values, values)
+    alpha = 2.0 / (span + 1.0)
+    beta = 1.0 - alpha
+    out[0] = filled[0]
+    if beta <= 0.0:
+        out[1:] = filled[1:]
+    elif n > 1:
+        out[1:] = _ema_tail(filled[1:], filled[0], alpha, beta)
+    out[leading] = np.nan
+    if gaps.any():
+        out[:, gaps] = pd.DataFrame(values[:, gaps]).ewm(span=span, adjust=False).mean().to_numpy()
+    return out.reshape(shape)
+
+
+def _ema_tail(tail, previous, alpha, beta):
+    """
+    Продолжает EMA по строкам tail от начального значения previous.
+    """
+    count, width = tail.shape
+    # Длина блока выбирается так, чтобы веса beta ** -k оставались в пределах 1e100
+    block = int(min(8192, max(1, 230 // -np.log(beta)), count))
+    blocks = -(-count // block)
+    padded = np.zeros((blocks * block, width))
+    padded[:count] = tail
+    padded = padded.reshape(blocks, block, width)
+    decay = (beta ** np.arange(1, block + 1, dtype=np.float64))[:, None]
+    # Решение внутри каждого блока при нулевом начальном значении
+    local = np.divide(padded, decay, out=padded)
+    np.cumsum(local, axis=1, out=local)
+    local *= alpha * decay
+    # Начальные значения блоков связаны рекуррентностью по числу блоков
+    starts = np.empty((blocks, width))
+    carry = decay[-1]
+    for number in range(blocks):
+        starts[number] = previous
+        previous = local[number, -1] + carry * previous
+    local += starts[:, None, :] * decay
+    return local.reshape(blocks * block, width)[:count]
+
+
+def _block_rows(values, window):
+    # Для широкой панели блок укорачивается, чтобы временные массивы оставались небольшими
+    width = int(np.prod(values.shape[1:], dtype=np.int64))
+    return int(min(BLOCK_SIZE, max(4 * window, BLOCK_ELEMENTS // max(width, 1))))
+
+
+def _mask_missing_windows(out, missing, window):
+    counts = np.concatenate((np.zeros((1,) + missing.shape[1:], dtype=np.int64), np.cumsum(missing, axis=0)))
+    out[window - 1:][(counts[window:] - counts[:-window]) > 0] = np.nan
@@ -0,0 +1,294 @@
+import os
+import json
+import time
+import logging
+import threading
+import functools
+import inspect
+import tracemalloc
+from collections import deque
+
+# Настройка логирования
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Максимальное число хранимых замеров: в долго работающем процессе старые замеры вытесняются
+MAX_RECORDS = 100000
+PROMETHEUS_PREFIX = 'pipeline_stage'
+
+_enabled = False
+_memory = False
+_owns_tracing = False
+_records = deque(maxlen=MAX_RECORDS)
+_local = threading.local()
+
+
+def enable(memory=False, max_records=MAX_RECORDS):
+    """
+    Включает сбор метрик этапов.
+
+    :param memory: Замерять пиковую выделенную память (tracemalloc замедляет выполнение в несколько раз).
+    :param max_records: Максимальное число хранимых замеров.
+    """
+    global _enabled, _memory, _owns_tracing, _records
+    if max_records != _records.maxlen:
+        _records = deque(_records, maxlen=max_records)
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _owns_tracing = True
+    _memory = memory
+    _enabled = True
+    logging.info(f"Сбор метрик этапов включен (память: {'да' if memory else 'нет'})")
+
+
+def disable():
+    """
+    Выключает сбор метрик этапов; собранные замеры сохраняются.
+    """
+    global _enabled, _memory, _owns_tracing
+    if _owns_tracing and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _enabled = _memory = _owns_tracing = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def reset():
+    """
+    Удаляет собранные замеры.
+    """
+    _records.clear()
+
+
+def records():
+    """
+    Возвращает собранные замеры.
+
+    :return: Список словарей {'stage', 'started_at', 'wall_seconds', 'cpu_seconds', 'rows', 'peak_bytes', 'status'}.
+    """
+    return list(_records)
+
+
+def stage(name, rows=None):
+    """
+    Контекстный менеджер замера этапа.
+
+    Внутри блока число обработанных строк можно задать через атрибут rows
+    возвращаемого объекта. Если сбор метрик выключен, возвращается общий
+    пустой объект и замер не выполняется.
+
+    Пример:
+        with instrumentation.stage('indicators') as metrics:
+            data = ind.add_indicators(data)
+            metrics.rows = len(data)
+
+    :param name: Имя этапа.
+    :param rows: Число обработанных строк.
+    :return: Контекстный менеджер.
+    """
+    if not _enabled:
+        return _DISABLED
+    return _Stage(name, rows)
+
+
+def instrumented(name=None, rows=None):
+    """
+    Декоратор замера функции как этапа.
+
+    :param name: Имя этапа (по умолчанию модуль и полное имя функции, например 'data_download.calculate_rsi').
+    :param rows: Источник числа строк: имя аргумента, в том числе с атрибутами ('data', 'self.data'),
+                 длина которого считается числом строк, или функция (результат, *args, **kwargs) -> число строк.
+                 По умолчанию - длина результата, если она определена.
+    :return: Декоратор.
+    """
+    def decorator(function):
+        stage_name = name or f"{function.__module__}.{function.__qualname__}"
+        count_rows = _rows_counter(function, rows)
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return function(*args, **kwargs)
+            with _Stage(stage_name) as metrics:
+                result = function(*args, **kwargs)
+                metrics.rows = count_rows(result, args, kwargs)
+            return result
+        return wrapper
+    return decorator
+
+
+def summary():
+    """
+    Сводит замеры по этапам.
+
+    :return: Словарь {этап: {'calls', 'errors', 'wall_seconds', 'cpu_seconds', 'rows', 'peak_bytes'}}.
+    """
+    stages = {}
+    for record in list(_records):
+        item = stages.setdefault(record['stage'], {'calls': 0, 'errors': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0,
+                                                   'rows': 0, 'peak_bytes': None})
+        item['calls'] += 1
+        item['errors'] += record['status'] != 'ok'
+        item['wall_seconds'] += record['wall_seconds']
+        item['cpu_seconds'] += record['cpu_seconds']
+        item['rows'] += record['rows'] or 0
+        if record['peak_bytes'] is not None:
+            item['peak_bytes'] = max(item['peak_bytes'] or 0, record['peak_bytes'])
+    return stages
+
+
+def export_jsonl(filename, append=True):
+    """
+    Записывает замеры в файл JSON Lines (одна строка на замер).
+
+    :param filename: Имя файла.
+    :param append: Дописывать в существующий файл.
+    :return: Число записанных замеров.
+    """
+    current = records()
+    with open(filename, 'a' if append else 'w', encoding='utf-8') as f:
+        f.writelines(json.dumps(record, ensure_ascii=False) + '\n' for record in current)
+    logging.info(f"Метрики этапов ({len(current)} замеров) записаны в {filename}")
+    return len(current)
+
+
+def export_prometheus(filename):
+    """
+    Записывает сводку по этапам в текстовом формате Prometheus (например, для textfile collector).
+
+    Файл заменяется целиком, поэтому сборщик не прочитает его частично записанным.
+
+    :param filename: Имя файла.
+    """
+    stages = summary()
+    metrics = [
+        ('calls_total', 'counter', "Число выполнений этапа.", 'calls'),
+        ('errors_total', 'counter', "Число выполнений этапа, завершившихся исключением.", 'errors'),
+        ('wall_seconds_total', 'counter', "Суммарное время выполнения этапа, с.", 'wall_seconds'),
+        ('cpu_seconds_total', 'counter', "Суммарное процессорное время потока этапа, с.", 'cpu_seconds'),
+        ('rows_total', 'counter', "Суммарное число обработанных строк.", 'rows'),
+        ('peak_bytes', 'gauge', "Максимальная пиковая выделенная память этапа, байт.", 'peak_bytes'),
+    ]
+    lines = []
+    for suffix, metric_type, description, key in metrics:
+        metric = f"{PROMETHEUS_PREFIX}_{suffix}"
+        lines.append(f"# HELP {metric} {description}")
+        lines.append(f"# TYPE {metric} {metric_type}")
+        for stage_name, item in stages.items():
+            if item[key] is not None:
+                label = stage_name.replace('\\', '\\\\').replace('"', '\\"')
+                lines.append(f'{metric}{{stage="{label}"}} {item[key]}')
+    with open(filename + '.tmp', 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+    os.replace(filename + '.tmp', filename)
+    logging.info(f"Метрики этапов в формате Prometheus записаны в {filename}")
+
+
+def export_metrics(filename):
+    """
+    Записывает метрики в формате по расширению файла: .prom - Prometheus, иначе JSON Lines.
+
+    :param filename: Имя файла.
+    """
+    if os.path.splitext(filename)[1].lower() == '.prom':
+        export_prometheus(filename)
+    else:
+        export_jsonl(filename)
+
+
+class _Stage():
+    """
+    Замер одного выполнения этапа.
+
+    Пиковая память считается относительно памяти на входе в этап. Вложенные
+    этапы сбрасывают пик tracemalloc, поэтому пик, достигнутый до входа во
+    вложенный этап, запоминается в объемлющем. tracemalloc общий для процесса:
+    при параллельных этапах в потоках пик включает выделения других потоков.
+    """
+
+    __slots__ = ('name', 'rows', '_started_at', '_wall', '_cpu', '_memory_start', '_memory_peak')
+
+    def __init__(self, name, rows=None):
+        self.name = name
+        self.rows = rows
+
+    def __enter__(self):
+        stack = getattr(_local, 'stack', None)
+        if stack is None:
+            stack = _local.stack = []
+        self._memory_start = None
+        if _memory and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1]._memory_peak = max(stack[-1]._memory_peak, peak)
+            tracemalloc.reset_peak()
+            self._memory_start = self._memory_peak = current
+        stack.append(self)
+        self._started_at = time.time()
+        self._cpu = time.thread_time()
+        self._wall = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        wall = time.perf_counter() - self._wall
+        cpu = time.thread_time() - self._cpu
+        _local.stack.pop()
+        peak_bytes = None
+        if self._memory_start is not None and tracemalloc.is_tracing():
+            peak = tracemalloc.get_traced_memory()[1]
+            peak_bytes = max(self._memory_peak, peak) - self._memory_start
+            if _local.stack:
+                _local.stack[-1]._memory_peak = max(_local.stack[-1]._memory_peak, self._memory_peak, peak)
+        _records.append({'stage': self.name, 'started_at': self._started_at, 'wall_seconds': wall,
+                         'cpu_seconds': cpu, 'rows': self.rows, 'peak_bytes': peak_bytes,
+                         'status': 'ok' if exc_type is None else exc_type.__name__})
+        return False
+
+
+class _DisabledStage():
+    """
+    Пустой замер, возвращаемый stage(), когда сбор метрик выключен.
+    """
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_DISABLED = _DisabledStage()
+
+
+def _rows_counter(function, rows):
+    """
+    Возвращает функцию (результат, args, kwargs) -> число строк по описанию rows из instrumented().
+    """
+    if callable(rows):
+        return lambda result, args, kwargs: rows(result, *args, **kwargs)
+    if rows is None:
+        return lambda result, args, kwargs: _length(result)
+    argument, *attributes = rows.split('.')
+    signature = inspect.signature(function)
+
+    def count(result, args, kwargs):
+        value = signature.bind_partial(*args, **kwargs).arguments.get(argument)
+        for attribute in attributes:
+            value = getattr(value, attribute, None)
+        return _length(value)
+    return count
+
+
+def _length(value):
+    if value is None or isinstance(value, (str, bytes)):
+        return None
+    try:
+        return len(value)
+    except TypeError:
+        return None
@@ -1,6 +1,16 @@
 import data_download as dd
 import data_plotting as dplt
+import data_export as de
+import indicators as ind
+import instrumentation
+import alerts
+from data_cache import StockDataCache
+import os
+import json
+import time
+import argparse
 import logging
+from contextlib import contextmanager
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -27,23 +37,17 @@ def main():
     csv_filename = input("Введите имя файла для экспорта данных в CSV (например, 'data.csv'): ")
     style = input("Введите стиль оформления графика (например, 'seaborn', 'ggplot', 'default'): ")
 
-    # Add moving average to the data
-    stock_data = dd.add_moving_average(stock_data)
+    # Add moving average, RSI, MACD and standard deviation in a single pass
+    stock_data = ind.add_indicators(stock_data)
 
-    # Calculate RSI
-    stock_data = dd.calculate_rsi(stock_data)
-
-    # Calculate MACD
-    stock_data = dd.calculate_macd(stock_data)
-
-    # Calculate standard deviation
-    stock_data = dd.calculate_standard_deviation(stock_data)
+    # Summary of the Close column shared by the average price, the alert and the interactive plot
+    stats = alerts.summary_stats(stock_data)
 
     # Calculate and display average price
-    dd.calculate_and_display_average_price(stock_data)
+    dd.calculate_and_display_average_price(stock_data, stats)
 
     # Notify if strong fluctuations
-    dd.notify_if_strong_fluctuations(stock_data, threshold)
+    dd.notify_if_strong_fluctuations(stock_data, threshold, stats)
 
     # Export data to CSV
     dd.export_data_to_csv(stock_data, csv_filename)
@@ -52,9 +56,171 @@ def main():
     dplt.create_and_save_plot(stock_data, ticker, period, style=style)
 
     # Create interactive plot
-    dplt.create_interactive_plot(stock_data, ticker)
+    dplt.create_interactive_plot(stock_data, ticker, stats=stats)
 
     logging.info("Программа завершена")
 
+# Job settings used when neither the job nor the file defaults specify them
+JOB_DEFAULTS = {
+    'period': '1mo',
+    'interval': '1d',
+    'threshold': 10,
+    'style': 'default',
+    'indicators': None,
+    'formats': ['csv', 'png'],
+    'output_dir': '.',
+    'max_workers': 8,
+}
+
+def run_batch(job_file, provider=None):
+    """
+    Запускает полный конвейер (загрузка, индикаторы, уведомления, экспорт, графики)
+    для всех заданий из файла без интерактивного ввода.
+
+    Файл заданий - JSON вида:
+        {
+            "cache_dir": ".stock_cache",
+            "defaults": {"period": "1y", "threshold": 10, "formats": ["parquet", "png", "html"]},
+            "jobs": [
+                {"tickers": ["AAPL", "MSFT"]},
+                {"tickers": ["TSLA"], "start_date": "2023-01-01", "end_date": "2023-12-31", "threshold": 5}
+            ]
+        }
+
+    Параметры задания: tickers, period или start_date/end_date, interval, threshold,
+    style, indicators (описание для indicators.compute_indicators), formats (csv,
+    parquet, feather, png, html, alerts - таблица оповещений по всем тикерам задания
+    alerts_<период>.csv), output_dir, max_workers. Кэш данных и рендереры
+    графиков создаются один раз и переиспользуются всеми заданиями. Период,
+    указанный в задании, отменяет даты из defaults. Ошибка загрузки или
+    обработки тикера записывается в 'errors' и не прерывает задание.
+
+    :param job_file: Путь к файлу заданий.
+    :param provider: Фабрика объектов с методом history() вместо yf.Ticker.
+    :return: Словарь с временем этапов ('timings') и ошибками по тикерам ('errors').
+    """
+    logging.info(f"Запуск пакетной обработки заданий из файла {job_file}")
+    with open(job_file, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    defaults = dict(JOB_DEFAULTS, **config.get('defaults', {}))
+    cache_dir = config.get('cache_dir')
+    cache = StockDataCache(cache_dir) if cache_dir else None
+    renderers = {}
+    timings = {}
+    errors = {}
+
+    try:
+        for number, overrides in enumerate(config['jobs'], start=1):
+            job = dict(defaults, **overrides)
+            # A period given by the job itself replaces dates inherited from the defaults
+            if 'period' in overrides:
+                for key in ('start_date', 'end_date'):
+                    if key not in overrides:
+                        job.pop(key, None)
+            logging.info(f"Задание {number}: {len(job['tickers'])} тикеров")
+            _run_job(job, cache, renderers, timings, errors, provider)
+    finally:
+        for renderer in renderers.values():
+            renderer.close()
+
+    print_timings(timings)
+    logging.info("Пакетная обработка завершена")
+    return {'timings': timings, 'errors': errors}
+
+def _run_job(job, cache, renderers, timings, errors, provider):
+    period = job['period'] if not (job.get('start_date') and job.get('end_date')) else None
+    label = period or f"{job['start_date']}_{job['end_date']}"
+    os.makedirs(job['output_dir'], exist_ok=True)
+
+    # Download all tickers of the job through the shared cache
+    with _stage(timings, 'fetch'):
+        frames = dd.fetch_many(job['tickers'], period=period, start_date=job.get('start_date'),
+                               end_date=job.get('end_date'), interval=job['interval'],
+                               max_workers=job['max_workers'], cache=cache, provider=provider, errors=errors)
+
+    summaries = {}
+    for ticker, stock_data in frames.items():
+        try:
+            _process_ticker(job, ticker, stock_data, label, renderers, timings, summaries)
+        except Exception as e:
+            logging.error(f"Не удалось обработать данные для тикера {ticker}: {e}")
+            errors[ticker] = e
+
+    # Alert table for all tickers of the job in one vectorised scan
+    if 'alerts' in job['formats'] and summaries:
+        with _stage(timings, 'alerts'):
+            table = alerts.scan_alerts({ticker: frames[ticker] for ticker in summaries},
+                                       threshold=job['threshold'], summary=summaries)
+            table.to_csv(os.path.join(job['output_dir'], f"alerts_{label}.csv"), index=False)
+
+def _process_ticker(job, ticker, stock_data, label, renderers, timings, summaries):
+    # Add indicators in a single pass
+    with _stage(timings, 'indicators'):
+        stock_data = ind.add_indicators(stock_data, job['indicators'])
+
+    # Average price and fluctuation alerts from one summary of the Close column
+    with _stage(timings, 'alerts'):
+        stats = summaries[ticker] = alerts.summary_stats(stock_data)
+        dd.calculate_and_display_average_price(stock_data, stats)
+        dd.notify_if_strong_fluctuations(stock_data, job['threshold'], stats)
+
+    # Export data in every requested format
+    with _stage(timings, 'export'):
+        for file_format in job['formats']:
+            filename = os.path.join(job['output_dir'], f"{ticker}_{label}.{file_format}")
+            if file_format == 'csv':
+                dd.export_data_to_csv(stock_data, filename)
+            elif file_format in ('parquet', 'feather'):
+                de.export_data(stock_data, filename)
+
+    # Static and interactive plots
+    with _stage(timings, 'plot'):
+        if 'png' in job['formats']:
+            if job['style'] not in renderers:
+                renderers[job['style']] = dplt.BatchPlotRenderer(style=job['style'])
+            filename = os.path.join(job['output_dir'], f"{ticker}_{label}_stock_price_chart.png")
+            dplt.create_and_save_plot(stock_data, ticker, label, filename=filename,
+                                      renderer=renderers[job['style']])
+        if 'html' in job['formats']:
+            filename = os.path.join(job['output_dir'], f"{ticker}_{label}_interactive.html")
+            dplt.create_interactive_plot(stock_data, ticker, filename=filename, stats=stats)
+
+@contextmanager
+def _stage(timings, name):
+    started = time.perf_counter()
+    try:
+        with instrumentation.stage(f"batch.{name}"):
+            yield
+    finally:
+        timings[name] = timings.get(name, 0.0) + time.perf_counter() - started
+
+def print_timings(timings):
+    """
+    Выводит сводку времени по этапам конвейера.
+
+    :param timings: Словарь {этап: время в секундах}.
+    """
+    total = sum(timings.values())
+    print(f"{'Этап':<12} {'Время, с':>10} {'Доля':>7}")
+    for name, seconds in timings.items():
+        share = seconds / total * 100 if total else 0.0
+        print(f"{name:<12} {seconds:>10.3f} {share:>6.1f}%")
+    print(f"{'Итого':<12} {total:>10.3f}")
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Загрузка, анализ и построение графиков биржевых данных.")
+    parser.add_argument('--jobs', help="Файл заданий JSON для пакетной обработки без интерактивного ввода.")
+    parser.add_argument('--metrics', help="Файл метрик этапов: .prom - формат Prometheus, иначе JSON Lines.")
+    parser.add_argument('--metrics-memory', action='store_true', help="Замерять пиковую память этапов.")
+    args = parser.parse_args()
+    # Metrics are collected only when a metrics file is requested
+    if args.metrics:
+        instrumentation.enable(memory=args.metrics_memory)
+    try:
+        if args.jobs:
+            run_batch(args.jobs)
+        else:
+            main()
+    finally:
+        if args.metrics:
+            instrumentation.export_metrics(args.metrics)
\ No newline at end of file
@@ -0,0 +1,158 @@
+import os
+import csv
+import json
+import html
+import logging
+
+# Настройка логирования
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+FORMATS = {
+    '.html': 'html',
+    '.htm': 'html',
+    '.csv': 'csv',
+    '.jsonl': 'jsonl',
+}
+HEADERS = ('Номер', 'Название', 'Цена', 'Фасовка', 'Файл', 'Цена за кг.')
+JSON_KEYS = ('number', 'name', 'price', 'weight', 'file', 'price_per_kg')
+# Число строк, преобразуемых и записываемых за один шаг
+CHUNK_ROWS = 65536
+BUFFER_SIZE = 1 << 20
+
+HTML_HEAD = '''<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <title>{title}</title>
+</head>
+<body>
+{navigation}    <table>
+        <thead>
+            <tr>{headers}</tr>
+        </thead>
+        <tbody>
+'''
+HTML_TAIL = '''        </tbody>
+    </table>
+{navigation}</body>
+</html>
+'''
+
+
+def export_catalog(table, filename, file_format=None, page_size=None, title='Позиции продуктов'):
+    """
+    Потоково экспортирует каталог товаров в HTML, CSV или JSON Lines.
+
+    Строки преобразуются и записываются частями по CHUNK_ROWS через
+    буферизованный файл, поэтому документ не собирается в памяти целиком.
+
+    :param table: Каталог (PriceTable или последовательность кортежей (цена за кг, название, цена, вес, файл)).
+    :param filename: Имя файла; при разбиении на страницы к имени добавляется номер страницы.
+    :param file_format: 'html', 'csv' или 'jsonl' (по умолчанию по расширению файла).
+    :param page_size: Число строк на странице (по умолчанию все строки в одном файле).
+    :param title: Заголовок HTML-страницы.
+    :return: Список записанных файлов.
+    """
+    file_format = file_format or _detect_format(filename)
+    if file_format not in ('html', 'csv', 'jsonl'):
+        raise ValueError(f"Неподдерживаемый формат экспорта: {file_format}")
+    logging.info(f"Экспорт каталога в файл {filename} (формат {file_format})")
+    total = len(table)
+    pages = max(1, -(-total // page_size)) if page_size else 1
+    page_size = page_size or max(total, 1)
+    filenames = [page_filename(filename, page, pages) for page in range(1, pages + 1)]
+    for page, page_file in enumerate(filenames):
+        start = page * page_size
+        stop = min(start + page_size, total)
+        with open(page_file, 'w', encoding='utf-8', newline='', buffering=BUFFER_SIZE) as f:
+            if file_format == 'html':
+                navigation = _html_navigation(filenames, page)
+                f.write(HTML_HEAD.format(title=html.escape(title), navigation=navigation,
+                                         headers=''.join(f'<th>{header}</th>' for header in HEADERS)))
+                f.writelines(_html_rows(table, start, stop))
+                f.write(HTML_TAIL.format(navigation=navigation))
+            elif file_format == 'csv':
+                writer = csv.writer(f)
+                writer.writerow(HEADERS)
+                for rows in _chunks(table, start, stop):
+                    writer.writerows((number, name, price, weight, file_name, value)
+                                     for number, (value, name, price, weight, file_name) in rows)
+            else:
+                for rows in _chunks(table, start, stop):
+                    f.writelines(json.dumps(json_record(number, row), ensure_ascii=False) + '\n'
+                                 for number, row in rows)
+    logging.info(f"Экспортировано {total} строк в {len(filenames)} файл(ов)")
+    return filenames
+
+
+def json_record(number, row):
+    """
+    Преобразует строку каталога в словарь для JSON.
+
+    :param number: Номер строки, начиная с 1.
+    :param row: Кортеж (цена за кг, название, цена, вес, файл).
+    :return: Словарь с ключами JSON_KEYS.
+    """
+    value, name, price, weight, file_name = row
+    return dict(zip(JSON_KEYS, (number, name, price, weight, file_name, value)))
+
+
+def page_filename(filename, page, pages):
+    """
+    Возвращает имя файла страницы.
+
+    :param filename: Имя файла экспорта.
+    :param page: Номер страницы, начиная с 1.
+    :param pages: Общее число страниц.
+    :return: filename для единственной страницы, иначе имя с номером страницы перед расширением.
+    """
+    if pages == 1:
+        return filename
+    base, extension = os.path.splitext(filename)
+    return f"{base}_{page}{extension}"
+
+
+def _html_rows(table, start, stop):
+    """
+    Генератор строк таблицы HTML с экранированием названий и имен файлов.
+    """
+    # Названия и имена файлов повторяются, поэтому каждое значение экранируется один раз
+    escaped = {}
+
+    def escape(text):
+        value = escaped.get(text)
+        if value is None:
+            value = escaped[text] = html.escape(text)
+        return value
+
+    for rows in _chunks(table, start, stop):
+        yield ''.join(f'            <tr><td>{number}</td><td>{escape(name)}</td><td>{price}</td>'
+                      f'<td>{weight}</td><td>{escape(file_name)}</td><td>{value}</td></tr>\n'
+                      for number, (value, name, price, weight, file_name) in rows)
+
+
+def _chunks(table, start, stop):
+    """
+    Генератор частей строк в виде пар (номер строки, кортеж строки), нумерация с 1.
+    """
+    for chunk_start in range(start, stop, CHUNK_ROWS):
+        yield enumerate(table[chunk_start:min(chunk_start + CHUNK_ROWS, stop)], chunk_start + 1)
+
+
+def _html_navigation(filenames, page):
+    if len(filenames) == 1:
+        return ''
+    links = []
+    if page > 0:
+        links.append(f'<a href="{html.escape(os.path.basename(filenames[page - 1]))}">Назад</a>')
+    links.append(f'Страница {page + 1} из {len(filenames)}')
+    if page < len(filenames) - 1:
+        links.append(f'<a href="{html.escape(os.path.basename(filenames[page + 1]))}">Вперед</a>')
+    return f"    <p>{' | '.join(links)}</p>\n"
+
+
+def _detect_format(filename):
+    extension = os.path.splitext(filename)[1].lower()
+    if extension not in FORMATS:
+        raise ValueError(f"Не удалось определить формат по имени файла: {filename}")
+    return FORMATS[extension]
@@ -0,0 +1,102 @@
+import logging
+from functools import lru_cache
+import numpy as np
+
+# Настройка логирования
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Длина n-грамм в инвертированном индексе
+NGRAM = 3
+
+_EMPTY = np.empty(0, dtype=np.int64)
+_EMPTY.flags.writeable = False
+
+
+class TrigramIndex():
+    """
+    Инвертированный индекс по триграммам названий товаров.
+
+    Индекс строится по уникальным названиям: триграмма -> номера названий,
+    название -> номера строк каталога. Строки каталога отсортированы по цене
+    за кг, поэтому найденные номера строк, упорядоченные по возрастанию, сразу
+    дают результат в порядке цены за кг без пересортировки записей.
+    """
+
+    def __init__(self, names, cache_size=1024):
+        """
+        :param names: Последовательность названий товаров в порядке строк каталога (в нижнем регистре).
+        :param cache_size: Размер LRU-кэша результатов поиска (результаты хранятся массивами int64).
+        """
+        logging.info(f"Построение индекса по {len(names)} строкам")
+        name_ids = {}
+        rows = []
+        for row, name in enumerate(names):
+            name_id = name_ids.get(name)
+            if name_id is None:
+                name_id = name_ids[name] = len(rows)
+                rows.append([])
+            rows[name_id].append(row)
+        lengths = np.array([len(name_rows) for name_rows in rows], dtype=np.int64)
+        row_ids = np.fromiter((row for name_rows in rows for row in name_rows), dtype=np.int64, count=len(names))
+        self._build(list(name_ids), row_ids, np.concatenate([[0], np.cumsum(lengths)]), cache_size)
+
+    @classmethod
+    def from_codes(cls, dictionary, codes, cache_size=1024):
+        """
+        Строит индекс по названиям, закодированным номерами в словаре.
+
+        :param dictionary: Список уникальных названий.
+        :param codes: Массив кодов названий в порядке строк каталога.
+        :param cache_size: Размер LRU-кэша результатов поиска.
+        :return: Экземпляр TrigramIndex.
+        """
+        logging.info(f"Построение индекса по {len(codes)} строкам")
+        order = np.argsort(codes, kind='stable')
+        used, starts = np.unique(codes[order], return_index=True)
+        index = cls.__new__(cls)
+        index._build([dictionary[code] for code in used.tolist()], order, np.append(starts, len(order)), cache_size)
+        return index
+
+    def _build(self, names, row_ids, row_starts, cache_size):
+        # Номера строк названия name_id: row_ids[row_starts[name_id]:row_starts[name_id + 1]]
+        self.names = names
+        self.row_ids = row_ids
+        self.row_starts = row_starts
+
+        postings = {}
+        for name_id, name in enumerate(self.names):
+            for gram in {name[start:start + NGRAM] for start in range(len(name) - NGRAM + 1)}:
+                postings.setdefault(gram, []).append(name_id)
+        self.postings = {gram: np.array(ids, dtype=np.int64) for gram, ids in postings.items()}
+        self.search = lru_cache(maxsize=cache_size)(self._search)
+        logging.info(f"Индекс построен: {len(self.names)} уникальных названий, {len(self.postings)} триграмм")
+
+    def _search(self, text):
+        """
+        Ищет строки каталога, название которых содержит text.
+
+        :param text: Часть названия товара в нижнем регистре.
+        :return: Массив int64 номеров строк каталога по возрастанию (только для чтения: он хранится в кэше).
+        """
+        if len(text) < NGRAM:
+            # Для коротких запросов триграмм нет - проверяются все уникальные названия
+            candidates = range(len(self.names))
+        else:
+            grams = {text[start:start + NGRAM] for start in range(len(text) - NGRAM + 1)}
+            lists = sorted((self.postings.get(gram) for gram in grams), key=lambda ids: -1 if ids is None else len(ids))
+            if lists[0] is None:
+                return _EMPTY
+            candidates = lists[0]
+            for ids in lists[1:]:
+                candidates = np.intersect1d(candidates, ids, assume_unique=True)
+                if not len(candidates):
+                    return _EMPTY
+        starts = self.row_starts
+        matches = [self.row_ids[starts[name_id]:starts[name_id + 1]]
+                   for name_id in candidates if text in self.names[name_id]]
+        if not matches:
+            return _EMPTY
+        # Кэшируется компактный массив, а не список объектов int Python
+        found = np.sort(np.concatenate(matches))
+        found.flags.writeable = False
+        return found
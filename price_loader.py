@@ -0,0 +1,178 @@
+import os
+import csv
+import time
+import logging
+from array import array
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from price_table import PriceTable
+
+# Настройка логирования
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Допустимые названия столбцов в файлах прайсов
+PRODUCT_COLUMNS = ('товар', 'название', 'продукт', 'наименование')
+PRICE_COLUMNS = ('розница', 'цена')
+WEIGHT_COLUMNS = ('вес', 'масса', 'фасовка')
+
+
+def find_price_files(file_path):
+    """
+    Возвращает файлы со словом price в названии.
+
+    :param file_path: Путь к каталогу с файлами.
+    :return: Отсортированный список имен файлов.
+    """
+    return sorted(file_name for file_name in os.listdir(file_path) if 'price' in file_name)
+
+
+def search_product_price_weight(headers):
+    """
+    Возвращает номера столбцов с названием товара, ценой и весом.
+
+    :param headers: Список заголовков столбцов.
+    :return: Номера столбцов с названием товара, ценой и весом.
+    """
+    product_name_number = price_number = weight_number = None
+    for index, header in enumerate(headers):
+        header = header.strip().lower()
+        if header in PRODUCT_COLUMNS:
+            product_name_number = index
+        if header in PRICE_COLUMNS:
+            price_number = index
+        if header in WEIGHT_COLUMNS:
+            weight_number = index
+    if None in (product_name_number, price_number, weight_number):
+        raise ValueError(f"Не найдены столбцы с названием товара, ценой и весом: {headers}")
+    return product_name_number, price_number, weight_number
+
+
+def parse_price_file(path):
+    """
+    Читает файл прайса построчно и возвращает его столбцы.
+
+    Файл не загружается в память целиком: строки разбираются по мере чтения
+    модулем csv, поэтому поля в кавычках с запятыми внутри читаются корректно.
+    Названия товаров кодируются номерами в отсортированном списке уникальных
+    названий файла, строки упорядочиваются по цене за кг, затем по названию,
+    цене и весу (как в PriceTable.sorted).
+
+    :param path: Путь к файлу.
+    :return: Кортеж (словарь столбцов для PriceTable.from_sorted_parts, время разбора в секундах).
+    """
+    started = time.perf_counter()
+    name_ids = {}
+    name_codes = array('i')
+    value = array('d')
+    price_column = array('q')
+    weight_column = array('q')
+    with open(path, 'r', newline='') as f:
+        reader = csv.reader(f)
+        headers = next(reader, None)
+        if headers is not None:
+            product_name_number, price_number, weight_number = search_product_price_weight(headers)
+            for line_data in reader:
+                if not line_data:
+                    continue
+                product_name = line_data[product_name_number].strip().lower()
+                price = int(line_data[price_number].strip())
+                weight = int(line_data[weight_number].strip())
+                name_codes.append(name_ids.setdefault(product_name, len(name_ids)))
+                value.append(round(price / weight, 2))
+                price_column.append(price)
+                weight_column.append(weight)
+    # Коды названий перенумеровываются в алфавитном порядке, чтобы сортировка не сравнивала строки
+    names = sorted(name_ids)
+    rank = np.empty(len(names), dtype=np.int32)
+    rank[np.fromiter(map(name_ids.__getitem__, names), dtype=np.int64, count=len(names))] = \
+        np.arange(len(names), dtype=np.int32)
+    name_codes = rank[np.frombuffer(name_codes, dtype=np.int32)]
+    value = np.frombuffer(value, dtype=np.float64)
+    price_column = np.frombuffer(price_column, dtype=np.int64)
+    weight_column = np.frombuffer(weight_column, dtype=np.int64)
+    order = np.lexsort((weight_column, price_column, name_codes, value))
+    part = {
+        'file': os.path.basename(path),
+        'names': names,
+        'name_codes': name_codes[order],
+        'value': value[order],
+        'price': price_column[order],
+        'weight': weight_column[order],
+    }
+    return part, time.perf_counter() - started
+
+
+def load_price_files(paths, max_workers=None, errors=None):
+    """
+    Разбирает файлы прайсов параллельно в пуле процессов и собирает общую таблицу.
+
+    Процессы возвращают столбцы в виде массивов, поэтому передача результатов
+    не требует сериализации отдельных строк. Каждый процесс возвращает уже
+    отсортированную часть, и общий порядок строк собирается k-путевым
+    слиянием частей (PriceTable.from_sorted_parts) без повторной сортировки.
+
+    :param paths: Список путей к файлам.
+    :param max_workers: Число процессов (по умолчанию число ядер; 1 - разбор в текущем процессе).
+    :param errors: Словарь, в который записываются ошибки по файлам; если не задан, ошибка прерывает загрузку.
+    :return: Кортеж (PriceTable, отсортированная по цене за кг, длина самого длинного названия,
+             статистика {файл: {'rows', 'seconds', 'rows_per_sec'}}).
+    """
+    started = time.perf_counter()
+    parts, stats = parse_price_files(paths, max_workers, errors)
+    table = PriceTable.from_sorted_parts(parts)
+    seconds = time.perf_counter() - started
+    logging.info(f"Загружено {len(table)} строк из {len(stats)} файлов за {seconds:.2f} с "
+                 f"({len(table) / seconds if seconds else 0:.0f} строк/с)")
+    return table, table.name_length(), stats
+
+
+def parse_price_files(paths, max_workers=None, errors=None):
+    """
+    Разбирает файлы прайсов параллельно в пуле процессов.
+
+    :param paths: Список путей к файлам.
+    :param max_workers: Число процессов (по умолчанию число ядер; 1 - разбор в текущем процессе).
+    :param errors: Словарь, в который записываются ошибки по файлам; если не задан, ошибка прерывает загрузку.
+    :return: Кортеж (список отсортированных столбцов файлов для PriceTable.from_sorted_parts,
+             статистика {файл: {'rows', 'seconds', 'rows_per_sec'}}).
+    """
+    parts = []
+    stats = {}
+    for path, result, error in _parse_all(paths, max_workers):
+        file_name = os.path.basename(path)
+        if error is not None:
+            logging.error(f"Не удалось прочитать файл {file_name}: {error}")
+            if errors is None:
+                raise error
+            errors[file_name] = error
+            continue
+        part, seconds = result
+        parts.append(part)
+        rows = len(part['value'])
+        rate = rows / seconds if seconds else 0.0
+        stats[file_name] = {'rows': rows, 'seconds': seconds, 'rows_per_sec': rate}
+        logging.info(f"Файл {file_name}: {rows} строк за {seconds:.3f} с ({rate:.0f} строк/с)")
+    return parts, stats
+
+
+def _parse_all(paths, max_workers):
+    """
+    Разбирает файлы в текущем процессе или в пуле процессов.
+
+    :return: Генератор кортежей (путь, результат parse_price_file, ошибка).
+    """
+    workers = min(max_workers or os.cpu_count() or 1, len(paths))
+    if workers <= 1:
+        for path in paths:
+            try:
+                yield path, parse_price_file(path), None
+            except Exception as e:
+                yield path, None, e
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [(path, executor.submit(parse_price_file, path)) for path in paths]
+        for path, future in futures:
+            try:
+                yield path, future.result(), None
+            except Exception as e:
+                yield path, None, e
@@ -0,0 +1,260 @@
+import re
+import logging
+import numpy as np
+
+# Настройка логирования
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Параметры MinHash: число хэш-функций и разбиение подписи на полосы для LSH
+NUM_PERM = 128
+BANDS = 32
+# Число строк подписи в полосе индекса для запросов: короткие полосы находят и частично похожие названия
+QUERY_ROWS = 2
+WORD = re.compile(r'[^\W\d_]+')
+NUMBER = re.compile(r'\d+')
+
+
+def normalize_name(name):
+    """
+    Нормализует название товара для нечеткого сравнения.
+
+    Название приводится к нижнему регистру, ё заменяется на е, знаки
+    препинания отбрасываются, слова сортируются, числа отделяются от слов
+    (фасовка и жирность должны совпадать точно).
+
+    :param name: Название товара.
+    :return: Кортеж (строка из отсортированных слов, кортеж чисел).
+    """
+    name = name.lower().replace('ё', 'е')
+    return ' '.join(sorted(set(WORD.findall(name)))), tuple(sorted(NUMBER.findall(name)))
+
+
+class ProductMatcher():
+    """
+    Индекс приблизительного сходства названий товаров (MinHash и LSH).
+
+    Для каждого нормализованного названия строится подпись MinHash по
+    триграммам символов; доля совпадающих элементов подписей оценивает
+    коэффициент Жаккара. Кандидатами в пары считаются только названия из
+    одной группы: с одинаковой полосой подписи (LSH) и одинаковыми числами.
+    Внутри группы название сравнивается с первым и предыдущим участником,
+    поэтому попарное сравнение всех названий не выполняется.
+
+    Пара объединяется, если числа названий (фасовка, жирность) совпадают,
+    а оценка сходства не ниже порога; опечатки, порядок слов и лишние слова
+    допускаются, пока названия достаточно похожи.
+    """
+
+    def __init__(self, names, threshold=0.5, num_perm=NUM_PERM, bands=BANDS, seed=0):
+        """
+        :param names: Список названий товаров (например, словарь PriceTable.names).
+        :param threshold: Минимальная оценка коэффициента Жаккара для объединения названий.
+        :param num_perm: Число хэш-функций MinHash.
+        :param bands: Число полос LSH (num_perm должно делиться на bands).
+        :param seed: Начальное значение генератора коэффициентов хэш-функций.
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm должно делиться на bands")
+        logging.info(f"Построение индекса сходства по {len(names)} названиям")
+        self.names = names
+        self.threshold = threshold
+        self.bands = bands
+        rng = np.random.default_rng(seed)
+        self._seeds = rng.integers(0, 1 << 63, num_perm, dtype=np.uint64)
+        self._multipliers = rng.integers(0, 1 << 63, num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        normalized = [normalize_name(name) for name in names]
+        # Наборы чисел кодируются по словарю: равенство кодов означает равенство чисел без коллизий хэшей
+        self._number_codes = {}
+        self.numbers = np.array([self._number_codes.setdefault(numbers, len(self._number_codes))
+                                 for _, numbers in normalized], dtype=np.int64)
+        # Одинаковые после нормализации названия (один товар у разных поставщиков) получают общую подпись
+        texts = {}
+        inverse = np.array([texts.setdefault(words, len(texts)) for words, _ in normalized], dtype=np.int64)
+        self.signatures = self._signatures(list(texts))[inverse]
+        self.clusters = self._cluster()
+        self._query_bands = None
+        logging.info(f"Индекс сходства построен: {len(np.unique(self.clusters))} кластеров")
+
+    def similar(self, text, threshold=0.5, use_numbers=None):
+        """
+        Ищет названия, похожие на текст.
+
+        :param text: Текст запроса.
+        :param threshold: Минимальная оценка коэффициента Жаккара.
+        :param use_numbers: Требовать совпадения чисел (по умолчанию - если в запросе есть числа).
+        :return: Список пар (оценка сходства, номер названия) по убыванию сходства.
+        """
+        words, numbers = normalize_name(text)
+        signature = self._signatures([words])
+        if self._query_bands is None:
+            self._query_bands = self._sorted_bands(np.zeros(len(self.names), dtype=np.int64),
+                                                   signature.shape[1] // QUERY_ROWS)
+        query_keys = self._band_keys(signature, np.zeros(1, dtype=np.int64), len(self._query_bands))
+        candidates = []
+        for band, (keys, order) in enumerate(self._query_bands):
+            start = np.searchsorted(keys, query_keys[band, 0], side='left')
+            stop = np.searchsorted(keys, query_keys[band, 0], side='right')
+            candidates.append(order[start:stop])
+        candidates = np.unique(np.concatenate(candidates))
+        if use_numbers or (use_numbers is None and numbers):
+            candidates = candidates[self.numbers[candidates] == self._number_codes.get(numbers, -1)]
+        scores = (self.signatures[candidates] == signature[0]).mean(axis=1)
+        keep = scores >= threshold
+        ranked = np.lexsort((candidates[keep], -scores[keep]))
+        return [(float(score), int(code)) for score, code in zip(scores[keep][ranked], candidates[keep][ranked])]
+
+    def _signatures(self, texts):
+        """
+        Вычисляет подписи MinHash по триграммам символов.
+
+        :return: Массив (число текстов, num_perm) типа uint32.
+        """
+        if not texts:
+            return np.empty((0, len(self._seeds)), dtype=np.uint32)
+        # Все тексты кодируются одним массивом символов, триграммы на стыках текстов отбрасываются
+        padded = [f" {text} " if text else "   " for text in texts]
+        lengths = np.fromiter((len(text) for text in padded), dtype=np.int64, count=len(padded))
+        chars = np.frombuffer(''.join(padded).encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+        counts = lengths - 2
+        offsets = np.cumsum(lengths) - lengths
+        starts = np.cumsum(counts) - counts
+        positions = np.arange(counts.sum()) + np.repeat(offsets - starts, counts)
+        with np.errstate(over='ignore'):
+            grams = (chars[positions] << np.uint64(42)) | (chars[positions + 1] << np.uint64(21)) | chars[positions + 2]
+            values = _mix(grams)
+        signatures = np.empty((len(texts), len(self._seeds)), dtype=np.uint32)
+        with np.errstate(over='ignore'):
+            for column, (seed, multiplier) in enumerate(zip(self._seeds, self._multipliers)):
+                # Хэш-функция умножением со сдвигом поверх уже перемешанных значений триграмм
+                permuted = ((values ^ seed) * multiplier) >> np.uint64(32)
+                signatures[:, column] = np.minimum.reduceat(permuted, starts)
+        return signatures
+
+    def _band_keys(self, signatures, numbers, bands):
+        """
+        Вычисляет ключи полос LSH.
+
+        :return: Массив (bands, число подписей) типа int64.
+        """
+        rows = signatures.shape[1] // bands
+        keys = np.empty((bands, len(signatures)), dtype=np.int64)
+        with np.errstate(over='ignore'):
+            for band in range(bands):
+                key = numbers.astype(np.uint64) + np.uint64(band)
+                for column in range(band * rows, (band + 1) * rows):
+                    key = key * np.uint64(1000003) ^ signatures[:, column].astype(np.uint64)
+                keys[band] = key.view(np.int64)
+        return keys
+
+    def _sorted_bands(self, numbers, bands):
+        """
+        Возвращает отсортированные ключи полос и номера названий для поиска групп.
+
+        :return: Список пар (отсортированные ключи, номера названий) по полосам.
+        """
+        tables = []
+        for keys in self._band_keys(self.signatures, numbers, bands):
+            order = np.argsort(keys, kind='stable')
+            tables.append((keys[order], order))
+        return tables
+
+    def _cluster(self):
+        """
+        Объединяет похожие названия в кластеры.
+
+        :return: Массив номеров кластеров для каждого названия (номер - наименьший номер названия в кластере).
+        """
+        if not len(self.names):
+            return np.empty(0, dtype=np.int64)
+        left, right = [], []
+        for keys, order in self._sorted_bands(self.numbers, self.bands):
+            same = keys[1:] == keys[:-1]
+            # Сравнение с предыдущим участником группы
+            left.append(order[1:][same])
+            right.append(order[:-1][same])
+            # Сравнение с первым участником группы
+            group_start = np.concatenate([[True], ~same])
+            first = np.maximum.accumulate(np.where(group_start, np.arange(len(keys)), 0))
+            left.append(order[~group_start])
+            right.append(order[first[~group_start]])
+        left = np.concatenate(left)
+        right = np.concatenate(right)
+        # Одна и та же пара находится в нескольких полосах: каждая пара сравнивается один раз
+        pairs = np.unique(np.minimum(left, right).astype(np.int64) * len(self.names) + np.maximum(left, right))
+        left, right = pairs // len(self.names), pairs % len(self.names)
+        # Ключ полосы включает код чисел, но ключи полос могут совпасть: коды сравниваются явно
+        matched = self.numbers[left] == self.numbers[right]
+        left, right = left[matched], right[matched]
+        matched = np.count_nonzero(self.signatures[left] == self.signatures[right], axis=1) >= \
+            self.threshold * self.signatures.shape[1]
+        return _connected_components(len(self.names), left[matched], right[matched])
+
+
+def best_offers(table, matcher, min_files=2):
+    """
+    Находит самое дешевое предложение за кг в каждом кластере похожих товаров.
+
+    :param table: Экземпляр PriceTable, упорядоченный по цене за кг.
+    :param matcher: Экземпляр ProductMatcher, построенный по table.names.
+    :param min_files: Минимальное число разных файлов прайсов в кластере.
+    :return: Список словарей {'names', 'files', 'rows', 'best'} по возрастанию лучшей цены за кг.
+    """
+    if not table.by_value:
+        table = table.sorted()
+    name_codes = table.ordered_name_codes()
+    clusters = matcher.clusters[name_codes]
+    file_codes = table.file_codes[table.order]
+    # Первая строка кластера в порядке цены за кг - самая дешевая
+    cluster_ids, first, counts = np.unique(clusters, return_index=True, return_counts=True)
+    pairs = np.unique(clusters.astype(np.int64) * (len(table.files) + 1) + file_codes)
+    files_per_cluster = np.bincount(np.searchsorted(cluster_ids, pairs // (len(table.files) + 1)),
+                                    minlength=len(cluster_ids))
+    selected = np.flatnonzero(files_per_cluster >= min_files)
+    selected = selected[np.argsort(first[selected], kind='stable')]
+    if not len(selected):
+        return []
+    # Пары (кластер, название) кодируются одним числом и упорядочиваются по кластеру
+    size = len(table.names)
+    name_pairs = np.unique(clusters.astype(np.int64) * size + name_codes)
+    pair_clusters = name_pairs // size
+    name_starts = np.searchsorted(pair_clusters, cluster_ids[selected])
+    name_stops = np.searchsorted(pair_clusters, cluster_ids[selected], side='right')
+    pair_names = (name_pairs % size).tolist()
+    offers = []
+    for start, stop, files, rows, best in zip(name_starts.tolist(), name_stops.tolist(),
+                                              files_per_cluster[selected].tolist(), counts[selected].tolist(),
+                                              table.rows(first[selected])):
+        offers.append({'names': [table.names[code] for code in pair_names[start:stop]],
+                       'files': files, 'rows': rows, 'best': best})
+    return offers
+
+
+def _mix(values):
+    """
+    Перемешивает 64-битные значения (финализатор splitmix64).
+    """
+    with np.errstate(over='ignore'):
+        values = (values ^ (values >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        values = (values ^ (values >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return values ^ (values >> np.uint64(31))
+
+
+def _connected_components(size, left, right):
+    """
+    Находит компоненты связности распространением меток с переходом по указателям.
+
+    :return: Массив меток (наименьший номер вершины в компоненте).
+    """
+    labels = np.arange(size, dtype=np.int64)
+    while len(left):
+        low = np.minimum(labels[left], labels[right])
+        if np.array_equal(labels[left], low) and np.array_equal(labels[right], low):
+            break
+        np.minimum.at(labels, left, low)
+        np.minimum.at(labels, right, low)
+        while True:
+            jumped = labels[labels]
+            if np.array_equal(jumped, labels):
+                break
+            labels = jumped
+    return labels
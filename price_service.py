@@ -0,0 +1,249 @@
+import os
+import json
+import time
+import asyncio
+import logging
+from urllib.parse import urlsplit, parse_qs
+import instrumentation
+from price_export import json_record
+from price_loader import find_price_files
+from project import PriceMachine
+
+# Настройка логирования
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 1000
+STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+               500: 'Internal Server Error'}
+INTERNAL_ERROR = {'error': "Внутренняя ошибка сервера"}
+
+
+class PriceService():
+    """
+    Локальный HTTP/JSON-сервис запросов к каталогу товаров на asyncio.
+
+    Каталог загружается один раз и хранится в памяти; каждый запрос
+    выполняется в пуле потоков по экземпляру PriceMachine, текущему на момент
+    его получения. Фоновая задача периодически проверяет
+    файлы прайсов и при изменениях загружает каталог заново в отдельном
+    потоке, после чего подменяет ссылку на него, не останавливая обработку
+    запросов.
+
+    Запросы (GET, ответ в JSON):
+        /search?q=сыр&min_price=100&max_price=500&min_weight=1&max_weight=2&file=price_1.csv&offset=0&limit=50
+        /cheapest?n=10&q=сыр - N самых дешевых за кг товаров с теми же условиями отбора
+        /stats - число строк и файлов, время последней загрузки и число загрузок
+        /metrics - сводка метрик этапов (если сбор включен, см. instrumentation.enable)
+    """
+
+    def __init__(self, directory='', snapshot_dir=None, host='127.0.0.1', port=8080, reload_interval=5.0,
+                 max_workers=None):
+        """
+        :param directory: Каталог с файлами прайсов (по умолчанию каталог модуля project).
+        :param snapshot_dir: Каталог снимка каталога (см. PriceMachine.load_prices).
+        :param host: Адрес для входящих соединений.
+        :param port: Порт (0 - выбрать свободный).
+        :param reload_interval: Период проверки изменений файлов прайсов в секундах (None - без перезагрузки).
+        :param max_workers: Число процессов для разбора файлов.
+        """
+        self.directory = directory or os.path.dirname(os.path.realpath(__file__))
+        self.snapshot_dir = snapshot_dir
+        self.host = host
+        self.port = port
+        self.reload_interval = reload_interval
+        self.max_workers = max_workers
+        self.pm = None
+        self.signature = None
+        self.loaded_at = None
+        self.loads = 0
+        self._server = None
+        self._reload_task = None
+
+    async def start(self):
+        """
+        Загружает каталог и начинает принимать соединения.
+
+        :return: Порт, на котором работает сервис.
+        """
+        await self.reload_if_changed()
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        if self.reload_interval:
+            self._reload_task = asyncio.create_task(self._reload_loop())
+        logging.info(f"Сервис каталога запущен на http://{self.host}:{self.port}")
+        return self.port
+
+    async def serve_forever(self):
+        """
+        Запускает сервис и обрабатывает запросы до остановки.
+        """
+        if self._server is None:
+            await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.close()
+
+    async def close(self):
+        """
+        Останавливает прием соединений и фоновую перезагрузку.
+        """
+        if self._reload_task is not None:
+            self._reload_task.cancel()
+            self._reload_task = None
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        logging.info("Сервис каталога остановлен")
+
+    async def reload_if_changed(self):
+        """
+        Загружает каталог заново, если изменился набор файлов прайсов, их размер или время изменения.
+
+        Загрузка выполняется в отдельном потоке, запросы в это время обслуживаются прежним каталогом.
+
+        :return: True, если каталог был загружен.
+        """
+        loop = asyncio.get_running_loop()
+        signature = await loop.run_in_executor(None, self._directory_signature)
+        if signature == self.signature:
+            return False
+        pm = await loop.run_in_executor(None, self._load)
+        self.pm, self.signature, self.loaded_at = pm, signature, time.time()
+        self.loads += 1
+        return True
+
+    def query(self, path, params, pm=None):
+        """
+        Выполняет запрос к каталогу.
+
+        :param path: Путь запроса ('/search', '/cheapest', '/stats' или '/metrics').
+        :param params: Словарь параметров запроса {имя: значение}.
+        :param pm: Экземпляр PriceMachine, к которому выполняется запрос (по умолчанию текущий каталог).
+        :return: Кортеж (код ответа HTTP, словарь для JSON).
+        """
+        pm = pm or self.pm
+        try:
+            if path == '/stats':
+                return 200, {'rows': len(pm.data), 'files': len(pm.data.files), 'loaded_at': self.loaded_at,
+                             'loads': self.loads}
+            if path == '/metrics':
+                return 200, {'enabled': instrumentation.is_enabled(), 'stages': instrumentation.summary()}
+            if path == '/search':
+                offset = _int_param(params, 'offset', 0)
+                limit = min(_int_param(params, 'limit', DEFAULT_LIMIT), MAX_LIMIT)
+            elif path == '/cheapest':
+                offset = 0
+                limit = min(_int_param(params, 'n', 10), MAX_LIMIT)
+            else:
+                return 404, {'error': f"Неизвестный путь: {path}"}
+            if offset < 0 or limit < 0:
+                raise ValueError("offset и limit должны быть неотрицательными")
+            view = self._select(pm, params)
+            rows = view[offset:offset + limit]
+            return 200, {'total': len(view), 'offset': offset, 'limit': limit,
+                         'items': [json_record(offset + number + 1, row) for number, row in enumerate(rows)]}
+        except ValueError as e:
+            return 400, {'error': str(e)}
+        except Exception:
+            logging.exception(f"Ошибка при обработке запроса {path} {params}")
+            return 500, dict(INTERNAL_ERROR)
+
+    def _select(self, pm, params):
+        """
+        Строит представление каталога по параметрам запроса.
+
+        :return: Экземпляр PriceView, упорядоченный по цене за кг.
+        """
+        view = pm.view()
+        if 'min_price' in params or 'max_price' in params:
+            view = view.price_range(_float_param(params, 'min_price', float('-inf')),
+                                    _float_param(params, 'max_price', float('inf')))
+        if 'min_weight' in params or 'max_weight' in params:
+            view = view.weight_range(_float_param(params, 'min_weight', float('-inf')),
+                                     _float_param(params, 'max_weight', float('inf')))
+        if params.get('file'):
+            view = view.files(*params['file'].split(','))
+        if params.get('q'):
+            view = view.find_text(params['q'])
+        return view
+
+    def _load(self):
+        pm = PriceMachine()
+        pm.load_prices(self.directory, self.max_workers, self.snapshot_dir)
+        # Индекс строится до подмены каталога, чтобы первый поиск не ждал его построения
+        pm._get_index()
+        return pm
+
+    def _directory_signature(self):
+        signature = []
+        for file_name in find_price_files(self.directory):
+            stat = os.stat(os.path.join(self.directory, file_name))
+            signature.append((file_name, stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+
+    async def _reload_loop(self):
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                if await self.reload_if_changed():
+                    logging.info(f"Каталог перезагружен: {len(self.pm.data)} строк")
+            except Exception as e:
+                logging.error(f"Не удалось перезагрузить каталог: {e}")
+
+    async def _handle(self, reader, writer):
+        try:
+            request_line = await reader.readline()
+            while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                pass
+            # Поиск и сериализация ответа выполняются в пуле потоков по каталогу на момент запроса,
+            # чтобы долгий запрос не останавливал цикл событий и перезагрузка не подменила каталог посреди ответа
+            status, body = await asyncio.get_running_loop().run_in_executor(None, self._respond, request_line, self.pm)
+            writer.write(f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n"
+                         f"Content-Type: application/json; charset=utf-8\r\n"
+                         f"Content-Length: {len(body)}\r\n"
+                         f"Connection: close\r\n\r\n".encode('latin-1') + body)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def _respond(self, request_line, pm):
+        """
+        Разбирает строку запроса и формирует ответ.
+
+        :return: Кортеж (код ответа HTTP, тело ответа в JSON).
+        """
+        try:
+            status, payload = self._dispatch(request_line, pm)
+            return status, json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        except Exception:
+            logging.exception(f"Ошибка при обработке запроса {request_line!r}")
+            return 500, json.dumps(INTERNAL_ERROR, ensure_ascii=False).encode('utf-8')
+
+    def _dispatch(self, request_line, pm):
+        parts = request_line.decode('latin-1').split()
+        if len(parts) < 2:
+            return 400, {'error': "Некорректный запрос"}
+        if parts[0] != 'GET':
+            return 405, {'error': f"Метод {parts[0]} не поддерживается"}
+        url = urlsplit(parts[1])
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        return self.query(url.path, params, pm)
+
+
+def _int_param(params, name, default):
+    try:
+        return int(params.get(name, default))
+    except ValueError:
+        raise ValueError(f"Параметр {name} должен быть целым числом")
+
+
+def _float_param(params, name, default):
+    try:
+        return float(params.get(name, default))
+    except ValueError:
+        raise ValueError(f"Параметр {name} должен быть числом")
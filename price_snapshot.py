@@ -0,0 +1,161 @@
+import os
+import json
+import hashlib
+import logging
+import numpy as np
+from price_table import PriceTable
+from price_loader import find_price_files, parse_price_files
+
+# Настройка логирования
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+SNAPSHOT_VERSION = 1
+SNAPSHOT_COLUMNS = ('value', 'name_codes', 'price', 'weight', 'file_codes', 'order')
+META_FILE = 'meta.json'
+
+
+class PriceSnapshot():
+    """
+    Снимок разобранного и отсортированного каталога на диске.
+
+    Столбцы PriceTable хранятся в файлах .npy и при загрузке отображаются в
+    память, словари названий и файлов и сведения о файлах прайсов (время
+    изменения, размер, хэш, число строк) - в meta.json вместе с путем
+    каталога прайсов, по которому построен снимок. Перед записью столбцов
+    meta.json удаляется и записывается последним, поэтому после прерванной
+    записи снимок строится заново.
+    """
+
+    def __init__(self, path):
+        """
+        :param path: Каталог снимка.
+        """
+        self.path = path
+
+    def load(self, source=None):
+        """
+        Загружает снимок, отображая столбцы в память.
+
+        :param source: Абсолютный путь каталога прайсов; снимок другого каталога не загружается.
+        :return: Кортеж (PriceTable или None, если снимка нет или он поврежден, сведения о файлах).
+        """
+        try:
+            with open(os.path.join(self.path, META_FILE), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get('version') != SNAPSHOT_VERSION:
+                raise ValueError(f"неподдерживаемая версия {meta.get('version')}")
+            if source is not None and meta.get('source') != source:
+                raise ValueError(f"снимок построен по каталогу {meta.get('source')}, а не {source}")
+            columns = {name: np.load(os.path.join(self.path, f"{name}.npy"), mmap_mode='r')
+                       for name in SNAPSHOT_COLUMNS}
+            if any(len(column) != meta['rows'] for column in columns.values()):
+                raise ValueError("число строк не совпадает с meta.json")
+        except (OSError, ValueError, KeyError) as e:
+            if os.path.exists(self.path):
+                logging.warning(f"Снимок каталога {self.path} не загружен: {e}")
+            return None, {}
+        table = PriceTable(columns['value'], columns['name_codes'], columns['price'], columns['weight'],
+                           columns['file_codes'], meta['names'], meta['files'], columns['order'], by_value=True)
+        logging.info(f"Загружен снимок каталога {self.path}: {len(table)} строк")
+        return table, meta['manifest']
+
+    def save(self, table, manifest, source=None):
+        """
+        Сохраняет полную отсортированную таблицу и сведения о файлах.
+
+        :param table: Экземпляр PriceTable.
+        :param manifest: Сведения о файлах прайсов {файл: {'mtime_ns', 'size', 'hash', 'rows'}}.
+        :param source: Абсолютный путь каталога прайсов.
+        """
+        os.makedirs(self.path, exist_ok=True)
+        # Снимок недействителен, пока не записан новый meta.json
+        meta_file = os.path.join(self.path, META_FILE)
+        if os.path.exists(meta_file):
+            os.remove(meta_file)
+        for name in SNAPSHOT_COLUMNS:
+            filename = os.path.join(self.path, f"{name}.npy")
+            with open(filename + '.tmp', 'wb') as f:
+                np.save(f, np.ascontiguousarray(getattr(table, name)))
+            os.replace(filename + '.tmp', filename)
+        self._save_meta(table, manifest, source)
+        logging.info(f"Снимок каталога сохранен в {self.path}: {len(table)} строк")
+
+    def refresh(self, directory, max_workers=None, errors=None):
+        """
+        Приводит снимок в соответствие с файлами прайсов в каталоге.
+
+        Файлы с прежними временем изменения и размером считаются неизменными;
+        для остальных сравнивается хэш содержимого. Разбираются только
+        добавленные и измененные файлы, их строки объединяются со снимком
+        через PriceTable.replace_files.
+
+        :param directory: Каталог с файлами прайсов.
+        :param max_workers: Число процессов для разбора файлов.
+        :param errors: Словарь, в который записываются ошибки по файлам; если не задан, ошибка прерывает загрузку.
+        :return: Кортеж (PriceTable, статистика разбора по файлам).
+        """
+        # Снимок другого каталога прайсов строится заново, а не дополняется файлами с теми же именами
+        source = os.path.abspath(directory)
+        table, manifest = self.load(source)
+        if table is None:
+            table = PriceTable.from_parts([])
+        current = find_price_files(directory)
+        updated = {}
+        changed = []
+        for file_name in current:
+            path = os.path.join(directory, file_name)
+            stat = os.stat(path)
+            entry = manifest.get(file_name)
+            if entry and entry['mtime_ns'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+                updated[file_name] = entry
+                continue
+            digest = file_hash(path)
+            if entry and entry['hash'] == digest:
+                updated[file_name] = dict(entry, mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+                continue
+            changed.append(file_name)
+            updated[file_name] = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'hash': digest}
+        removed = [file_name for file_name in manifest if file_name not in updated]
+        logging.info(f"Файлы прайсов: {len(changed)} новых или измененных, {len(removed)} удаленных, "
+                     f"{len(current) - len(changed)} без изменений")
+        if not changed and not removed:
+            if updated != manifest:
+                self._save_meta(table, updated, source)
+            return table, {}
+
+        paths = [os.path.join(directory, file_name) for file_name in changed]
+        parts, stats = parse_price_files(paths, max_workers, errors)
+        for file_name in changed:
+            if file_name in stats:
+                updated[file_name]['rows'] = stats[file_name]['rows']
+            else:
+                # Файл с ошибкой будет разобран повторно при следующем обновлении
+                del updated[file_name]
+        table = table.replace_files(removed + changed, parts)
+        self.save(table, updated, source)
+        return table, stats
+
+    def _save_meta(self, table, manifest, source):
+        self._write_meta({'version': SNAPSHOT_VERSION, 'source': source, 'rows': len(table.value),
+                          'names': table.names, 'files': table.files, 'manifest': manifest})
+
+    def _write_meta(self, meta):
+        filename = os.path.join(self.path, META_FILE)
+        with open(filename + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(filename + '.tmp', filename)
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """
+    Вычисляет хэш содержимого файла, читая его частями.
+
+    :param path: Путь к файлу.
+    :param chunk_size: Размер читаемой части в байтах.
+    :return: Шестнадцатеричная строка хэша BLAKE2b.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -0,0 +1,319 @@
+import bisect
+from itertools import chain
+import logging
+import numpy as np
+
+# Настройка логирования
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Число строк, преобразуемых в кортежи за один шаг при переборе таблицы
+ITER_CHUNK = 65536
+
+
+class PriceTable():
+    """
+    Колоночное хранилище каталога товаров.
+
+    Цена за кг, цена и вес хранятся в массивах NumPy, названия товаров и имена
+    файлов - в словарях (отсортированных списках уникальных строк) и массивах
+    кодов. Так как словари отсортированы, порядок кодов совпадает с порядком
+    строк, и сортировка выполняется np.lexsort без сравнения строк.
+
+    Порядок строк задается перестановкой order: фильтрация и сортировка
+    создают новую перестановку и не копируют столбцы, поэтому результат
+    фильтрации - легкое представление над теми же столбцами. Если строки
+    упорядочены по цене за кг (by_value), диапазон цен отбирается бинарным
+    поиском за O(log n) срезом перестановки без копирования. Для совместимости
+    таблица ведет себя как последовательность кортежей
+    (цена за кг, название, цена, вес, файл).
+    """
+
+    def __init__(self, value, name_codes, price, weight, file_codes, names, files, order=None, by_value=False):
+        """
+        :param value: Массив цен за кг.
+        :param name_codes: Массив кодов названий (номера в names).
+        :param price: Массив цен.
+        :param weight: Массив весов.
+        :param file_codes: Массив кодов файлов (номера в files).
+        :param names: Отсортированный список уникальных названий.
+        :param files: Отсортированный список уникальных имен файлов.
+        :param order: Перестановка строк (по умолчанию порядок хранения).
+        :param by_value: Строки в порядке order упорядочены по цене за кг.
+        """
+        self.value = value
+        self.name_codes = name_codes
+        self.price = price
+        self.weight = weight
+        self.file_codes = file_codes
+        self.names = names
+        self.files = files
+        self.order = np.arange(len(value), dtype=np.int64) if order is None else order
+        self.by_value = by_value
+
+    @classmethod
+    def from_parts(cls, parts):
+        """
+        Собирает таблицу из столбцов отдельных файлов.
+
+        :param parts: Список словарей с ключами 'file', 'names' (список уникальных названий файла),
+                      'name_codes', 'value', 'price', 'weight'.
+        :return: Экземпляр PriceTable (не отсортированный).
+        """
+        # Списки названий частей обычно уже отсортированы, и timsort только сливает их
+        names = list(dict.fromkeys(sorted(chain.from_iterable(part['names'] for part in parts))))
+        position = {name: code for code, name in enumerate(names)}
+        files = sorted({part['file'] for part in parts})
+        file_position = {file_name: code for code, file_name in enumerate(files)}
+        name_codes, file_codes = [], []
+        for part in parts:
+            mapping = np.array([position[name] for name in part['names']], dtype=np.int32)
+            name_codes.append(mapping[part['name_codes']])
+            file_codes.append(np.full(len(part['value']), file_position[part['file']], dtype=np.int32))
+        return cls(_concat([part['value'] for part in parts], np.float64), _concat(name_codes, np.int32),
+                   _concat([part['price'] for part in parts], np.int64),
+                   _concat([part['weight'] for part in parts], np.int64), _concat(file_codes, np.int32),
+                   names, files)
+
+    @classmethod
+    def from_sorted_parts(cls, parts):
+        """
+        Собирает упорядоченную по цене за кг таблицу из частей, каждая из которых уже отсортирована.
+
+        Общий порядок получается слиянием частей, а не полной сортировкой:
+        устойчивая сортировка np.argsort(kind='stable') (timsort) находит в общем
+        массиве ключей уже упорядоченные участки и сливает их за O(n log k)
+        сравнений, где k - число частей.
+
+        :param parts: Список столбцов файлов для from_parts, строки каждой части упорядочены
+                      по цене за кг, названию, цене и весу (как возвращает price_loader.parse_price_file).
+        :return: Экземпляр PriceTable, упорядоченный как после sorted.
+        """
+        table = cls.from_parts(parts)
+        # Словарь названий отсортирован, поэтому перекодировка сохраняет порядок строк внутри части
+        table.order = np.argsort(table._keys(table.order), kind='stable')
+        table.by_value = True
+        return table
+
+    @classmethod
+    def from_rows(cls, rows):
+        """
+        Собирает таблицу из списка кортежей (цена за кг, название, цена, вес, файл).
+
+        :param rows: Список кортежей.
+        :return: Экземпляр PriceTable в исходном порядке строк.
+        """
+        names = sorted({row[1] for row in rows})
+        files = sorted({row[4] for row in rows})
+        position = {name: code for code, name in enumerate(names)}
+        file_position = {file_name: code for code, file_name in enumerate(files)}
+        return cls(np.array([row[0] for row in rows], dtype=np.float64),
+                   np.array([position[row[1]] for row in rows], dtype=np.int32),
+                   np.array([row[2] for row in rows], dtype=np.int64),
+                   np.array([row[3] for row in rows], dtype=np.int64),
+                   np.array([file_position[row[4]] for row in rows], dtype=np.int32),
+                   names, files)
+
+    def __len__(self):
+        return len(self.order)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return self.rows(np.arange(len(self))[position])
+        row = self.order[position]
+        return (float(self.value[row]), self.names[self.name_codes[row]], int(self.price[row]),
+                int(self.weight[row]), self.files[self.file_codes[row]])
+
+    def __iter__(self):
+        for start in range(0, len(self), ITER_CHUNK):
+            yield from self.rows(np.arange(start, min(start + ITER_CHUNK, len(self))))
+
+    def rows(self, positions):
+        """
+        Возвращает строки таблицы в виде кортежей.
+
+        :param positions: Номера строк в текущем порядке таблицы.
+        :return: Список кортежей (цена за кг, название, цена, вес, файл).
+        """
+        rows = self.order[np.asarray(positions, dtype=np.int64)]
+        names, files = self.names, self.files
+        return list(zip(self.value[rows].tolist(), [names[code] for code in self.name_codes[rows].tolist()],
+                        self.price[rows].tolist(), self.weight[rows].tolist(),
+                        [files[code] for code in self.file_codes[rows].tolist()]))
+
+    def take(self, positions):
+        """
+        Возвращает таблицу из выбранных строк без копирования столбцов.
+
+        :param positions: Номера строк, срез или булева маска в текущем порядке таблицы.
+        :return: Экземпляр PriceTable с общими столбцами.
+        """
+        # Срез и маска сохраняют взаимный порядок строк
+        keeps_order = (isinstance(positions, slice) and positions.step in (None, 1)) or \
+            (isinstance(positions, np.ndarray) and positions.dtype == bool)
+        return PriceTable(self.value, self.name_codes, self.price, self.weight, self.file_codes,
+                          self.names, self.files, self.order[positions], self.by_value and keeps_order)
+
+    def sorted(self):
+        """
+        Сортирует строки по цене за кг, затем по названию, цене, весу и файлу.
+
+        :return: Экземпляр PriceTable с отсортированной перестановкой.
+        """
+        rows = self.order
+        keys = (self.file_codes[rows], self.weight[rows], self.price[rows], self.name_codes[rows], self.value[rows])
+        table = self.take(np.lexsort(keys))
+        table.by_value = True
+        return table
+
+    def filter_by_value(self, min_value, max_value):
+        """
+        Отбирает строки с ценой за кг в заданном диапазоне.
+
+        Для таблицы, упорядоченной по цене за кг, границы находятся бинарным
+        поиском, а результат - срез перестановки без копирования.
+
+        :param min_value: Минимальная цена за кг.
+        :param max_value: Максимальная цена за кг.
+        :return: Экземпляр PriceTable с общими столбцами.
+        """
+        if self.by_value:
+            value = self.value
+            start = bisect.bisect_left(self.order, min_value, key=lambda row: value[row])
+            stop = bisect.bisect_right(self.order, max_value, lo=start, key=lambda row: value[row])
+            return self.take(slice(start, stop))
+        value = self.value[self.order]
+        return self.take((value >= min_value) & (value <= max_value))
+
+    def filter_by_weight(self, min_weight, max_weight):
+        """
+        Отбирает строки с весом в заданном диапазоне.
+
+        :param min_weight: Минимальный вес.
+        :param max_weight: Максимальный вес.
+        :return: Экземпляр PriceTable с общими столбцами.
+        """
+        weight = self.weight[self.order]
+        return self.take((weight >= min_weight) & (weight <= max_weight))
+
+    def filter_by_files(self, files):
+        """
+        Отбирает строки из указанных файлов прайсов.
+
+        :param files: Имена файлов.
+        :return: Экземпляр PriceTable с общими столбцами.
+        """
+        files = set(files)
+        codes = [code for code, file_name in enumerate(self.files) if file_name in files]
+        return self.take(np.isin(self.file_codes[self.order], codes))
+
+    def filter_by_rows(self, rows):
+        """
+        Отбирает строки с указанными номерами в хранилище столбцов.
+
+        :param rows: Массив номеров строк хранилища (значений перестановки order).
+        :return: Экземпляр PriceTable с общими столбцами в прежнем порядке.
+        """
+        return self.take(np.isin(self.order, rows))
+
+    def replace_files(self, files, parts):
+        """
+        Удаляет строки указанных файлов и добавляет строки из новых частей без полной пересортировки.
+
+        Таблица должна быть полной и отсортированной (как после sorted). Новые
+        строки сортируются отдельно и вставляются в существующий порядок
+        бинарным поиском; словари названий и файлов пересобираются только из
+        используемых значений.
+
+        :param files: Имена файлов, строки которых удаляются.
+        :param parts: Список отсортированных столбцов файлов для from_sorted_parts.
+        :return: Новый экземпляр PriceTable, отсортированный и без неиспользуемых строк.
+        """
+        files = set(files)
+        removed_codes = [code for code, file_name in enumerate(self.files) if file_name in files]
+        keep = ~np.isin(self.file_codes, removed_codes)
+        added = PriceTable.from_sorted_parts(parts)
+
+        name_used = np.zeros(len(self.names), dtype=bool)
+        name_used[self.name_codes[keep]] = True
+        file_used = np.zeros(len(self.files), dtype=bool)
+        file_used[self.file_codes[keep]] = True
+        names, (old_names, added_names) = _merge_dictionaries(
+            [name for name, used in zip(self.names, name_used) if used], added.names, name_used, len(self.names))
+        files, (old_files, added_files) = _merge_dictionaries(
+            [name for name, used in zip(self.files, file_used) if used], added.files, file_used, len(self.files))
+
+        kept = int(keep.sum())
+        table = PriceTable(np.concatenate([self.value[keep], added.value]),
+                           np.concatenate([old_names[self.name_codes[keep]], added_names[added.name_codes]]),
+                           np.concatenate([self.price[keep], added.price]),
+                           np.concatenate([self.weight[keep], added.weight]),
+                           np.concatenate([old_files[self.file_codes[keep]], added_files[added.file_codes]]),
+                           names, files)
+        # Номера сохраненных строк после удаления остальных
+        position = np.cumsum(keep) - 1
+        old_order = position[self.order[keep[self.order]]]
+        added_order = added.order + kept
+        insert_at = np.searchsorted(table._keys(old_order), table._keys(added_order), side='right')
+        table.order = np.insert(old_order, insert_at, added_order)
+        table.by_value = True
+        return table
+
+    def _keys(self, rows):
+        # Структурированный массив сравнивается поэлементно в порядке полей, как кортежи строк
+        keys = np.empty(len(rows), dtype=[('value', np.float64), ('name', np.int32), ('price', np.int64),
+                                          ('weight', np.int64), ('file', np.int32)])
+        keys['value'] = self.value[rows]
+        keys['name'] = self.name_codes[rows]
+        keys['price'] = self.price[rows]
+        keys['weight'] = self.weight[rows]
+        keys['file'] = self.file_codes[rows]
+        return keys
+
+    def name_length(self):
+        """
+        Возвращает длину самого длинного названия в словаре.
+
+        :return: Число символов.
+        """
+        return max((len(name) for name in self.names), default=0)
+
+    def ordered_name_codes(self):
+        """
+        Возвращает коды названий в текущем порядке таблицы.
+
+        :return: Массив кодов названий (номера в self.names).
+        """
+        return self.name_codes[self.order]
+
+    def nbytes(self):
+        """
+        Возвращает объем памяти, занятый массивами таблицы.
+
+        :return: Размер в байтах.
+        """
+        return sum(column.nbytes for column in (self.value, self.name_codes, self.price, self.weight,
+                                                self.file_codes, self.order))
+
+
+def _merge_dictionaries(old, added, used, size):
+    """
+    Объединяет два отсортированных словаря строк.
+
+    :param old: Используемые значения прежнего словаря.
+    :param added: Значения словаря новых строк.
+    :param used: Маска используемых кодов прежнего словаря.
+    :param size: Размер прежнего словаря.
+    :return: Кортеж (новый словарь, (массив перекодировки прежних кодов, массив перекодировки новых кодов)).
+    """
+    merged = sorted(set(old).union(added))
+    position = {value: code for code, value in enumerate(merged)}
+    old_mapping = np.full(size, -1, dtype=np.int32)
+    old_mapping[used] = [position[value] for value in old]
+    added_mapping = np.array([position[value] for value in added], dtype=np.int32)
+    return merged, (old_mapping, added_mapping)
+
+
+def _concat(arrays, dtype):
+    if not arrays:
+        return np.empty(0, dtype=dtype)
+    return np.concatenate(arrays).astype(dtype, copy=False)
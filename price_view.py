@@ -0,0 +1,82 @@
+import logging
+import numpy as np
+
+# Настройка логирования
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+class PriceView():
+    """
+    Неизменяющее представление каталога с цепочкой условий отбора.
+
+    Каждое условие возвращает новое представление над теми же столбцами
+    PriceTable, основной каталог не изменяется. Представление ведет себя как
+    последовательность кортежей (цена за кг, название, цена, вес, файл).
+
+    Пример:
+        pm.view().price_range(100, 500).weight_range(1, 2).find_text('сыр')
+    """
+
+    def __init__(self, table, search=None):
+        """
+        :param table: Экземпляр PriceTable.
+        :param search: Функция, возвращающая номера строк хранилища с названием, содержащим текст
+                       (по умолчанию - просмотр словаря названий).
+        """
+        self.table = table
+        self.search = search
+
+    def price_range(self, min_price, max_price):
+        """
+        Отбирает строки с ценой за кг в диапазоне (бинарным поиском, если строки упорядочены по цене за кг).
+
+        :param min_price: Минимальная цена за кг.
+        :param max_price: Максимальная цена за кг.
+        :return: Новое представление.
+        """
+        return PriceView(self.table.filter_by_value(min_price, max_price), self.search)
+
+    def weight_range(self, min_weight, max_weight):
+        """
+        Отбирает строки с весом в диапазоне.
+
+        :param min_weight: Минимальный вес.
+        :param max_weight: Максимальный вес.
+        :return: Новое представление.
+        """
+        return PriceView(self.table.filter_by_weight(min_weight, max_weight), self.search)
+
+    def files(self, *files):
+        """
+        Отбирает строки из указанных файлов прайсов.
+
+        :param files: Имена файлов.
+        :return: Новое представление.
+        """
+        return PriceView(self.table.filter_by_files(files), self.search)
+
+    def find_text(self, text):
+        """
+        Отбирает строки, название которых содержит текст.
+
+        :param text: Часть названия товара.
+        :return: Новое представление.
+        """
+        text = text.lower()
+        table = self.table
+        if self.search is not None:
+            return PriceView(table.filter_by_rows(self.search(text)), self.search)
+        codes = [code for code, name in enumerate(table.names) if text in name]
+        return PriceView(table.take(np.isin(table.name_codes[table.order], codes)), self.search)
+
+    def __len__(self):
+        return len(self.table)
+
+    def __getitem__(self, position):
+        return self.table[position]
+
+    def __iter__(self):
+        return iter(self.table)
+
+    def __repr__(self):
+        return f"PriceView({len(self)} строк)"
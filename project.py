@@ -1,19 +1,37 @@
 import os
-import json
+import asyncio
 import logging
+import argparse
+import numpy as np
+from price_index import TrigramIndex
+from price_table import PriceTable
+from price_loader import find_price_files, load_price_files, search_product_price_weight
+from price_snapshot import PriceSnapshot
+from price_export import export_catalog
+from price_view import PriceView
+from price_matching import ProductMatcher, best_offers
+import instrumentation
+from instrumentation import instrumented
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Каталог снимка разобранных прайсов для быстрого повторного запуска
+SNAPSHOT_DIR = '.price_snapshot'
+
 
 class PriceMachine():
 
     def __init__(self):
-        self.data = []
+        self.data = PriceTable.from_rows([])
         self.result = ''
         self.name_length = 0
+        self.index = None
+        self.matcher = None
+        self.load_stats = {}
 
-    def load_prices(self, file_path=''):
+    @instrumented(rows='self.data')
+    def load_prices(self, file_path='', max_workers=None, snapshot_dir=None):
         """
         Сканирует указанный каталог. Ищет файлы со словом price в названии.
         В файле ищет столбцы с названием товара, ценой и весом.
@@ -33,34 +51,34 @@ class PriceMachine():
             масса
             фасовка
 
+        Файлы читаются построчно и разбираются параллельно в пуле процессов
+        (см. price_loader.load_price_files); скорость разбора каждого файла
+        сохраняется в self.load_stats. Данные хранятся в колоночной таблице
+        PriceTable, упорядоченной по цене за кг.
+
+        Если задан snapshot_dir, каталог сохраняется в снимок на диске, и при
+        следующей загрузке разбираются только добавленные и измененные файлы
+        (см. price_snapshot.PriceSnapshot).
+
         :param file_path: Путь к каталогу с файлами.
+        :param max_workers: Число процессов для разбора (по умолчанию число ядер).
+        :param snapshot_dir: Каталог снимка (по умолчанию снимок не используется).
         :return: Количество обработанных файлов и строк.
         """
-        count_files = 0
-        count_lines = 0
-        self.data = []
         current_path = os.path.dirname(os.path.realpath(__file__))
         if not file_path:
             file_path = current_path
-        for file_name in os.listdir(file_path):
-            if 'price' in file_name:
-                count_files += 1
-                logging.info(f"Чтение файла {file_name}")
-                with open(os.path.join(file_path, file_name), 'r') as f:
-                    headers = f.readline()
-                    product_name_number, price_number, weight_number = self._search_product_price_weight(headers)
-                    file_data = f.readlines()
-                    for line in file_data:
-                        count_lines += 1
-                        line_data = line.split(',')
-                        product_name = line_data[product_name_number].strip().lower()
-                        if len(product_name) > self.name_length:
-                            self.name_length = len(product_name)
-                        price = int(line_data[price_number].strip())
-                        weight = int(line_data[weight_number].strip())
-                        value = round(price / weight, 2)
-                        self.data.append((value, product_name, price, weight, file_name))
-        self.data.sort()
+        paths = [os.path.join(file_path, file_name) for file_name in find_price_files(file_path)]
+        if snapshot_dir:
+            self.data, self.load_stats = PriceSnapshot(snapshot_dir).refresh(file_path, max_workers)
+            name_length = self.data.name_length()
+        else:
+            self.data, name_length, self.load_stats = load_price_files(paths, max_workers)
+        self.name_length = max(self.name_length, name_length)
+        # Индексы для поиска строятся при первом обращении
+        self.index = None
+        self.matcher = None
+        count_files, count_lines = len(paths), len(self.data)
         logging.info(f"Обработано {count_files} файлов и {count_lines} строк")
         return count_files, count_lines
 
@@ -71,58 +89,32 @@ class PriceMachine():
         :param headers: Строка с заголовками столбцов.
         :return: Номера столбцов с названием товара, ценой и весом.
         """
-        data = headers.lower().strip().split(',')
-        product_name_number = '!'
-        for index in range(len(data)):
-            if data[index] in ('товар', 'название', 'продукт', 'наименование'):
-                product_name_number = index
-            if data[index] in ('розница', 'цена'):
-                price_number = index
-            if data[index] in ('вес', 'масса', 'фасовка'):
-                weight_number = index
-        return product_name_number, price_number, weight_number
+        return search_product_price_weight(headers.strip().split(','))
 
-    def export_to_html(self, fname='output.html'):
+    def export_to_html(self, fname='output.html', page_size=None):
         """
         Экспортирует данные в HTML-файл.
 
         :param fname: Имя файла для сохранения.
+        :param page_size: Число строк на странице (по умолчанию все строки в одном файле).
         :return: Статус операции.
         """
-        result = '''
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>Позиции продуктов</title>
-        </head>
-        <body>
-            <table>
-                <tr>
-                    <th>Номер</th>
-                    <th>Название</th>
-                    <th>Цена</th>
-                    <th>Фасовка</th>
-                    <th>Файл</th>
-                    <th>Цена за кг.</th>
-                </tr>
-        '''
-        for number, item in enumerate(self.data):
-            value, product_name, price, weight, file_name = item
-            result += '<tr>'
-            result += f'<td>{number + 1}</td>'
-            result += f'<td>{product_name}</td>'
-            result += f'<td>{price}</td>'
-            result += f'<td>{weight}</td>'
-            result += f'<td>{file_name}</td>'
-            result += f'<td>{value}</td>'
-            result += '</tr>\n'
-        result += '</tbody>'
-        result += '</table>'
-        logging.info(f"Экспорт данных в файл {fname}")
-        with open(fname, 'w') as f:
-            f.write(result)
+        self.export(fname, 'html', page_size)
         return 'ok'
 
+    @instrumented(rows='self.data')
+    def export(self, fname, file_format=None, page_size=None):
+        """
+        Потоково экспортирует данные в HTML, CSV или JSON Lines (см. price_export.export_catalog).
+
+        :param fname: Имя файла для сохранения.
+        :param file_format: 'html', 'csv' или 'jsonl' (по умолчанию по расширению файла).
+        :param page_size: Число строк в одном файле (по умолчанию все строки в одном файле).
+        :return: Список записанных файлов.
+        """
+        return export_catalog(self.data, fname, file_format, page_size)
+
+    @instrumented()
     def find_text(self, text):
         """
         Ищет товары по части названия.
@@ -131,37 +123,151 @@ class PriceMachine():
         :return: Отфильтрованный список товаров.
         """
         text = text.lower()
-        data = [item for item in self.data if text in item[1]]
-        data.sort()
-        return data
+        return self.data.rows(self._get_index().search(text))
+
+    def _get_index(self):
+        """
+        Возвращает индекс для поиска, перестраивая его после изменения данных.
+
+        :return: Экземпляр TrigramIndex.
+        """
+        if self.index is None:
+            self.index = TrigramIndex.from_codes(self.data.names, self.data.ordered_name_codes())
+        return self.index
+
+    @instrumented()
+    def find_similar(self, text, threshold=0.5):
+        """
+        Нечетко ищет товары с похожими названиями (с учетом опечаток и порядка слов).
+
+        :param text: Название или часть названия товара.
+        :param threshold: Минимальная оценка сходства названий (0..1).
+        :return: Список пар (оценка сходства, товар) по убыванию сходства, затем по цене за кг.
+        """
+        matches = self._get_matcher().similar(text, threshold)
+        if not matches:
+            return []
+        scores = np.full(len(self.data.names), -1.0)
+        scores[[code for _, code in matches]] = [score for score, _ in matches]
+        row_scores = scores[self.data.ordered_name_codes()]
+        positions = np.flatnonzero(row_scores >= 0)
+        positions = positions[np.argsort(-row_scores[positions], kind='stable')]
+        return list(zip(row_scores[positions].tolist(), self.data.rows(positions)))
+
+    @instrumented(rows='self.data')
+    def best_offers(self, threshold=0.5, min_files=2):
+        """
+        Объединяет одинаковые товары разных поставщиков и находит лучшую цену за кг для каждого.
+
+        Похожие названия объединяются в кластеры без попарного сравнения всех
+        названий (см. price_matching.ProductMatcher).
+
+        :param threshold: Минимальная оценка сходства названий в кластере (0..1).
+        :param min_files: Минимальное число разных файлов прайсов в кластере.
+        :return: Список словарей {'names', 'files', 'rows', 'best'} по возрастанию лучшей цены за кг.
+        """
+        return best_offers(self.data, self._get_matcher(threshold), min_files)
+
+    def _get_matcher(self, threshold=None):
+        """
+        Возвращает индекс сходства названий, перестраивая его после загрузки данных или смены порога.
+
+        :param threshold: Порог объединения названий в кластеры (по умолчанию прежний).
+        :return: Экземпляр ProductMatcher.
+        """
+        if self.matcher is None or (threshold is not None and threshold != self.matcher.threshold):
+            self.matcher = ProductMatcher(self.data.names, threshold or 0.5)
+        return self.matcher
+
+    def view(self):
+        """
+        Возвращает представление всего каталога для цепочки условий отбора.
+
+        :return: Экземпляр PriceView.
+        """
+        table, index = self.data, self.index
+
+        def search_rows(text):
+            # Представление привязано к таблице, для которой создано: после загрузки или сортировки каталога
+            # номера строк индекса нового каталога не подходят к его перестановке
+            nonlocal index
+            if index is None:
+                index = self._get_index() if table is self.data else \
+                    TrigramIndex.from_codes(table.names, table.ordered_name_codes())
+            return table.order[index.search(text)]
+        return PriceView(table, search_rows)
 
     def sort_by_price_per_kg(self):
         """
         Сортирует данные по цене за кг.
         """
-        self.data.sort()
+        self.data = self.data.sorted()
+        self.index = None
 
     def filter_by_price_per_kg(self, min_price, max_price):
         """
-        Фильтрует данные по диапазону цены за кг.
+        Отбирает товары в диапазоне цены за кг, не изменяя каталог.
+
+        Каталог упорядочен по цене за кг, поэтому границы диапазона находятся
+        бинарным поиском. Результат можно уточнять дальше, например
+        pm.filter_by_price_per_kg(100, 500).find_text('сыр').
 
         :param min_price: Минимальная цена за кг.
         :param max_price: Максимальная цена за кг.
+        :return: Экземпляр PriceView.
         """
-        self.data = [item for item in self.data if min_price <= item[0] <= max_price]
-
-
-pm = PriceMachine()
-print(pm.load_prices())
-while 1:
-    command = input('Введите exit для выхода или часть названия для поиска: \n')
-    if command == 'exit':
-        break
-    else:
-        name = command
-        res = pm.find_text(name)
-        print(f'{"№": <4}  {"Наименование": <{pm.name_length}} {"цена":^5} {"вес":^3} {"файл":^12} {"цена за кг."}')
-        for number, item in enumerate(res):
-            print(f'{number + 1: <4}  {item[1]: <{pm.name_length}} {item[2]:^5}  {item[3]:^3} {item[4]:^12} {item[0]}')
-print('the end')
-print(pm.export_to_html())
+        return self.view().price_range(min_price, max_price)
+
+def main(argv=None):
+    """
+    Точка входа: консольный поиск по каталогу или HTTP-сервис запросов.
+
+    :param argv: Аргументы командной строки (по умолчанию sys.argv).
+    """
+    parser = argparse.ArgumentParser(description="Анализатор прайс-листов.")
+    parser.add_argument('--path', default='', help="Каталог с файлами прайсов.")
+    parser.add_argument('--serve', action='store_true', help="Запустить HTTP-сервис запросов вместо консольного поиска.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--reload-interval', type=float, default=5.0,
+                        help="Период проверки изменений файлов прайсов в секундах.")
+    parser.add_argument('--metrics', help="Файл метрик этапов: .prom - формат Prometheus, иначе JSON Lines.")
+    args = parser.parse_args(argv)
+    if args.metrics:
+        instrumentation.enable()
+    try:
+        _run(args)
+    finally:
+        if args.metrics:
+            instrumentation.export_metrics(args.metrics)
+
+
+def _run(args):
+    if args.serve:
+        from price_service import PriceService
+
+        service = PriceService(args.path, SNAPSHOT_DIR, args.host, args.port, args.reload_interval)
+        try:
+            asyncio.run(service.serve_forever())
+        except KeyboardInterrupt:
+            pass
+        return
+
+    pm = PriceMachine()
+    print(pm.load_prices(args.path, snapshot_dir=SNAPSHOT_DIR))
+    while 1:
+        command = input('Введите exit для выхода или часть названия для поиска: \n')
+        if command == 'exit':
+            break
+        else:
+            name = command
+            res = pm.find_text(name)
+            print(f'{"№": <4}  {"Наименование": <{pm.name_length}} {"цена":^5} {"вес":^3} {"файл":^12} {"цена за кг."}')
+            for number, item in enumerate(res):
+                print(f'{number + 1: <4}  {item[1]: <{pm.name_length}} {item[2]:^5}  {item[3]:^3} {item[4]:^12} {item[0]}')
+    print('the end')
+    print(pm.export_to_html())
+
+
+if __name__ == '__main__':
+    main()
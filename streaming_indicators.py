@@ -0,0 +1,402 @@
+import math
+import logging
+from collections import deque
+import numpy as np
+import pandas as pd
+import indicators as ind
+
+# Настройка логирования
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+class StreamingIndicators():
+    """
+    Набор инкрементальных индикаторов для обновления по одному бару.
+
+    Состояние инициализируется по историческим данным (seed), после чего каждый
+    новый бар обрабатывается за O(1). Описание индикаторов совпадает с
+    indicators.compute_indicators, результаты совпадают с пакетным расчетом.
+    """
+
+    def __init__(self, spec=None):
+        """
+        :param spec: Список описаний индикаторов (по умолчанию indicators.DEFAULT_INDICATORS).
+        """
+        self.spec = [dict(item) for item in (spec if spec is not None else ind.DEFAULT_INDICATORS)]
+        self.names = [name for item in self.spec for name in ind.column_names(item)]
+        self.calculators = [make_calculator(item) for item in self.spec]
+
+    def seed(self, data):
+        """
+        Инициализирует состояние по историческим данным.
+
+        :param data: DataFrame с историческими данными (столбец 'Close').
+        :return: self.
+        """
+        close = np.ascontiguousarray(data['Close'].to_numpy(dtype=np.float64))
+        logging.info(f"Инициализация потоковых индикаторов по {len(close)} барам")
+        for calculator in self.calculators:
+            calculator.seed(close)
+        return self
+
+    def update(self, close):
+        """
+        Обрабатывает один новый бар.
+
+        :param close: Цена закрытия нового бара.
+        :return: Словарь {имя столбца: значение индикатора}.
+        """
+        close = float(close)
+        values = [value for calculator in self.calculators for value in calculator.update(close)]
+        return dict(zip(self.names, values))
+
+    def update_batch(self, data):
+        """
+        Обрабатывает небольшую пачку новых баров.
+
+        :param data: DataFrame со столбцом 'Close' или Series с ценами закрытия.
+        :return: DataFrame с индикаторами для новых баров.
+        """
+        close = data['Close'] if isinstance(data, pd.DataFrame) else data
+        rows = [self.update(value) for value in close.to_numpy(dtype=np.float64)]
+        return pd.DataFrame(rows, index=close.index, columns=self.names)
+
+    def snapshot(self):
+        """
+        Сохраняет состояние в словарь, пригодный для сериализации в JSON.
+
+        :return: Словарь с описанием индикаторов и их состоянием.
+        """
+        return {
+            'spec': self.spec,
+            'calculators': [calculator.to_dict() for calculator in self.calculators],
+        }
+
+    @classmethod
+    def restore(cls, snapshot):
+        """
+        Восстанавливает набор индикаторов из снимка состояния.
+
+        :param snapshot: Словарь, полученный методом snapshot().
+        :return: Экземпляр StreamingIndicators.
+        """
+        streaming = cls(snapshot['spec'])
+        streaming.calculators = [calculator_from_dict(state) for state in snapshot['calculators']]
+        return streaming
+
+
+def make_calculator(item):
+    """
+    Создает инкрементальный вычислитель по описанию индикатора.
+
+    :param item: Описание индикатора в формате indicators.compute_indicators.
+    :return: Экземпляр вычислителя.
+    """
+    kind = item['kind']
+    if kind == 'sma':
+        return RollingMean(item.get('window_size', 5))
+    if kind == 'std':
+        return RollingStd(item.get('window', 20))
+    if kind == 'ema':
+        return EMAState(item['span'])
+    if kind == 'rsi':
+        return RSIState(item.get('window', 14), item.get('method', 'sma'))
+    if kind == 'macd':
+        return MACDState(item.get('short_window', 12), item.get('long_window', 26), item.get('signal_window', 9))
+    raise ValueError(f"Неизвестный индикатор: {kind}")
+
+
+def calculator_from_dict(state):
+    """
+    Восстанавливает вычислитель из словаря, полученного методом to_dict().
+
+    :param state: Словарь состояния.
+    :return: Экземпляр вычислителя.
+    """
+    types = {cls.__name__: cls for cls in (RollingMean, RollingStd, EMAState, RSIState, MACDState)}
+    if state['type'] not in types:
+        raise ValueError(f"Неизвестный тип состояния: {state['type']}")
+    return types[state['type']].from_dict(state)
+
+
+class RollingWindow():
+    """
+    Скользящее окно с накопленными суммами значений и их квадратов.
+
+    Суммы пересчитываются по окну раз в window обновлений, поэтому ошибка
+    округления не накапливается, а средняя стоимость обновления остается O(1).
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque(maxlen=window)
+        self.shift = 0.0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.missing = 0
+        self.pending = 0
+
+    def push(self, value):
+        if len(self.values) == self.window:
+            self._add(self.values[0], -1)
+        self.values.append(value)
+        self._add(value, 1)
+        self.pending += 1
+        if self.pending >= self.window:
+            self._recompute()
+
+    def full(self):
+        return len(self.values) == self.window and not self.missing
+
+    def sum(self):
+        if not self.full():
+            return math.nan
+        return self.total + self.shift * self.window
+
+    def var(self):
+        if not self.full():
+            return math.nan
+        return max((self.total_sq - self.total * self.total / self.window) / (self.window - 1), 0.0)
+
+    def _add(self, value, sign):
+        if math.isnan(value):
+            self.missing += sign
+            return
+        centered = value - self.shift
+        self.total += sign * centered
+        self.total_sq += sign * centered * centered
+
+    def _recompute(self):
+        finite = [value for value in self.values if not math.isnan(value)]
+        self.shift = sum(finite) / len(finite) if finite else 0.0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.missing = len(self.values) - len(finite)
+        for value in finite:
+            centered = value - self.shift
+            self.total += centered
+            self.total_sq += centered * centered
+        self.pending = 0
+
+    def to_dict(self):
+        return {'window': self.window, 'values': list(self.values)}
+
+    @classmethod
+    def from_dict(cls, state):
+        rolling = cls(state['window'])
+        rolling.values.extend(state['values'])
+        rolling._recompute()
+        return rolling
+
+
+class RollingMean():
+    """
+    Скользящее среднее (как add_moving_average).
+    """
+
+    def __init__(self, window):
+        self.rolling = RollingWindow(window)
+
+    def seed(self, close):
+        self.rolling = RollingWindow(self.rolling.window)
+        for value in close[-self.rolling.window:]:
+            self.rolling.push(float(value))
+
+    def update(self, close):
+        self.rolling.push(close)
+        return [self.rolling.sum() / self.rolling.window]
+
+    def to_dict(self):
+        return {'type': type(self).__name__, 'rolling': self.rolling.to_dict()}
+
+    @classmethod
+    def from_dict(cls, state):
+        calculator = cls(state['rolling']['window'])
+        calculator.rolling = RollingWindow.from_dict(state['rolling'])
+        return calculator
+
+
+class RollingStd(RollingMean):
+    """
+    Скользящее стандартное отклонение (как calculate_standard_deviation).
+    """
+
+    def update(self, close):
+        self.rolling.push(close)
+        return [math.sqrt(self.rolling.var()) if self.rolling.full() else math.nan]
+
+
+class EMAState():
+    """
+    Экспоненциальное скользящее среднее (как ewm(span=span, adjust=False).mean()).
+
+    Повторяет алгоритм pandas, включая обработку пропусков.
+    """
+
+    def __init__(self, span, value=math.nan, old_weight=1.0):
+        self.span = span
+        self.alpha = 2.0 / (span + 1.0)
+        self.value = value
+        self.old_weight = old_weight
+
+    def seed(self, close):
+        values = ind.ema(close, self.span)
+        self.value = float(values[-1]) if len(values) else math.nan
+        # После каждого наблюдения вес прошлого значения сбрасывается в 1 и затухает на пропусках
+        valid = np.flatnonzero(~np.isnan(close))
+        self.old_weight = (1.0 - self.alpha) ** (len(close) - 1 - valid[-1]) if len(valid) else 1.0
+
+    def update(self, close):
+        if math.isnan(self.value):
+            if not math.isnan(close):
+                self.value = close
+                self.old_weight = 1.0
+            return [self.value]
+        self.old_weight *= 1.0 - self.alpha
+        if not math.isnan(close):
+            if self.value != close:
+                self.value = (self.old_weight * self.value + self.alpha * close) / (self.old_weight + self.alpha)
+            self.old_weight = 1.0
+        return [self.value]
+
+    def to_dict(self):
+        return {'type': type(self).__name__, 'span': self.span, 'value': self.value, 'old_weight': self.old_weight}
+
+    @classmethod
+    def from_dict(cls, state):
+        return cls(state['span'], state['value'], state['old_weight'])
+
+
+class RSIState():
+    """
+    Индекс относительной силы.
+
+    Метод 'sma' совпадает с calculate_rsi (простые средние приростов и падений за окно),
+    метод 'wilder' использует сглаживание Уайлдера.
+    """
+
+    def __init__(self, window=14, method='sma'):
+        if method not in ('sma', 'wilder'):
+            raise ValueError(f"Неизвестный метод RSI: {method}")
+        self.window = window
+        self.method = method
+        self.previous = None
+        self.gains = RollingWindow(window)
+        self.losses = RollingWindow(window)
+        self.avg_gain = math.nan
+        self.avg_loss = math.nan
+
+    def seed(self, close):
+        self.__init__(self.window, self.method)
+        if not len(close):
+            return
+        if self.method == 'sma':
+            for value in close[-(self.window + 1):] if len(close) > self.window else close:
+                self.update(float(value))
+            return
+        deltas = np.nan_to_num(np.diff(close), nan=0.0)
+        gains = np.fmax(deltas, 0.0)
+        losses = np.fmax(-deltas, 0.0)
+        if len(deltas) < self.window:
+            for gain, loss in zip(gains, losses):
+                self.gains.push(float(gain))
+                self.losses.push(float(loss))
+        else:
+            # Сглаживание Уайлдера - это EMA с alpha = 1 / window, начатая со среднего за первое окно
+            span = 2 * self.window - 1
+            self.avg_gain = float(ind.ema(np.concatenate(([gains[:self.window].mean()], gains[self.window:])), span)[-1])
+            self.avg_loss = float(ind.ema(np.concatenate(([losses[:self.window].mean()], losses[self.window:])), span)[-1])
+        self.previous = float(close[-1])
+
+    def update(self, close):
+        first = self.previous is None
+        delta = math.nan if first else close - self.previous
+        self.previous = close
+        # Как и в calculate_rsi, пропуски в разностях считаются нулевым изменением
+        gain = delta if delta > 0 else 0.0
+        loss = -delta if delta < 0 else 0.0
+        if self.method == 'sma':
+            self.gains.push(gain)
+            self.losses.push(loss)
+            return [_rsi(self.gains.sum(), self.losses.sum())]
+        if first:
+            return [math.nan]
+        if math.isnan(self.avg_gain):
+            self.gains.push(gain)
+            self.losses.push(loss)
+            if not self.gains.full():
+                return [math.nan]
+            self.avg_gain = self.gains.sum() / self.window
+            self.avg_loss = self.losses.sum() / self.window
+        else:
+            self.avg_gain = (self.avg_gain * (self.window - 1) + gain) / self.window
+            self.avg_loss = (self.avg_loss * (self.window - 1) + loss) / self.window
+        return [_rsi(self.avg_gain, self.avg_loss)]
+
+    def to_dict(self):
+        return {
+            'type': type(self).__name__,
+            'window': self.window,
+            'method': self.method,
+            'previous': self.previous,
+            'gains': self.gains.to_dict(),
+            'losses': self.losses.to_dict(),
+            'avg_gain': self.avg_gain,
+            'avg_loss': self.avg_loss,
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        calculator = cls(state['window'], state['method'])
+        calculator.previous = state['previous']
+        calculator.gains = RollingWindow.from_dict(state['gains'])
+        calculator.losses = RollingWindow.from_dict(state['losses'])
+        calculator.avg_gain = state['avg_gain']
+        calculator.avg_loss = state['avg_loss']
+        return calculator
+
+
+class MACDState():
+    """
+    MACD с сигнальной линией (как calculate_macd): дает EMA_short, EMA_long, MACD и Signal.
+    """
+
+    def __init__(self, short_window=12, long_window=26, signal_window=9):
+        self.short = EMAState(short_window)
+        self.long = EMAState(long_window)
+        self.signal = EMAState(signal_window)
+
+    def seed(self, close):
+        self.short.seed(close)
+        self.long.seed(close)
+        self.signal.seed(ind.ema(close, self.short.span) - ind.ema(close, self.long.span))
+
+    def update(self, close):
+        ema_short = self.short.update(close)[0]
+        ema_long = self.long.update(close)[0]
+        macd = ema_short - ema_long
+        return [ema_short, ema_long, macd, self.signal.update(macd)[0]]
+
+    def to_dict(self):
+        return {
+            'type': type(self).__name__,
+            'short': self.short.to_dict(),
+            'long': self.long.to_dict(),
+            'signal': self.signal.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        calculator = cls()
+        calculator.short = EMAState.from_dict(state['short'])
+        calculator.long = EMAState.from_dict(state['long'])
+        calculator.signal = EMAState.from_dict(state['signal'])
+        return calculator
+
+
+def _rsi(gain, loss):
+    if math.isnan(gain) or math.isnan(loss) or (gain == 0 and loss == 0):
+        return math.nan
+    if loss == 0:
+        return 100.0
+    return 100 - (100 / (1 + gain / loss))
@@ -1,8 +1,66 @@
 import unittest
+import tempfile
+from unittest import mock
+import numpy as np
 import pandas as pd
 import data_download as dd
 import data_plotting as dplt
 import os
+import json
+import asyncio
+import time
+import indicators as ind
+import streaming_indicators as si
+import data_export as de
+import chunked_indicators as ci
+import main
+import project
+import price_loader
+import price_table
+import price_service
+import price_matching
+import benchmark
+import instrumentation
+import alerts
+from data_cache import StockDataCache
+
+
+class FakeTicker():
+    """
+    Заглушка yf.Ticker, отдающая синтетические дневные бары без обращения к сети.
+    """
+
+    def __init__(self, ticker, bars=60, seed=0, decimals=None):
+        self.ticker = ticker
+        self.calls = []
+        rng = np.random.default_rng(seed)
+        index = pd.date_range('2024-01-01', periods=bars, freq='D', tz='America/New_York', name='Date')
+        close = 100 + rng.standard_normal(bars).cumsum()
+        self.frame = pd.DataFrame({
+            'Open': close + rng.standard_normal(bars) * 0.1,
+            'High': close + 1,
+            'Low': close - 1,
+            'Close': close,
+            'Volume': rng.integers(1000, 10000, bars),
+        }, index=index)
+        if decimals is not None:
+            # Котировки в центах, как у Yahoo Finance
+            self.frame = self.frame.round(decimals)
+        self.available = bars
+
+    def history(self, period=None, start=None, end=None, interval='1d'):
+        self.calls.append({'period': period, 'start': start, 'end': end, 'interval': interval})
+        data = self.frame.iloc[:self.available]
+        if start is not None:
+            data = data[data.index >= self._localize(start)]
+        if end is not None:
+            data = data[data.index < self._localize(end)]
+        return data.copy()
+
+    def _localize(self, date):
+        date = pd.Timestamp(date)
+        return date.tz_localize(self.frame.index.tz) if date.tz is None else date
+
 
 class TestStockDataAnalysis(unittest.TestCase):
 
@@ -11,42 +69,43 @@ class TestStockDataAnalysis(unittest.TestCase):
         self.period = '1mo'
         self.threshold = 10
         self.csv_filename = 'test_data.csv'
+        self.provider = lambda ticker: FakeTicker(ticker, decimals=2)
 
     def test_fetch_stock_data(self):
-        data = dd.fetch_stock_data(self.ticker, self.period)
+        data = dd.fetch_stock_data(self.ticker, self.period, provider=self.provider)
         self.assertIsInstance(data, pd.DataFrame)
         self.assertIn('Close', data.columns)
 
     def test_add_moving_average(self):
-        data = dd.fetch_stock_data(self.ticker, self.period)
+        data = dd.fetch_stock_data(self.ticker, self.period, provider=self.provider)
         data = dd.add_moving_average(data)
         self.assertIn('Moving_Average', data.columns)
 
     def test_calculate_rsi(self):
-        data = dd.fetch_stock_data(self.ticker, self.period)
+        data = dd.fetch_stock_data(self.ticker, self.period, provider=self.provider)
         data = dd.calculate_rsi(data)
         self.assertIn('RSI', data.columns)
 
     def test_calculate_macd(self):
-        data = dd.fetch_stock_data(self.ticker, self.period)
+        data = dd.fetch_stock_data(self.ticker, self.period, provider=self.provider)
         data = dd.calculate_macd(data)
         self.assertIn('MACD', data.columns)
         self.assertIn('Signal', data.columns)
 
     def test_calculate_and_display_average_price(self):
-        data = dd.fetch_stock_data(self.ticker, self.period)
+        data = dd.fetch_stock_data(self.ticker, self.period, provider=self.provider)
         dd.calculate_and_display_average_price(data)
         # Проверка, что функция не вызывает ошибок
         self.assertTrue(True)
 
     def test_notify_if_strong_fluctuations(self):
-        data = dd.fetch_stock_data(self.ticker, self.period)
+        data = dd.fetch_stock_data(self.ticker, self.period, provider=self.provider)
         dd.notify_if_strong_fluctuations(data, self.threshold)
         # Проверка, что функция не вызывает ошибок
         self.assertTrue(True)
 
     def test_export_data_to_csv(self):
-        data = dd.fetch_stock_data(self.ticker, self.period)
+        data = dd.fetch_stock_data(self.ticker, self.period, provider=self.provider)
         dd.export_data_to_csv(data, self.csv_filename)
         # Сравниваем данные, игнорируя индексы и типы данных
         data_from_csv = pd.read_csv(self.csv_filename).reset_index(drop=True)
@@ -59,7 +118,7 @@ class TestStockDataAnalysis(unittest.TestCase):
         os.remove(self.csv_filename)
 
     def test_create_and_save_plot(self):
-        data = dd.fetch_stock_data(self.ticker, self.period)
+        data = dd.fetch_stock_data(self.ticker, self.period, provider=self.provider)
         data = dd.add_moving_average(data)
         data = dd.calculate_rsi(data)
         data = dd.calculate_macd(data)
@@ -67,5 +126,1023 @@ class TestStockDataAnalysis(unittest.TestCase):
         # Проверка, что функция не вызывает ошибок
         self.assertTrue(True)
 
+class TestPipelineBenchmark(unittest.TestCase):
+
+    def test_synthetic_provider_is_deterministic(self):
+        first = dd.fetch_stock_data('AAPL', 'max', provider=lambda ticker: benchmark.SyntheticTicker(ticker, 500))
+        second = dd.fetch_stock_data('AAPL', 'max', provider=lambda ticker: benchmark.SyntheticTicker(ticker, 500))
+        pd.testing.assert_frame_equal(first, second)
+        self.assertEqual(list(first.columns), ['Open', 'High', 'Low', 'Close', 'Volume'])
+        self.assertTrue((first['High'] >= first['Low']).all())
+        self.assertEqual(len(benchmark.synthetic_ohlcv(100000, freq='min')), 100000)
+
+    def test_pipeline_results_and_baseline_regressions(self):
+        results = benchmark.benchmark_pipeline(bars=[300], tickers=2, repeat=1, plots=False)
+        steps = results['300x2']
+        self.assertEqual(list(steps), [step for step in benchmark.PIPELINE_STEPS
+                                       if step not in benchmark.PLOT_STEPS])
+        for stats in steps.values():
+            self.assertGreater(stats['rows_per_sec'], 0)
+            self.assertGreater(stats['peak_bytes'], 0)
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'baseline.json')
+            benchmark.save_baseline(results, filename)
+            baseline = benchmark.load_baseline(filename)
+        self.assertEqual(benchmark.compare_with_baseline(results, baseline), [])
+        slower = {'300x2': {'calculate_rsi': dict(steps['calculate_rsi'],
+                                                  rows_per_sec=steps['calculate_rsi']['rows_per_sec'] / 3,
+                                                  peak_bytes=steps['calculate_rsi']['peak_bytes'] * 2)},
+                  '1000x1': {'calculate_rsi': steps['calculate_rsi']}}
+        regressions = benchmark.compare_with_baseline(slower, baseline)
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(all(regression.startswith('300x2 calculate_rsi') for regression in regressions))
+
+
+class TestInstrumentation(unittest.TestCase):
+
+    def setUp(self):
+        self.data = FakeTicker('AAPL', bars=500).history(period='max')
+        instrumentation.reset()
+
+    def tearDown(self):
+        instrumentation.disable()
+        instrumentation.reset()
+
+    def test_disabled_records_nothing(self):
+        dd.calculate_rsi(self.data)
+        with instrumentation.stage('manual') as metrics:
+            metrics.rows = 10
+        self.assertEqual(instrumentation.records(), [])
+
+    def test_records_nested_stages_with_memory(self):
+        instrumentation.enable(memory=True)
+        with instrumentation.stage('outer') as metrics:
+            data = dd.add_moving_average(self.data)
+            ind.add_indicators(data)
+            metrics.rows = len(data)
+        with self.assertRaises(KeyError):
+            dd.calculate_rsi(pd.DataFrame({'Open': [1.0]}))
+        records = {record['stage']: record for record in instrumentation.records()}
+        self.assertEqual(list(records), ['data_download.add_moving_average', 'indicators.compute_indicators',
+                                         'indicators.add_indicators', 'outer', 'data_download.calculate_rsi'])
+        for name in ('data_download.add_moving_average', 'indicators.add_indicators', 'outer'):
+            self.assertEqual(records[name]['rows'], 500)
+            self.assertGreater(records[name]['peak_bytes'], 0)
+            self.assertGreaterEqual(records[name]['cpu_seconds'], 0)
+        self.assertGreaterEqual(records['outer']['peak_bytes'], records['indicators.add_indicators']['peak_bytes'])
+        self.assertGreaterEqual(records['outer']['wall_seconds'],
+                                records['data_download.add_moving_average']['wall_seconds'] +
+                                records['indicators.add_indicators']['wall_seconds'])
+        self.assertEqual(records['data_download.calculate_rsi']['status'], 'KeyError')
+
+    def test_exports_jsonl_and_prometheus(self):
+        instrumentation.enable()
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, 'price_a.csv'), 'w') as f:
+                f.write("название,цена,вес\nсыр,500,1\nмолоко,90,1\n")
+            pm = project.PriceMachine()
+            pm.load_prices(directory, max_workers=1)
+            pm.find_text('сыр')
+            pm.find_text('сыр')
+            self.assertEqual(instrumentation.export_jsonl(os.path.join(directory, 'metrics.jsonl')), 3)
+            with open(os.path.join(directory, 'metrics.jsonl'), encoding='utf-8') as f:
+                lines = [json.loads(line) for line in f]
+            instrumentation.export_metrics(os.path.join(directory, 'metrics.prom'))
+            with open(os.path.join(directory, 'metrics.prom'), encoding='utf-8') as f:
+                prometheus = f.read().splitlines()
+        self.assertEqual([(line['stage'], line['rows']) for line in lines],
+                         [('project.PriceMachine.load_prices', 2), ('project.PriceMachine.find_text', 1),
+                          ('project.PriceMachine.find_text', 1)])
+        self.assertIn('pipeline_stage_calls_total{stage="project.PriceMachine.find_text"} 2', prometheus)
+        self.assertIn('pipeline_stage_rows_total{stage="project.PriceMachine.load_prices"} 2', prometheus)
+        self.assertIn('# TYPE pipeline_stage_wall_seconds_total counter', prometheus)
+        self.assertFalse(any(line.startswith('pipeline_stage_peak_bytes{') for line in prometheus))
+
+
+class TestStockDataCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.stock = FakeTicker('AAPL', bars=60)
+        self.stock.available = 50
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_repeated_fetch_is_served_from_cache(self):
+        cache = StockDataCache(self.tmp.name, refresh_interval=3600)
+        first = dd.fetch_stock_data('AAPL', '1y', cache=cache, provider=lambda ticker: self.stock)
+        second = dd.fetch_stock_data('AAPL', '1y', cache=cache, provider=lambda ticker: self.stock)
+        self.assertEqual(len(self.stock.calls), 1)
+        pd.testing.assert_frame_equal(first, second, check_freq=False)
+
+    def test_cache_hit_does_not_rewrite_index(self):
+        cache = StockDataCache(self.tmp.name, refresh_interval=3600)
+        key = StockDataCache.make_key('AAPL', period='1y')
+        cache.fetch(self.stock, 'AAPL', period='1y')
+        with mock.patch.object(cache, '_save_index', wraps=cache._save_index) as save_index:
+            cache.fetch(self.stock, 'AAPL', period='1y')
+        save_index.assert_not_called()
+        accessed = cache.index[key]['accessed']
+        cache.fetch(FakeTicker('MSFT'), 'MSFT', period='1y')
+        self.assertEqual(StockDataCache(self.tmp.name).index[key]['accessed'], accessed)
+        self.assertNotIn('index.json.tmp', os.listdir(self.tmp.name))
+
+    def test_incremental_refresh_fetches_only_new_bars(self):
+        cache = StockDataCache(self.tmp.name, refresh_interval=0)
+        dd.fetch_stock_data('AAPL', '1y', cache=cache, provider=lambda ticker: self.stock)
+        self.stock.available = 60
+        data = dd.fetch_stock_data('AAPL', '1y', cache=cache, provider=lambda ticker: self.stock)
+        self.assertEqual(self.stock.calls[-1]['start'], self.stock.frame.index[49])
+        self.assertEqual(len(data), 60)
+        pd.testing.assert_frame_equal(data, self.stock.frame, check_freq=False)
+
+    def test_ttl_counts_from_full_download(self):
+        cache = StockDataCache(self.tmp.name, ttl=3600, refresh_interval=0)
+        key = StockDataCache.make_key('AAPL', period='1y')
+        dd.fetch_stock_data('AAPL', '1y', cache=cache, provider=lambda ticker: self.stock)
+        cache.index[key]['created'] -= 3000
+        dd.fetch_stock_data('AAPL', '1y', cache=cache, provider=lambda ticker: self.stock)
+        self.assertEqual(self.stock.calls[-1]['period'], None)
+        cache.index[key]['created'] -= 3000
+        dd.fetch_stock_data('AAPL', '1y', cache=cache, provider=lambda ticker: self.stock)
+        self.assertEqual(self.stock.calls[-1]['period'], '1y')
+        self.assertEqual(cache.index[key]['created'], cache.index[key]['updated'])
+
+    def test_feather_format_round_trip(self):
+        cache = StockDataCache(self.tmp.name, refresh_interval=3600, file_format='feather')
+        dd.fetch_stock_data('AAPL', '1y', cache=cache, provider=lambda ticker: self.stock)
+        data = StockDataCache(self.tmp.name, refresh_interval=3600, file_format='feather').fetch(self.stock, 'AAPL', '1y')
+        self.assertEqual(len(self.stock.calls), 1)
+        pd.testing.assert_frame_equal(data, self.stock.frame.iloc[:50], check_freq=False)
+
+    def test_size_and_ttl_eviction(self):
+        cache = StockDataCache(self.tmp.name, refresh_interval=3600)
+        for ticker in ('AAPL', 'MSFT', 'TSLA'):
+            cache.fetch(FakeTicker(ticker), ticker, period='1y')
+        entry_size = max(entry['size'] for entry in cache.index.values())
+        cache.max_bytes = entry_size * 2
+        cache.evict()
+        self.assertEqual(len(cache.index), 2)
+        self.assertNotIn(StockDataCache.make_key('AAPL', period='1y'), cache.index)
+        cache.ttl = -1
+        cache.evict()
+        self.assertEqual(cache.index, {})
+        self.assertEqual(os.listdir(self.tmp.name), ['index.json'])
+
+
+class FlakyProvider():
+    """
+    Локальный провайдер-заглушка: падает заданное число раз для отдельных тикеров.
+    """
+
+    def __init__(self, failures=None):
+        self.failures = dict(failures or {})
+        self.attempts = {}
+
+    def __call__(self, ticker):
+        self.attempts[ticker] = self.attempts.get(ticker, 0) + 1
+        if self.failures.get(ticker, 0) > 0:
+            self.failures[ticker] -= 1
+            raise ConnectionError(f"Сбой загрузки {ticker}")
+        return FakeTicker(ticker, seed=len(ticker))
+
+
+class TestFetchMany(unittest.TestCase):
+
+    def test_fetch_many_returns_frames_in_ticker_order(self):
+        tickers = ['MSFT', 'AAPL', 'TSLA', 'GOOGL']
+        frames = dd.fetch_many(tickers, period='1mo', max_workers=2, backoff=0, provider=FlakyProvider())
+        self.assertEqual(list(frames), tickers)
+        for frame in frames.values():
+            self.assertEqual(len(frame), 60)
+
+    def test_fetch_many_retries_and_isolates_errors(self):
+        provider = FlakyProvider({'AAPL': 1, 'BAD': 10})
+        errors = {}
+        data = dd.fetch_many(['AAPL', 'BAD', 'MSFT'], period='1mo', retries=3, backoff=0,
+                             as_frame=True, provider=provider, errors=errors)
+        self.assertEqual(provider.attempts['AAPL'], 2)
+        self.assertEqual(provider.attempts['BAD'], 3)
+        self.assertEqual(list(errors), ['BAD'])
+        self.assertEqual(data.index.names, ['Ticker', 'Date'])
+        self.assertEqual(list(data.index.get_level_values('Ticker').unique()), ['AAPL', 'MSFT'])
+
+    def test_fetch_many_rejects_non_positive_retries(self):
+        provider = FlakyProvider()
+        for retries in (0, -1):
+            with self.assertRaises(ValueError):
+                dd.fetch_many(['AAPL'], period='1mo', retries=retries, backoff=0, provider=provider)
+        self.assertFalse(provider.attempts)
+
+
+class TestComputeIndicators(unittest.TestCase):
+
+    def setUp(self):
+        self.data = FakeTicker('AAPL', bars=500, seed=3).history(period='max')
+
+    def test_matches_chained_functions(self):
+        expected = self.data.copy()
+        expected = dd.add_moving_average(expected)
+        expected = dd.calculate_rsi(expected)
+        expected = dd.calculate_macd(expected)
+        expected = dd.calculate_standard_deviation(expected)
+        result = ind.add_indicators(self.data)
+        self.assertEqual(list(result.columns), list(expected.columns))
+        pd.testing.assert_frame_equal(result, expected, check_exact=False, rtol=1e-9)
+        self.assertNotIn('RSI', self.data.columns)
+
+    def test_custom_spec_and_missing_values(self):
+        self.data.iloc[100, self.data.columns.get_loc('Close')] = np.nan
+        close = self.data['Close']
+        spec = [
+            {'kind': 'sma', 'window_size': 10},
+            {'kind': 'ema', 'span': 12},
+            {'kind': 'std', 'window': 5, 'name': 'Std_5'},
+            {'kind': 'macd', 'short_window': 12, 'long_window': 26, 'signal_window': 9,
+             'names': ('Fast', 'Slow', 'MACD', 'Signal')},
+        ]
+        result = ind.compute_indicators(self.data, spec)
+        self.assertEqual(list(result.columns), ['SMA_10', 'EMA_12', 'Std_5', 'Fast', 'Slow', 'MACD', 'Signal'])
+        pd.testing.assert_series_equal(result['SMA_10'], close.rolling(10).mean(), check_names=False)
+        pd.testing.assert_series_equal(result['EMA_12'], close.ewm(span=12, adjust=False).mean(), check_names=False)
+        pd.testing.assert_series_equal(result['Std_5'], close.rolling(5).std(), check_names=False)
+        pd.testing.assert_series_equal(result['Fast'], result['EMA_12'], check_names=False)
+
+    def test_duplicate_names_are_rejected(self):
+        with self.assertRaises(ValueError):
+            ind.compute_indicators(self.data, [{'kind': 'rsi'}, {'kind': 'rsi', 'window': 14}])
+
+
+class TestPanelIndicators(unittest.TestCase):
+
+    def setUp(self):
+        frames = dd.fetch_many(['AAPL', 'MSFT', 'TSLA', 'GOOGL'], period='1y', backoff=0,
+                               provider=lambda ticker: FakeTicker(ticker, bars=300, seed=len(ticker) + ord(ticker[0])))
+        self.prices = ind.build_price_panel(frames)
+        # Тикер, появившийся позже остальных, и пропуск торгов внутри ряда
+        self.prices.iloc[:40, 1] = np.nan
+        self.prices.iloc[150, 2] = np.nan
+
+    def test_panel_matches_per_ticker_computation(self):
+        panel = ind.compute_panel_indicators(self.prices)
+        self.assertEqual(list(panel['RSI'].columns), list(self.prices.columns))
+        for ticker in self.prices.columns:
+            single = ind.compute_indicators(self.prices[[ticker]].rename(columns={ticker: 'Close'}))
+            for name, values in panel.items():
+                np.testing.assert_allclose(values[ticker].to_numpy(), single[name].to_numpy(),
+                                           rtol=1e-9, equal_nan=True, err_msg=f"{name} {ticker}")
+
+    def test_build_price_panel_from_multiindex_frame(self):
+        data = dd.fetch_many(['AAPL', 'MSFT'], period='1y', as_frame=True, backoff=0,
+                             provider=lambda ticker: FakeTicker(ticker, bars=30))
+        prices = ind.build_price_panel(data)
+        self.assertEqual(prices.shape, (30, 2))
+        self.assertEqual(sorted(prices.columns), ['AAPL', 'MSFT'])
+
+
+class TestStreamingIndicators(unittest.TestCase):
+
+    def setUp(self):
+        self.data = FakeTicker('AAPL', bars=400, seed=7).history(period='max')
+        self.data.iloc[250, self.data.columns.get_loc('Close')] = np.nan
+        self.expected = ind.compute_indicators(self.data)
+
+    def test_incremental_updates_match_batch(self):
+        streaming = si.StreamingIndicators().seed(self.data.iloc[:200])
+        result = streaming.update_batch(self.data.iloc[200:])
+        pd.testing.assert_frame_equal(result, self.expected.iloc[200:], check_exact=False, rtol=1e-9, check_freq=False)
+
+    def test_snapshot_round_trip(self):
+        streaming = si.StreamingIndicators().seed(self.data.iloc[:10])
+        for close in self.data['Close'].iloc[10:100]:
+            streaming.update(close)
+        restored = si.StreamingIndicators.restore(json.loads(json.dumps(streaming.snapshot())))
+        last = [restored.update(close) for close in self.data['Close'].iloc[100:]][-1]
+        for name, value in last.items():
+            self.assertAlmostEqual(value, self.expected[name].iloc[-1], places=9)
+
+    def test_wilder_rsi_smoothing(self):
+        close = self.data['Close'].to_numpy()[:100]
+        deltas = np.diff(close)
+        gains, losses = np.maximum(deltas, 0), np.maximum(-deltas, 0)
+        avg_gain, avg_loss = gains[:14].mean(), losses[:14].mean()
+        for gain, loss in zip(gains[14:], losses[14:]):
+            avg_gain = (avg_gain * 13 + gain) / 14
+            avg_loss = (avg_loss * 13 + loss) / 14
+        rsi = si.RSIState(14, method='wilder')
+        rsi.seed(close[:50])
+        value = [rsi.update(price)[0] for price in close[50:]][-1]
+        self.assertAlmostEqual(value, 100 - 100 / (1 + avg_gain / avg_loss), places=9)
+
+
+class TestBatchPlotRenderer(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.data = ind.add_indicators(FakeTicker('AAPL', bars=5000, seed=1).history(period='max'))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_renders_many_tickers_on_one_figure(self):
+        import matplotlib.pyplot as plt
+        with dplt.BatchPlotRenderer(downsample='lttb', max_points=500) as renderer:
+            for ticker in ('AAPL', 'MSFT'):
+                filename = os.path.join(self.tmp.name, f"{ticker}.png")
+                self.assertEqual(dplt.create_and_save_plot(self.data, ticker, '1y', filename=filename,
+                                                           renderer=renderer), filename)
+                self.assertTrue(os.path.getsize(filename) > 0)
+            self.assertEqual(len(renderer.lines['Close'].get_xdata()), 500)
+            self.assertEqual(renderer.axes[0].get_title(), "MSFT Цена акций с течением времени")
+        self.assertEqual(plt.get_fignums(), [])
+
+    def test_create_and_save_plot_closes_figure(self):
+        import matplotlib.pyplot as plt
+        dplt.create_and_save_plot(self.data, 'AAPL', '1y', filename=os.path.join(self.tmp.name, 'chart.png'))
+        self.assertEqual(plt.get_fignums(), [])
+
+    def test_downsampling_keeps_endpoints_and_extremes(self):
+        x = np.arange(10000, dtype=float)
+        y = np.sin(x / 50) + np.random.default_rng(0).standard_normal(10000) * 0.01
+        y[1234] = 5.0
+        for downsample in (dplt.downsample_lttb, dplt.downsample_minmax):
+            xs, ys = downsample(x, y, 200)
+            self.assertLessEqual(len(xs), 200)
+            self.assertTrue(np.all(np.diff(xs) > 0))
+            self.assertIn(1234.0, xs)
+        xs, ys = dplt.downsample_lttb(x, y, 200)
+        self.assertEqual((xs[0], xs[-1]), (0.0, 9999.0))
+
+    def test_render_many_in_process_pool(self):
+        frames = {ticker: self.data.iloc[:300] for ticker in ('AAPL', 'MSFT', 'TSLA')}
+        frames['BAD'] = pd.DataFrame({'Close': [1.0, 2.0]})
+        errors = {}
+        results = dplt.render_many(frames, '1y', output_dir=self.tmp.name, max_workers=2, errors=errors)
+        self.assertEqual(list(results), ['AAPL', 'MSFT', 'TSLA'])
+        self.assertEqual(list(errors), ['BAD'])
+        for ticker, result in results.items():
+            self.assertEqual(result['filename'], os.path.join(self.tmp.name, f"{ticker}_1y_stock_price_chart.png"))
+            self.assertTrue(os.path.exists(result['filename']))
+            self.assertGreater(result['seconds'], 0)
+
+
+class TestInteractivePlot(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.data = FakeTicker('AAPL', bars=3000).history(period='max')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_lightweight_figure(self):
+        fig = dplt.build_interactive_figure(self.data, 'AAPL')
+        self.assertEqual([trace.type for trace in fig.data], ['scattergl'])
+        self.assertEqual(len(fig.layout.shapes), 1)
+        self.assertAlmostEqual(fig.layout.shapes[0].y0, self.data['Close'].mean())
+        short = dplt.build_interactive_figure(self.data.iloc[:100], 'AAPL')
+        self.assertEqual(short.data[0].type, 'scatter')
+
+    def test_html_export_does_not_open_browser(self):
+        filename = os.path.join(self.tmp.name, 'AAPL.html')
+        with mock.patch('plotly.graph_objs.Figure.show') as show:
+            self.assertEqual(dplt.create_interactive_plot(self.data, 'AAPL', filename=filename), filename)
+        show.assert_not_called()
+        figures = [dplt.build_interactive_figure(self.data, ticker) for ticker in ('AAPL', 'MSFT')]
+        dplt.write_interactive_html(figures, filename)
+        with open(filename, encoding='utf-8') as f:
+            content = f.read()
+        self.assertEqual(content.count('plotly.js v'), 1)
+        self.assertIn('"bdata"', content)
+
+
+class TestDataExport(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.data = ind.add_indicators(FakeTicker('AAPL', bars=1000).history(period='max'))
+        self.expected = de.downcast_indicators(self.data)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_columnar_round_trip_keeps_timezone_index(self):
+        for name in ('data.parquet', 'data.feather'):
+            filename = os.path.join(self.tmp.name, name)
+            de.export_data(self.data, filename)
+            loaded = de.load_data(filename)
+            pd.testing.assert_frame_equal(loaded, self.expected, check_freq=False)
+            self.assertEqual(str(loaded.index.tz), 'America/New_York')
+            self.assertEqual(loaded['RSI'].dtype, np.float32)
+            self.assertEqual(loaded['Close'].dtype, np.float64)
+            subset = de.load_data(filename, columns=['MACD'])
+            self.assertEqual(list(subset.columns), ['MACD'])
+            self.assertTrue(subset.index.equals(self.data.index))
+
+    def test_chunked_and_appended_writes(self):
+        for name in ('chunked.parquet', 'chunked.feather', 'chunked.csv'):
+            filename = os.path.join(self.tmp.name, name)
+            with de.ChunkedExporter(filename) as exporter:
+                for start in range(0, len(self.data), 300):
+                    exporter.write(self.data.iloc[start:start + 300])
+            loaded = de.load_data(filename)
+            self.assertEqual(len(loaded), len(self.data))
+            np.testing.assert_allclose(loaded['Close'].to_numpy(), self.data['Close'].to_numpy())
+        directory = os.path.join(self.tmp.name, 'parts.parquet')
+        de.export_data(self.data.iloc[:600], directory, append=True)
+        de.export_data(self.data.iloc[600:], directory, append=True)
+        pd.testing.assert_frame_equal(de.load_data(directory), self.expected, check_freq=False)
+
+    def test_iter_data_reads_in_chunks(self):
+        for name in ('data.parquet', 'data.feather', 'data.csv'):
+            filename = os.path.join(self.tmp.name, name)
+            de.export_data(self.data, filename)
+            chunks = list(de.iter_data(filename, chunk_rows=400, columns=['Close']))
+            self.assertEqual([len(chunk) for chunk in chunks], [400, 400, 200])
+            self.assertEqual(list(chunks[0].columns), ['Close'])
+            loaded = pd.concat(chunks)
+            self.assertTrue((loaded.index == self.data.index).all())
+            np.testing.assert_allclose(loaded['Close'].to_numpy(), self.data['Close'].to_numpy())
+
+
+class TestChunkedIndicators(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.data = benchmark.synthetic_ohlcv(20000, seed=3)
+        close = self.data['Close'].to_numpy().copy()
+        # Пропуски в начале ряда, на границе частей и длиннее всех окон
+        close[:3] = np.nan
+        close[4995:5012] = np.nan
+        close[9000:9400] = np.nan
+        self.data['Close'] = close
+        self.expected = ind.compute_indicators(self.data)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_chunks_match_full_history(self):
+        # Части меньше окон индикаторов проверяются на отрезке с пропусками
+        cases = [(self.data.iloc[4900:5600], ind.compute_indicators(self.data.iloc[4900:5600]), 7),
+                 (self.data, self.expected, 1000), (self.data, self.expected, 4999)]
+        for data, expected, size in cases:
+            chunked = ci.ChunkedIndicators()
+            parts = []
+            for start in range(0, len(data), size):
+                if start >= len(data) // 2 and start - size < len(data) // 2:
+                    # Продолжение расчета после сохранения состояния в JSON
+                    chunked = ci.ChunkedIndicators.restore(json.loads(json.dumps(chunked.snapshot())))
+                parts.append(chunked.process(data.iloc[start:start + size]))
+            result = pd.concat(parts)
+            pd.testing.assert_frame_equal(result, expected, rtol=1e-9, check_freq=False)
+
+    def test_process_history_writes_to_disk_with_bounded_memory(self):
+        import tracemalloc
+        source = os.path.join(self.tmp.name, 'history.parquet')
+        output = os.path.join(self.tmp.name, 'indicators.parquet')
+        de.export_data(self.data, source)
+        tracemalloc.start()
+        try:
+            result = ci.process_history(source, output, chunk_rows=1000, downcast=False)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.assertEqual((result['rows'], result['chunks']), (20000, 20))
+        self.assertEqual(result['state']['rows'], 20000)
+        # Пик памяти определяется частью, а не всем рядом (ряд с индикаторами занимает около 2 МБ)
+        self.assertLess(peak, 1 << 20)
+        loaded = de.load_data(output)
+        pd.testing.assert_frame_equal(loaded[self.expected.columns], self.expected, rtol=1e-9, check_freq=False)
+        pd.testing.assert_frame_equal(loaded[self.data.columns], self.data, check_freq=False)
+
+
+class TestBatchRun(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_run_batch_processes_all_jobs(self):
+        output_dir = os.path.join(self.tmp.name, 'out')
+        config = {
+            'cache_dir': os.path.join(self.tmp.name, 'cache'),
+            'defaults': {'period': '1y', 'output_dir': output_dir, 'formats': ['parquet', 'png']},
+            'jobs': [
+                {'tickers': ['AAPL', 'MSFT']},
+                {'tickers': ['TSLA'], 'start_date': '2024-01-01', 'end_date': '2024-02-01',
+                 'threshold': 5, 'formats': ['csv'],
+                 'indicators': [{'kind': 'rsi', 'window': 7, 'name': 'RSI'}]},
+            ],
+        }
+        job_file = os.path.join(self.tmp.name, 'jobs.json')
+        with open(job_file, 'w', encoding='utf-8') as f:
+            json.dump(config, f)
+        result = main.run_batch(job_file, provider=lambda ticker: FakeTicker(ticker))
+        self.assertEqual(result['errors'], {})
+        self.assertEqual(set(result['timings']), {'fetch', 'indicators', 'alerts', 'export', 'plot'})
+        self.assertEqual(sorted(os.listdir(output_dir)), [
+            'AAPL_1y.parquet', 'AAPL_1y_stock_price_chart.png',
+            'MSFT_1y.parquet', 'MSFT_1y_stock_price_chart.png',
+            'TSLA_2024-01-01_2024-02-01.csv',
+        ])
+        tsla = pd.read_csv(os.path.join(output_dir, 'TSLA_2024-01-01_2024-02-01.csv'))
+        self.assertIn('RSI', tsla.columns)
+        self.assertNotIn('MACD', tsla.columns)
+
+    def _run(self, config, provider):
+        job_file = os.path.join(self.tmp.name, 'jobs.json')
+        with open(job_file, 'w', encoding='utf-8') as f:
+            json.dump(config, f)
+        return main.run_batch(job_file, provider=provider)
+
+    def test_export_failure_is_recorded_per_ticker(self):
+        output_dir = os.path.join(self.tmp.name, 'out')
+        config = {'defaults': {'period': '1y', 'output_dir': output_dir, 'formats': ['csv', 'alerts']},
+                  'jobs': [{'tickers': ['AAPL', 'MSFT']}]}
+        export = dd.export_data_to_csv
+
+        def failing_export(data, filename):
+            if 'AAPL' in filename:
+                raise OSError("диск заполнен")
+            export(data, filename)
+
+        with mock.patch.object(dd, 'export_data_to_csv', side_effect=failing_export):
+            result = self._run(config, lambda ticker: FakeTicker(ticker))
+        self.assertEqual(list(result['errors']), ['AAPL'])
+        self.assertIsInstance(result['errors']['AAPL'], OSError)
+        self.assertEqual(sorted(os.listdir(output_dir)), ['MSFT_1y.csv', 'alerts_1y.csv'])
+
+    def test_job_period_overrides_default_dates(self):
+        output_dir = os.path.join(self.tmp.name, 'out')
+        config = {'defaults': {'start_date': '2024-01-01', 'end_date': '2024-02-01', 'output_dir': output_dir,
+                               'formats': ['csv']},
+                  'jobs': [{'tickers': ['AAPL'], 'period': '3mo'}, {'tickers': ['MSFT']}]}
+        stocks = {}
+
+        def provider(ticker):
+            stocks[ticker] = FakeTicker(ticker)
+            return stocks[ticker]
+
+        result = self._run(config, provider)
+        self.assertEqual(result['errors'], {})
+        self.assertEqual(stocks['AAPL'].calls[0]['period'], '3mo')
+        self.assertEqual(stocks['MSFT'].calls[0]['start'], '2024-01-01')
+        self.assertEqual(sorted(os.listdir(output_dir)), ['AAPL_3mo.csv', 'MSFT_2024-01-01_2024-02-01.csv'])
+
+
+class TestAlerts(unittest.TestCase):
+
+    def setUp(self):
+        self.frames = {f"T{number}": FakeTicker(f"T{number}", bars=40 + number * 7, seed=number).history(period='max')
+                       for number in range(40)}
+        self.frames['UP'] = pd.DataFrame({'Close': np.linspace(100, 130, 50)}, index=self.frames['T9'].index[:50])
+        self.frames['DOWN'] = pd.DataFrame({'Close': np.linspace(130, 100, 50)}, index=self.frames['T9'].index[:50])
+        self.frames['EMPTY'] = pd.DataFrame({'Close': [np.nan, np.nan]}, index=self.frames['T9'].index[:2])
+
+    def test_summary_stats(self):
+        data = self.frames['T3']
+        stats = alerts.summary_stats(data)
+        self.assertAlmostEqual(stats['mean'], data['Close'].mean())
+        self.assertEqual((stats['min'], stats['max'], stats['count']), (data['Close'].min(), data['Close'].max(), 61))
+        self.assertEqual((stats['first'], stats['last']), (data['Close'].iloc[0], data['Close'].iloc[-1]))
+        self.assertTrue(np.isnan(alerts.summary_stats(self.frames['EMPTY'])['mean']))
+
+    def test_summary_follows_in_place_edits(self):
+        data = pd.DataFrame({'Close': [100.0, 105.0, 110.0]})
+        self.assertEqual(alerts.summary_stats(data)['mean'], 105.0)
+        data.loc[1, 'Close'] = 1000.0
+        self.assertEqual(alerts.summary_stats(data)['mean'], 1210.0 / 3)
+        with self.assertLogs(level='INFO') as logs:
+            dd.calculate_and_display_average_price(data)
+            dd.notify_if_strong_fluctuations(data, 10)
+        self.assertIn('403.33', logs.output[0])
+        self.assertIn('Сильные колебания', logs.output[1])
+
+    def test_scan_uses_given_summary(self):
+        summary = {ticker: alerts.summary_stats(data) for ticker, data in self.frames.items()}
+        pd.testing.assert_frame_equal(alerts.scan_alerts(self.frames, threshold=10, summary=summary),
+                                      alerts.scan_alerts(self.frames, threshold=10))
+
+    def _per_ticker_alerts(self, frames, threshold):
+        expected = []
+        for ticker, data in frames.items():
+            if data['Close'].isna().all():
+                continue
+            data = ind.add_indicators(data)
+            close = data['Close']
+            fluctuation = (close.max() - close.min()) / close.min() * 100
+            spread = (data['MACD'] - data['Signal']).to_numpy()
+            checks = [('fluctuation', fluctuation > threshold), ('rsi_overbought', data['RSI'].iloc[-1] > 70),
+                      ('rsi_oversold', data['RSI'].iloc[-1] < 30),
+                      ('macd_bullish_cross', spread[-2] <= 0 < spread[-1]),
+                      ('macd_bearish_cross', spread[-2] >= 0 > spread[-1])]
+            expected += [(ticker, data.index[-1], kind) for kind, triggered in checks if triggered]
+        return expected
+
+    def test_scan_matches_per_ticker_checks(self):
+        table = alerts.scan_alerts(self.frames, threshold=10)
+        self.assertEqual(list(table.columns), alerts.ALERT_COLUMNS)
+        self.assertEqual(list(zip(table['ticker'], table['date'], table['alert'])),
+                         self._per_ticker_alerts(self.frames, 10))
+        self.assertIn(('UP', 'rsi_overbought'), list(zip(table['ticker'], table['alert'])))
+        self.assertIn(('DOWN', 'rsi_oversold'), list(zip(table['ticker'], table['alert'])))
+        self.assertTrue(table['alert'].str.startswith('macd_').any())
+
+    def test_scan_uses_each_ticker_calendar(self):
+        frames = {f"T{number}": self.frames[f"T{number}"] for number in range(30, 40)}
+        # Тикер с поздним началом торгов и тикеры с пропущенными днями
+        frames['T31'] = frames['T31'].iloc[60:]
+        frames['T32'] = frames['T32'].iloc[np.arange(len(frames['T32'])) % 5 != 0]
+        frames['T33'] = frames['T33'].iloc[np.arange(len(frames['T33'])) % 3 != 1].iloc[20:]
+        panel = ind.compute_panel_indicators(ind.build_price_panel(frames), skip_missing=True)
+        for ticker in ('T31', 'T32', 'T33'):
+            single = ind.compute_indicators(frames[ticker])
+            for name in ('RSI', 'MACD', 'Signal', 'Moving_Average', 'Std_Dev'):
+                np.testing.assert_allclose(panel[name][ticker].dropna().to_numpy(), single[name].dropna().to_numpy(),
+                                           rtol=1e-9, err_msg=f"{name} {ticker}")
+                self.assertTrue(panel[name][ticker].drop(frames[ticker].index).isna().all())
+        table = alerts.scan_alerts(frames, threshold=10)
+        self.assertEqual(list(zip(table['ticker'], table['date'], table['alert'])),
+                         self._per_ticker_alerts(frames, 10))
+
+    def test_interactive_main_summarizes_once(self):
+        data = FakeTicker('AAPL', bars=40).history(period='max')
+        with tempfile.TemporaryDirectory() as directory, \
+                mock.patch('builtins.input', side_effect=['AAPL', '1mo', '5', os.path.join(directory, 'data.csv'),
+                                                          'default']), \
+                mock.patch('data_download.fetch_stock_data', return_value=data), \
+                mock.patch('data_plotting.create_and_save_plot'), \
+                mock.patch('plotly.graph_objs.Figure.show'), \
+                mock.patch('alerts.summary_stats', wraps=alerts.summary_stats) as summary, \
+                mock.patch('data_download.summary_stats') as download_summary, \
+                mock.patch('data_plotting.summary_stats') as plotting_summary:
+            main.main()
+        self.assertEqual(summary.call_count, 1)
+        download_summary.assert_not_called()
+        plotting_summary.assert_not_called()
+
+    def test_batch_writes_alert_table(self):
+        with tempfile.TemporaryDirectory() as directory:
+            job_file = os.path.join(directory, 'jobs.json')
+            with open(job_file, 'w', encoding='utf-8') as f:
+                json.dump({'defaults': {'period': '1y', 'output_dir': directory, 'formats': ['alerts']},
+                           'jobs': [{'tickers': ['AAPL', 'MSFT']}]}, f)
+            main.run_batch(job_file, provider=lambda ticker: FakeTicker(ticker, seed=len(ticker)))
+            table = pd.read_csv(os.path.join(directory, 'alerts_1y.csv'))
+        expected = alerts.scan_alerts({ticker: FakeTicker(ticker, seed=len(ticker)).history(period='1y')
+                                       for ticker in ('AAPL', 'MSFT')})
+        self.assertEqual(list(table['alert']), list(expected['alert']))
+
+
+class TestPriceMachineSearch(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        benchmark.write_synthetic_price_files(self.tmp.name, files=3, rows_per_file=400)
+        self.pm = project.PriceMachine()
+        self.pm.load_prices(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_find_text_matches_linear_scan(self):
+        for query in ('сыр', 'Копченый Лосось', 'ку', 'р', 'нет такого товара', 'рис 1'):
+            self.assertEqual(self.pm.find_text(query), benchmark.linear_find_text(self.pm.data, query))
+
+    def test_search_caches_compact_arrays(self):
+        index = self.pm._get_index()
+        found = index.search('сыр')
+        self.assertIsInstance(found, np.ndarray)
+        self.assertEqual(found.dtype, np.int64)
+        self.assertFalse(found.flags.writeable)
+        self.assertIs(index.search('сыр'), found)
+        self.assertEqual(len(index.search('нет такого товара')), 0)
+
+    def test_filter_returns_chainable_view(self):
+        rows = list(self.pm.data)
+        view = self.pm.filter_by_price_per_kg(100, 500)
+        self.assertEqual(list(view), [item for item in rows if 100 <= item[0] <= 500])
+        self.assertEqual(list(self.pm.data), rows)
+        self.assertEqual(list(self.pm.filter_by_price_per_kg(99.5, 100.5)),
+                         [item for item in rows if 99.5 <= item[0] <= 100.5])
+        self.assertEqual(len(self.pm.filter_by_price_per_kg(500, 100)), 0)
+
+        found = view.find_text('Молоко').weight_range(2, 3).files('price_0.csv', 'price_2.csv')
+        expected = [item for item in benchmark.linear_find_text(rows, 'молоко')
+                    if 100 <= item[0] <= 500 and 2 <= item[3] <= 3 and item[4] in ('price_0.csv', 'price_2.csv')]
+        self.assertTrue(expected)
+        self.assertEqual(list(found), expected)
+        unindexed = project.PriceView(self.pm.data).price_range(100, 500).find_text('молоко')
+        self.assertEqual(list(unindexed), list(view.find_text('молоко')))
+        self.assertEqual(self.pm.find_text('молоко'), benchmark.linear_find_text(rows, 'молоко'))
+
+    def test_view_survives_reload(self):
+        rows = list(self.pm.data)
+        lazy = self.pm.view()
+        self.pm.find_text('сыр')
+        indexed = self.pm.view()
+        benchmark.write_synthetic_price_files(self.tmp.name, files=2, rows_per_file=50, seed=3)
+        self.pm.load_prices(self.tmp.name)
+        self.pm.sort_by_price_per_kg()
+        for view in (lazy, indexed):
+            self.assertEqual(list(view.find_text('сыр')), benchmark.linear_find_text(rows, 'сыр'))
+
+
+class TestPriceLoader(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        benchmark.write_synthetic_price_files(self.tmp.name, files=4, rows_per_file=300)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_parallel_load_matches_serial(self):
+        serial = project.PriceMachine()
+        self.assertEqual(serial.load_prices(self.tmp.name, max_workers=1), (4, 1200))
+        parallel = project.PriceMachine()
+        self.assertEqual(parallel.load_prices(self.tmp.name, max_workers=2), (4, 1200))
+        self.assertEqual(list(parallel.data), list(serial.data))
+        self.assertEqual(list(parallel.data), sorted(serial.data))
+        self.assertEqual(parallel.name_length, serial.name_length)
+        self.assertEqual(set(parallel.load_stats), {f"price_{number}.csv" for number in range(4)})
+        self.assertTrue(all(stats['rows'] == 300 for stats in parallel.load_stats.values()))
+
+    def test_sorted_parts_are_merged(self):
+        paths = [os.path.join(self.tmp.name, name) for name in price_loader.find_price_files(self.tmp.name)]
+        parts, _ = price_loader.parse_price_files(paths, max_workers=1)
+        for part in parts:
+            rows = list(zip(part['value'], [part['names'][code] for code in part['name_codes']], part['price'],
+                            part['weight']))
+            self.assertEqual(rows, sorted(rows))
+        merged = price_table.PriceTable.from_sorted_parts(parts)
+        self.assertTrue(merged.by_value)
+        self.assertEqual(list(merged), list(price_table.PriceTable.from_parts(parts).sorted()))
+
+    def test_quoted_fields_and_errors(self):
+        with open(os.path.join(self.tmp.name, 'price_quoted.csv'), 'w') as f:
+            f.write('Товар,Вес,Цена\n"Сыр, твердый",2,500\n\n')
+        with open(os.path.join(self.tmp.name, 'price_broken.csv'), 'w') as f:
+            f.write('артикул,стоимость\n1,2\n')
+        paths = [os.path.join(self.tmp.name, name) for name in ('price_quoted.csv', 'price_broken.csv')]
+        errors = {}
+        data, name_length, stats = price_loader.load_price_files(paths, max_workers=1, errors=errors)
+        self.assertEqual(list(data), [(250.0, 'сыр, твердый', 500, 2, 'price_quoted.csv')])
+        self.assertEqual(name_length, len('сыр, твердый'))
+        self.assertEqual(list(errors), ['price_broken.csv'])
+        with self.assertRaises(ValueError):
+            price_loader.load_price_files(paths, max_workers=1)
+
+    def test_price_table_matches_tuple_operations(self):
+        pm = project.PriceMachine()
+        pm.load_prices(self.tmp.name)
+        rows = list(pm.data)
+        self.assertEqual(pm.data[0], rows[0])
+        self.assertEqual(pm.data[-1], rows[-1])
+        self.assertEqual(pm.data[10:20], rows[10:20])
+        self.assertLess(pm.data.nbytes(), 48 * len(rows))
+        pm.data = pm.data.filter_by_value(200, 800)
+        self.assertEqual(list(pm.data), [item for item in rows if 200 <= item[0] <= 800])
+        shuffled = price_table.PriceTable.from_rows(rows[::-1])
+        self.assertEqual(list(shuffled.sorted()), rows)
+
+    def test_snapshot_reparses_only_changed_files(self):
+        snapshot_dir = os.path.join(self.tmp.name, 'snapshot')
+        pm = project.PriceMachine()
+        self.assertEqual(pm.load_prices(self.tmp.name, max_workers=1, snapshot_dir=snapshot_dir), (4, 1200))
+        self.assertEqual(len(pm.load_stats), 4)
+
+        with open(os.path.join(self.tmp.name, 'price_1.csv'), 'a') as f:
+            f.write('сыр новый,100,1,поставщик 1\n')
+        os.remove(os.path.join(self.tmp.name, 'price_2.csv'))
+        benchmark.write_synthetic_price_files(self.tmp.name, files=1, rows_per_file=50, seed=7)
+        os.rename(os.path.join(self.tmp.name, 'price_0.csv'), os.path.join(self.tmp.name, 'price_new.csv'))
+        os.utime(os.path.join(self.tmp.name, 'price_3.csv'))
+
+        pm = project.PriceMachine()
+        pm.load_prices(self.tmp.name, max_workers=1, snapshot_dir=snapshot_dir)
+        self.assertEqual(set(pm.load_stats), {'price_1.csv', 'price_new.csv'})
+        full = project.PriceMachine()
+        full.load_prices(self.tmp.name, max_workers=1)
+        self.assertEqual(list(pm.data), list(full.data))
+        self.assertEqual(pm.find_text('сыр новый'), full.find_text('сыр новый'))
+
+        pm = project.PriceMachine()
+        pm.load_prices(self.tmp.name, max_workers=1, snapshot_dir=snapshot_dir)
+        self.assertEqual(pm.load_stats, {})
+        self.assertIsInstance(pm.data.value, np.memmap)
+        self.assertEqual(list(pm.data), list(full.data))
+
+    def test_snapshot_of_other_directory_is_rebuilt(self):
+        snapshot_dir = os.path.join(self.tmp.name, 'snapshot')
+        project.PriceMachine().load_prices(self.tmp.name, max_workers=1, snapshot_dir=snapshot_dir)
+        # Файл с тем же именем, размером и временем изменения, но другим содержимым
+        other = os.path.join(self.tmp.name, 'other')
+        os.mkdir(other)
+        source = os.path.join(self.tmp.name, 'price_0.csv')
+        with open(source, encoding='utf-8') as f:
+            text = f.read()
+        with open(os.path.join(other, 'price_0.csv'), 'w', encoding='utf-8') as f:
+            f.write(text.translate(str.maketrans('12', '21')))
+        stat = os.stat(source)
+        os.utime(os.path.join(other, 'price_0.csv'), ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+        pm = project.PriceMachine()
+        self.assertEqual(pm.load_prices(other, max_workers=1, snapshot_dir=snapshot_dir), (1, 300))
+        full = project.PriceMachine()
+        full.load_prices(other, max_workers=1)
+        self.assertEqual(list(pm.data), list(full.data))
+
+
+class TestPriceExport(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.rows = [(1.5, 'сыр <твердый> & "мягкий"', 3, 2, 'price_a.csv'), (2.0, 'чай', 2, 1, 'price_b.csv'),
+                     (3.0, 'кофе', 3, 1, 'price_a.csv')]
+        self.pm = project.PriceMachine()
+        self.pm.data = price_table.PriceTable.from_rows(self.rows)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_html_export_is_escaped_and_paginated(self):
+        filename = os.path.join(self.tmp.name, 'output.html')
+        self.assertEqual(self.pm.export_to_html(filename), 'ok')
+        with open(filename, encoding='utf-8') as f:
+            document = f.read()
+        self.assertIn('<td>сыр &lt;твердый&gt; &amp; &quot;мягкий&quot;</td>', document)
+        self.assertEqual(document.count('<tr><td>'), 3)
+        self.assertEqual(document.count('<tbody>'), document.count('</tbody>'))
+        self.assertTrue(document.rstrip().endswith('</body>\n</html>'))
+
+        pages = self.pm.export(filename, page_size=2)
+        self.assertEqual([os.path.basename(page) for page in pages], ['output_1.html', 'output_2.html'])
+        with open(pages[1], encoding='utf-8') as f:
+            second = f.read()
+        self.assertIn('<tr><td>3</td><td>кофе</td>', second)
+        self.assertIn('href="output_1.html"', second)
+
+    def test_csv_and_jsonl_export(self):
+        csv_file, = self.pm.export(os.path.join(self.tmp.name, 'output.csv'))
+        exported = pd.read_csv(csv_file)
+        self.assertEqual(exported['Название'].tolist(), [row[1] for row in self.rows])
+        self.assertEqual(exported['Цена за кг.'].tolist(), [row[0] for row in self.rows])
+        jsonl_file, = self.pm.export(os.path.join(self.tmp.name, 'output.jsonl'))
+        with open(jsonl_file, encoding='utf-8') as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual(records[0], {'number': 1, 'name': self.rows[0][1], 'price': 3, 'weight': 2,
+                                      'file': 'price_a.csv', 'price_per_kg': 1.5})
+
+
+class TestProductMatching(unittest.TestCase):
+
+    def test_clusters_name_variants_only(self):
+        names = ['вареный картофель 231', 'вареный кофе 231', 'Домашний сыр 12', 'сыр домашний 12',
+                 'домашнй сыр 12', 'сыр домашний 13', 'масло сливочное 82,5%', 'Масло сливочный 82.5 %',
+                 'масло сливочное 72,5%', 'органический батон 365', 'органический йогурт 365']
+        clusters = price_matching.ProductMatcher(names).clusters.tolist()
+        self.assertEqual(clusters, [0, 1, 2, 2, 2, 5, 6, 6, 8, 9, 10])
+
+    def test_clusters_typos_in_word_start_and_extra_words(self):
+        names = ['сыр российский 45% 1кг', 'сыр росийский 45% 1кг', 'сыр российский сливочный 45% 1кг',
+                 'сыр голландский 45% 1кг', 'сыр российский 50% 1кг']
+        clusters = price_matching.ProductMatcher(names).clusters.tolist()
+        self.assertEqual(clusters, [0, 0, 0, 3, 4])
+
+    def test_numbers_compared_without_hash_collisions(self):
+        names = ['сыр домашний 12', 'сыр домашний 13', 'домашний сыр 12']
+        # Все хэши совпадают: наборы чисел должны различаться по значению, а не по хэшу
+        with mock.patch('builtins.hash', return_value=0):
+            matcher = price_matching.ProductMatcher(names)
+            found = matcher.similar('сыр домашний 13')
+        self.assertEqual(matcher.clusters.tolist(), [0, 1, 0])
+        self.assertEqual([code for _, code in found], [1])
+
+    def test_empty_catalog(self):
+        pm = project.PriceMachine()
+        self.assertEqual(pm.find_similar('сыр'), [])
+        self.assertEqual(pm.best_offers(), [])
+
+    def test_best_offers_and_find_similar(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, 'price_a.csv'), 'w') as f:
+                f.write('товар,цена,вес\nСыр Российский 50% 1кг,500,1\nмолоко 3.2%,90,1\nчай черный,300,1\n')
+            with open(os.path.join(directory, 'price_b.csv'), 'w') as f:
+                f.write('название,розница,фасовка\n"российский сыр, 50 % 1 кг",450,1\nмолоко 2.5%,80,1\n'
+                        'чай чёрный,250,1\n')
+            pm = project.PriceMachine()
+            pm.load_prices(directory, max_workers=1)
+        offers = pm.best_offers()
+        self.assertEqual([offer['best'][1] for offer in offers], ['чай чёрный', 'российский сыр, 50 % 1 кг'])
+        self.assertEqual(offers[1]['names'], ['российский сыр, 50 % 1 кг', 'сыр российский 50% 1кг'])
+        self.assertEqual((offers[1]['files'], offers[1]['rows']), (2, 2))
+        self.assertEqual(pm.best_offers(min_files=1)[0]['best'][1], 'молоко 2.5%')
+
+        found = pm.find_similar('сыр российскй')
+        self.assertEqual([row[4] for _, row in found], ['price_b.csv', 'price_a.csv'])
+        self.assertTrue(all(0.5 <= score <= 1 for score, _ in found))
+        self.assertEqual(pm.find_similar('молоко 3.2'), [(1.0, (90.0, 'молоко 3.2%', 90, 1, 'price_a.csv'))])
+
+
+class TestPriceService(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        benchmark.write_synthetic_price_files(self.tmp.name, files=3, rows_per_file=200)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    async def _get(self, port, target):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(f"GET {target} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode('utf-8'))
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+        head, body = response.split(b'\r\n\r\n', 1)
+        return int(head.split()[1]), json.loads(body.decode('utf-8'))
+
+    def test_queries_and_hot_reload(self):
+        async def scenario():
+            service = price_service.PriceService(self.tmp.name, max_workers=1, port=0, reload_interval=None)
+            port = await service.start()
+            try:
+                rows = list(service.pm.data)
+                status, page = await self._get(port, '/search?q=%D1%81%D1%8B%D1%80&min_price=100&offset=2&limit=3')
+                expected = [item for item in benchmark.linear_find_text(rows, 'сыр') if item[0] >= 100]
+                self.assertEqual(status, 200)
+                self.assertEqual(page['total'], len(expected))
+                self.assertEqual([item['name'] for item in page['items']], [item[1] for item in expected[2:5]])
+                self.assertEqual(page['items'][0]['number'], 3)
+
+                responses = await asyncio.gather(*(self._get(port, '/cheapest?n=5') for _ in range(10)))
+                for status, cheapest in responses:
+                    self.assertEqual([item['price_per_kg'] for item in cheapest['items']],
+                                     [item[0] for item in rows[:5]])
+                self.assertEqual((await self._get(port, '/search?limit=abc'))[0], 400)
+                self.assertEqual((await self._get(port, '/unknown'))[0], 404)
+
+                self.assertFalse(await service.reload_if_changed())
+                with open(os.path.join(self.tmp.name, 'price_0.csv'), 'a') as f:
+                    f.write('сыр дешевый,1,1,поставщик 0\n')
+                self.assertTrue(await service.reload_if_changed())
+                status, cheapest = await self._get(port, '/cheapest?n=1&q=%D1%81%D1%8B%D1%80')
+                self.assertEqual(cheapest['items'][0]['name'], 'сыр дешевый')
+                status, stats = await self._get(port, '/stats')
+                self.assertEqual((stats['rows'], stats['loads']), (601, 2))
+            finally:
+                await service.close()
+
+        asyncio.run(scenario())
+
+    def test_slow_query_does_not_block_other_requests(self):
+        async def scenario():
+            service = price_service.PriceService(self.tmp.name, max_workers=1, port=0, reload_interval=None)
+            port = await service.start()
+            select = service._select
+            finished = []
+
+            def slow_select(pm, params):
+                time.sleep(1.0)
+                return select(pm, params)
+
+            async def request(target):
+                result = await self._get(port, target)
+                finished.append(target)
+                return result
+
+            try:
+                with mock.patch.object(service, '_select', side_effect=slow_select):
+                    slow = asyncio.ensure_future(request('/search?q=x'))
+                    await asyncio.sleep(0.1)
+                    self.assertEqual((await request('/stats'))[0], 200)
+                    self.assertEqual((await slow)[0], 200)
+                self.assertEqual(finished, ['/stats', '/search?q=x'])
+            finally:
+                await service.close()
+
+        asyncio.run(scenario())
+
+    def test_unexpected_errors_return_500(self):
+        async def scenario():
+            service = price_service.PriceService(self.tmp.name, max_workers=1, port=0, reload_interval=None)
+            port = await service.start()
+            try:
+                with mock.patch.object(service, '_select', side_effect=RuntimeError('сбой')), \
+                        self.assertLogs(level='ERROR') as logs:
+                    status, payload = await self._get(port, '/search?q=x')
+                self.assertEqual((status, payload), (500, price_service.INTERNAL_ERROR))
+                self.assertIn('RuntimeError: сбой', logs.output[0])
+                self.assertEqual((await self._get(port, '/stats'))[0], 200)
+            finally:
+                await service.close()
+
+        asyncio.run(scenario())
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file